@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark that shows the cost of debug logging on the validation hot path.
+
+It compares formatting the log message before the call, the way pykwalify did
+before, with lazy %-style arguments, and times a full validation run with
+debug logging disabled and enabled.
+
+Run with: python benchmarks/bench_logging.py
+"""
+
+# python std lib
+import logging
+import timeit
+
+# pykwalify imports
+from pykwalify.core import Core
+
+log = logging.getLogger("bench")
+
+DATA = [{"name": "foo{}".format(i), "email": "foo{}@example.com".format(i), "age": i} for i in range(2000)]
+SCHEMA = {
+    "type": "seq",
+    "sequence": [{
+        "type": "map",
+        "mapping": {
+            "name": {"type": "str", "required": True},
+            "email": {"type": "str", "pattern": ".+@.+"},
+            "age": {"type": "int", "range": {"min": 0}},
+        },
+    }],
+}
+
+
+def eager():
+    log.debug(" * Data: {}".format(DATA))
+
+
+def lazy():
+    log.debug(" * Data: %s", DATA)
+
+
+def validate():
+    Core(source_data=DATA, schema_data=SCHEMA).validate()
+
+
+def main():
+    logging.getLogger().setLevel(logging.INFO)
+
+    print("One log.debug() call with a {} item value while DEBUG is disabled".format(len(DATA)))
+    print("  eager str.format : {:.6f} sec/call".format(timeit.timeit(eager, number=100) / 100))
+    print("  lazy %-style     : {:.6f} sec/call".format(timeit.timeit(lazy, number=100) / 100))
+
+    print("Validation of a {} item document".format(len(DATA)))
+    print("  DEBUG disabled   : {:.4f} sec".format(timeit.timeit(validate, number=5) / 5))
+
+    # Enable debug logging but throw away the output so only the formatting is measured
+    root = logging.getLogger()
+    handlers = root.handlers
+    root.handlers = [logging.NullHandler()]
+    root.setLevel(logging.DEBUG)
+    print("  DEBUG enabled    : {:.4f} sec".format(timeit.timeit(validate, number=1)))
+    root.handlers = handlers
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark that compares the pure python yaml loader with the libyaml C loader.
+
+All yaml files under tests/files is read into memory and parsed with
+SafeLoader and, when PyYAML was built with libyaml, with CSafeLoader.
+pykwalify uses the C loader when it is available.
+
+Run with: python benchmarks/bench_yaml.py
+"""
+
+# python std lib
+import os
+import timeit
+
+# pykwalify imports
+import pykwalify
+
+# 3rd party imports
+import yaml
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "tests", "files")
+
+
+def read_files():
+    files = []
+
+    for dirpath, dirnames, filenames in os.walk(ROOT):
+        for name in sorted(filenames):
+            if name.endswith(".yaml") or name.endswith(".yml"):
+                with open(os.path.join(dirpath, name), "r") as stream:
+                    files.append(stream.read())
+
+    return files
+
+
+def parse(files, loader):
+    for data in files:
+        for document in yaml.load_all(data, Loader=loader):
+            pass
+
+
+def main():
+    files = read_files()
+    number = 20
+
+    print("Parse {} yaml files from tests/files {} times (pykwalify uses: {})".format(len(files), number, pykwalify.yaml_backend))
+
+    python = timeit.timeit(lambda: parse(files, yaml.SafeLoader), number=number)
+    print("  SafeLoader  (python)  : {:.4f} sec".format(python))
+
+    try:
+        loader = yaml.CSafeLoader
+    except AttributeError:
+        print("  CSafeLoader (libyaml) : not available, PyYAML was built without libyaml")
+        return
+
+    c = timeit.timeit(lambda: parse(files, loader), number=number)
+    print("  CSafeLoader (libyaml) : {:.4f} sec ({:.1f}x faster)".format(c, python / c))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,17 @@ import logging
 import logging.config
 import os
 
+# 3rd party imports
+from yaml import SafeLoader
+
+# Use the libyaml C loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as yaml_loader
+    yaml_backend = "libyaml"
+except ImportError:
+    yaml_loader = SafeLoader
+    yaml_backend = "python"
+
 __author__ = 'Grokzen <Grokzen@gmail.com>'
 __version_info__ = (1, 3, 0)
 __version__ = '.'.join(map(str, __version_info__))
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+""" pyKwalify - aio.py
+
+Validation from asyncio code. This module needs python 3.7 or later and is not imported by pykwalify itself.
+"""
+
+# python std lib
+import asyncio
+import logging
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+# pyKwalify imports
+from pykwalify.core import Validator, _Walker, _close_pending
+from pykwalify.errors import CoreError, ErrorLimitReached, ErrorList, SchemaError
+from pykwalify.parallel import _pack_errors, _unpack_errors
+
+log = logging.getLogger(__name__)
+
+
+def iter_validate(validator, data, errors, chunk_size=1000):
+    """
+    Validate data and yield after each chunk_size nodes, at any depth of the data, so the caller
+    can pause or stop the validation between the chunks. The errors is the same as Core reports,
+    in the same order.
+    """
+    yield from _Walker(validator, chunk_size).node(data, validator.compile(), "", errors)
+
+
+async def run_funcs(pending, max_concurrency):
+    """
+    Await the (awaitable, value, rule, path, errors) items in pending that was collected from
+    coroutine extension functions, with at most max_concurrency of them running at the same time.
+    An error is added to the errors of the item for each function that returned a false value, in
+    the order the functions was called. If a function raised an exception it is raised here when
+    all of them is done.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    results = await asyncio.gather(*[run(item[0]) for item in pending], return_exceptions=True)
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    for (awaitable, value, rule, path, errors), result in zip(pending, results):
+        if not result:
+            errors.append(SchemaError.SchemaErrorEntry(
+                msg="Value '{value}' did not validate with extension function '{func}'. Path: '{path}'",
+                path=path,
+                value=value,
+                rule=rule,
+                func=rule._func))
+
+
+def run_funcs_sync(pending, max_concurrency):
+    """
+    Run run_funcs() in a new event loop. Used when the validation was not started from asyncio code.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        _close_pending(pending)
+        raise CoreError("Coroutine extension functions can not be awaited by validate() inside a running event loop, use validate_async()")
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        loop.run_until_complete(run_funcs(pending, max_concurrency))
+    finally:
+        loop.close()
+
+
+def _step(validator, steps, pending, errors):
+    """
+    Run the validation to the end of the next chunk and return False when it is done. Coroutine
+    extension functions is collected in pending, with errors as the collector for their errors.
+    Only the synchronous part is run with pending as the target, other validations in the same
+    thread can run between two steps.
+    """
+    with validator._deferred_funcs(pending, errors):
+        for _ in steps:
+            return True
+
+    return False
+
+
+def _run(validator, data, errors, chunk_size, pending, cancelled=None):
+    """
+    Run iter_validate to the end, or until cancelled is set.
+    """
+    steps = iter_validate(validator, data, errors, chunk_size)
+
+    try:
+        while _step(validator, steps, pending, errors):
+            if cancelled is not None and cancelled.is_set():
+                log.debug("Validation was cancelled")
+                return False
+    except ErrorLimitReached:
+        log.debug("Validation stopped after %s errors", len(errors))
+        return False
+
+    return True
+
+
+# Validators in a worker process of a process executor, by the token of the validator in the parent
+_validators = {}
+
+
+def _validate_in_process(token, options, data, chunk_size, max_errors):
+    validator = _validators.get(token, None)
+
+    if validator is None:
+        validator = _validators[token] = Validator(**options)
+
+    errors = ErrorList(max_errors) if max_errors else []
+    pending = []
+
+    try:
+        if _run(validator, data, errors, chunk_size, pending) and pending:
+            run_funcs_sync(pending, validator.func_concurrency)
+    except ErrorLimitReached:
+        pass
+    finally:
+        _close_pending(pending)
+
+    return _pack_errors(errors, dict((id(r), i) for i, r in enumerate(validator._rules())))
+
+
+class AsyncValidator(object):
+    """
+    Validates data from asyncio code without blocking the event loop.
+
+    The validation runs in an executor, a thread pool by default or a process pool, or in the
+    event loop itself. The data is validated in chunks of nodes so the validation can be cancelled
+    between two chunks, and in the event loop, other tasks can run between two chunks.
+
+    A validation that runs in a thread stops at the next chunk when the task is cancelled. A
+    validation that was sent to a process pool can only be cancelled before it has started. In a
+    process pool the data is validated in a copy, so default values is not added to the data.
+    """
+
+    def __init__(self, validator, executor=None, max_concurrency=None, in_loop=False, chunk_size=1000):
+        """
+        :param validator:
+            Validator with the compiled schema.
+        :param executor:
+            concurrent.futures executor that the validation runs in. None uses the default
+            executor of the event loop. With a ProcessPoolExecutor each worker process creates
+            the same validator once.
+        :param max_concurrency:
+            Max number of validations that run at the same time. Other calls wait for their turn.
+        :param in_loop:
+            Validate in the event loop instead of an executor and let other tasks run between chunks.
+        :param chunk_size:
+            Number of nodes, at any depth of the data, that is validated between two chances to cancel or yield.
+        """
+        self.validator = validator
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.in_loop = in_loop
+        self.chunk_size = chunk_size
+        self.token = uuid.uuid4().hex
+        self._semaphore = None
+
+    async def validate(self, data, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Validate data and return it, see Validator.validate().
+        """
+        if self.max_concurrency is None:
+            return await self._validate(data, raise_exception, fail_fast, max_errors, summary)
+
+        if self._semaphore is None:
+            # Created here so it belongs to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            return await self._validate(data, raise_exception, fail_fast, max_errors, summary)
+
+    async def _validate(self, data, raise_exception, fail_fast, max_errors, summary):
+        validator = self.validator
+        max_errors = 1 if fail_fast else max_errors
+        errors = validator._new_errors(max_errors, summary)
+
+        if isinstance(self.executor, ProcessPoolExecutor) and not self.in_loop:
+            packed = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _validate_in_process, self.token, validator._options, data, self.chunk_size, max_errors)
+
+            try:
+                errors.extend(_unpack_errors(packed, validator._rules()))
+            except ErrorLimitReached:
+                pass
+        else:
+            pending = []
+
+            try:
+                if self.in_loop:
+                    done = await self._validate_in_loop(data, errors, pending)
+                else:
+                    done = await self._validate_in_thread(data, errors, pending)
+
+                # Coroutine extension functions is awaited in this event loop
+                if done and pending:
+                    await run_funcs(pending, validator.func_concurrency)
+            except ErrorLimitReached:
+                log.debug("Validation stopped after %s errors", len(errors))
+            finally:
+                _close_pending(pending)
+
+        validator._handle_errors(errors, raise_exception)
+
+        return data
+
+    async def _validate_in_loop(self, data, errors, pending):
+        steps = iter_validate(self.validator, data, errors, self.chunk_size)
+
+        while _step(self.validator, steps, pending, errors):
+            await asyncio.sleep(0)
+
+        return True
+
+    async def _validate_in_thread(self, data, errors, pending):
+        cancelled = threading.Event()
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, _run, self.validator, data, errors, self.chunk_size, pending, cancelled)
+        except asyncio.CancelledError:
+            # Stops the thread at the next chunk
+            cancelled.set()
+            raise
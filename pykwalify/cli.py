@@ -25,32 +25,72 @@ def parse_cli():
     #
 
     __docopt__ = """
-usage: pykwalify -d FILE -s FILE ... [-e FILE ...] [-v ...] [-q]
+usage: pykwalify -d FILE ... -s FILE ... [-e FILE ...] [-f FORMAT] [-j N] [-m GLOB] [--fail-fast] [--max-errors N] [--summary] [--stream] [-v ...] [-q]
 
 optional arguments:
-  -d FILE, --data-file FILE            schema definition file
+  -d FILE, --data-file FILE            schema definition file, use - to read it from stdin. Can be given
+                                       multiple times, the result for each file is then printed in order
   -e FILE, --extension FILE            file containing python extension
+  -f FORMAT, --format FORMAT           format of the data file: json, yaml, jsonl, csv or tsv. Found from the
+                                       extension if not given, it must be given when reading from stdin
+  --fail-fast                          stop validation at the first error
   -h, --help                           show this help message and exit
+  -j N, --jobs N                       validate the data files in N worker processes
+  -m GLOB, --members GLOB              validate the files in the tar or zip archive given with --data-file
+                                       that match GLOB, archives is detected from the extension [default: *]
+  --max-errors N                       stop validation after N errors
   -q, --quiet                          suppress terminal output
   -s FILE, --schema-file FILE          the file to be tested
+  --stream                             validate each document in a multi document yaml file, or each item
+                                       in a json file with a top level array, one at a time. Json lines,
+                                       csv and tsv files is always validated one record at a time
+  --summary                            group errors by rule and path and print a summary
   -v, --verbose                        verbose terminal output (multiple -v increases verbosity)
   --version                            display the version number and exit
 """
 
     # Import pykwalify package
     import pykwalify
+    from .sources import is_archive, source_format_names
 
-    args = docopt(__docopt__, version=pykwalify.__version__)
+    args = docopt(__docopt__, version="{} (yaml backend: {})".format(pykwalify.__version__, pykwalify.yaml_backend))
 
     pykwalify.init_logging(1 if args["--quiet"] else args["--verbose"])
     log = logging.getLogger(__name__)
 
+    log.debug("Using yaml backend: %s", pykwalify.yaml_backend)
+
     #
     # 2. validate arguments only, dont go into other code/logic
     #
 
-    log.debug("Setting verbose level: {}".format(args["--verbose"]))
-    log.debug("Arguments from CLI: {}".format(args))
+    log.debug("Setting verbose level: %s", args["--verbose"])
+    log.debug("Arguments from CLI: %s", args)
+
+    if args["--max-errors"] is not None:
+        if not args["--max-errors"].isdigit() or int(args["--max-errors"]) < 1:
+            sys.exit("pykwalify: --max-errors must be a positive integer")
+
+    if args["--format"] is not None and args["--format"] not in source_format_names:
+        sys.exit("pykwalify: --format must be one of: {}".format(", ".join(source_format_names)))
+
+    if args["--jobs"] is not None:
+        if not args["--jobs"].isdigit() or int(args["--jobs"]) < 1:
+            sys.exit("pykwalify: --jobs must be a positive integer")
+
+    if "-" in args["--data-file"]:
+        if args["--format"] is None:
+            sys.exit("pykwalify: --format must be given when the data file is read from stdin")
+
+        if len(args["--data-file"]) > 1:
+            sys.exit("pykwalify: stdin can only be used with a single data file")
+
+    if len(args["--data-file"]) > 1 or args["--jobs"] is not None:
+        if args["--stream"]:
+            sys.exit("pykwalify: --stream can only be used with a single data file")
+
+        if any(is_archive(f) for f in args["--data-file"]):
+            sys.exit("pykwalify: archives can only be used as a single data file")
 
     return args
 
@@ -61,17 +101,115 @@ def run(cli_args):
 
     One for parsing the cli and one that runs the application.
     """
-    from .core import Core
+    from .core import Core, Validator
+    from .sources import format_from_name, is_archive
+
+    if len(cli_args["--data-file"]) > 1 or cli_args["--jobs"] is not None:
+        return run_files(cli_args)
+
+    data_file = cli_args["--data-file"][0]
+    source_format = cli_args["--format"]
+
+    if data_file == "-":
+        # Binary stdin so the parsers can detect the encoding
+        data_file = getattr(sys.stdin, "buffer", sys.stdin)
+    elif is_archive(data_file):
+        v = Validator(
+            schema_files=cli_args["--schema-file"],
+            extensions=cli_args['--extension'],
+        )
+        v.validate_archive(
+            data_file,
+            members=cli_args["--members"],
+            fail_fast=cli_args["--fail-fast"],
+            max_errors=int(cli_args["--max-errors"]) if cli_args["--max-errors"] else None,
+            summary=cli_args["--summary"],
+        )
+        return v
+
+    if cli_args["--stream"]:
+        v = Validator(
+            schema_files=cli_args["--schema-file"],
+            extensions=cli_args['--extension'],
+        )
+        if source_format is None:
+            source_format = format_from_name(data_file)
+
+        options = dict(
+            fail_fast=cli_args["--fail-fast"],
+            max_errors=int(cli_args["--max-errors"]) if cli_args["--max-errors"] else None,
+            summary=cli_args["--summary"],
+        )
+
+        if source_format == "json":
+            v.validate_json_array(data_file, **options)
+        elif source_format in ("jsonl", "csv", "tsv"):
+            # The records in these formats is always read one at a time
+            v.validate_file(data_file, source_format=source_format, **options)
+        else:
+            v.validate_stream(data_file, **options)
+        return v
 
     c = Core(
-        source_file=cli_args["--data-file"],
+        source_file=data_file,
         schema_files=cli_args["--schema-file"],
         extensions=cli_args['--extension'],
+        source_format=source_format,
+    )
+    c.validate(
+        fail_fast=cli_args["--fail-fast"],
+        max_errors=int(cli_args["--max-errors"]) if cli_args["--max-errors"] else None,
+        summary=cli_args["--summary"],
     )
-    c.validate()
     return c
 
 
+def run_files(cli_args):
+    """
+    Validate many data files, in parallel when --jobs is given, and print the result for
+    each file in the order they was given. SchemaError is raised when all files is done
+    if any of them failed.
+    """
+    from .errors import SchemaError
+    from .parallel import validate_files
+
+    log = logging.getLogger(__name__)
+
+    max_errors = 1 if cli_args["--fail-fast"] else (int(cli_args["--max-errors"]) if cli_args["--max-errors"] else None)
+    results = []
+    failed = []
+
+    for result in validate_files(
+        cli_args["--data-file"],
+        cli_args["--schema-file"],
+        extensions=cli_args['--extension'],
+        jobs=int(cli_args["--jobs"]) if cli_args["--jobs"] else 1,
+        source_format=cli_args["--format"],
+        max_errors=max_errors,
+        summary=cli_args["--summary"],
+    ):
+        results.append(result)
+
+        if result.error is not None:
+            failed.append(result.path)
+            log.error("%s: %s", result.path, result.error)
+        elif result.errors:
+            failed.append(result.path)
+            log.error("%s: validation.invalid", result.path)
+            for error in result.errors:
+                log.error(" - %s", error)
+        else:
+            log.info("%s: validation.valid", result.path)
+
+    log.info("Validated %s data files, %s failed", len(results), len(failed))
+
+    if failed:
+        raise SchemaError("Schema validation failed for {} of {} data files:\n - {}".format(
+            len(failed), len(results), "\n - ".join(failed)))
+
+    return results
+
+
 def cli_entrypoint():
     """
     Main entrypoint for script. Used by setup.py to automatically
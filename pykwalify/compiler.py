@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+
+""" pyKwalify - compiler.py """
+
+# python std lib
+import logging
+
+# pyKwalify imports
+import pykwalify
+from pykwalify.errors import CoreError, SchemaError, NotMappingError, NotSequenceError
+from pykwalify.types import is_scalar, tt
+
+# 3rd party imports
+from dateutil.parser import parse
+
+log = logging.getLogger(__name__)
+
+
+class RuleCompiler(object):
+    """
+    Turns a Rule tree into nested python functions.
+
+    Every rule is compiled into one function with the signature `(value, path, errors)`.
+    All decisions that only depend on the rule, what kind of node it is, what checks is
+    defined and what the limits of them is, are made once when the function is built so
+    validating a value is a straight call chain without any dispatching on the rule.
+
+    The functions report the same errors in the same order as the validation methods in Core.
+    """
+
+    def __init__(self, core):
+        """
+        :param core:
+            Core object that the rules was compiled by. It is used to find extension functions.
+        """
+        self.core = core
+        self.compiled = {}
+
+    def compile(self, rule):
+        """
+        Return the validation function for rule. Each rule is only compiled once, so
+        recursive schemas that include themselves reuse the same function.
+        """
+        key = id(rule)
+        if key in self.compiled:
+            return self.compiled[key]
+
+        # Register a forwarding function before the rule is compiled so that any recursive
+        # include of this rule can reference it before it is done.
+        slot = []
+
+        def forward(value, path, errors):
+            return slot[0](value, path, errors)
+
+        self.compiled[key] = forward
+
+        if rule._include_name is not None:
+            fn = self.compile_include(rule)
+        elif rule._sequence is not None:
+            fn = self.compile_sequence(rule)
+        elif rule._mapping is not None or rule._allowempty_map:
+            fn = self.compile_mapping(rule)
+        else:
+            fn = self.compile_scalar(rule)
+
+        if rule._required:
+            fn = self.compile_required(fn)
+
+        slot.append(fn)
+        self.compiled[key] = fn
+
+        return fn
+
+    def compile_required(self, fn):
+        def validate_required(value, path, errors):
+            if value is None and path == "":
+                raise CoreError("required.novalue : {}".format(path))
+            fn(value, path, errors)
+
+        return validate_required
+
+    def compile_func(self, rule):
+        """
+        Return a function that runs the 'func' extension for rule or None if no func is defined.
+        """
+        func = rule._func
+
+        if not func:
+            return None
+
+        method = rule._func_method
+        core = self.core
+
+        if method is None:
+            # Let the core look it up during validation and report it if it is still missing
+            def handle_func(value, path, errors):
+                core._handle_func(value, rule, path, errors)
+
+            return handle_func
+
+        def handle_func(value, path, errors):
+            core._func_result(method(value, rule, path), value, rule, path, errors)
+
+        return handle_func
+
+    def compile_range(self, rule, prefix):
+        """
+        Return a function that validates a size against the range of rule or None if no range is defined.
+        """
+        if rule._range is None:
+            return None
+
+        checks = []
+        max_ = rule._range.get("max", None)
+        min_ = rule._range.get("min", None)
+        max_ex = rule._range.get("max-ex", None)
+        min_ex = rule._range.get("min-ex", None)
+
+        if max_ is not None:
+            checks.append((lambda v: max_ < v, dict(
+                msg="Type '{prefix}' has size of '{value}', greater than max limit '{max_}'. Path: '{path}'",
+                prefix=prefix,
+                max_=max_)))
+
+        if min_ is not None:
+            checks.append((lambda v: min_ > v, dict(
+                msg="Type '{prefix}' has size of '{value}', less than min limit '{min_}'. Path: '{path}'",
+                prefix=prefix,
+                min_=min_)))
+
+        if max_ex is not None:
+            checks.append((lambda v: max_ex <= v, dict(
+                msg="Type '{prefix}' has size of '{value}', greater than or equals to max limit(exclusive) '{max_ex}'. Path: '{path}'",
+                prefix=prefix,
+                max_ex=max_ex)))
+
+        if min_ex is not None:
+            checks.append((lambda v: min_ex >= v, dict(
+                msg="Type '{prefix}' has size of '{value}', less than or equals to min limit(exclusive) '{min_ex}'. Path: '{path}'",
+                prefix=prefix,
+                min_ex=min_ex)))
+
+        def validate_range(value, path, errors):
+            for failed, kwargs in checks:
+                if failed(value):
+                    errors.append(SchemaError.SchemaErrorEntry(path=path, value=value, rule=rule, **kwargs))
+
+        return validate_range
+
+    def compile_include(self, rule):
+        include_name = rule._include_name
+        partial_schema_rule = rule._include_rule
+
+        if partial_schema_rule is None:
+            # The partial schema did not exist when the schema was compiled. Look it up
+            # again when the include is used and report it if it still is missing.
+            def validate_include(value, path, errors):
+                partial = pykwalify.partial_schemas.get(include_name, None)
+                if not partial:
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Cannot find partial schema with name '{include_name}'. Existing partial schemas: '{existing_schemas}'. Path: '{path}'",
+                        path=path,
+                        value=value,
+                        rule=rule,
+                        include_name=include_name,
+                        existing_schemas=", ".join(sorted(pykwalify.partial_schemas.keys()))))
+                    return
+
+                self.compile(partial)(value, path, errors)
+
+            return validate_include
+
+        return self.compile(partial_schema_rule)
+
+    def compile_sequence(self, rule):
+        handle_func = self.compile_func(rule)
+        validate_range = self.compile_range(rule, "seq")
+        matching = rule._matching
+        item_validators = [self.compile(r) for r in rule._sequence]
+
+        core = self.core
+        has_unique = rule._unique_items or bool(rule._unique_keys)
+
+        def validate_sequence(value, path, errors):
+            if value is None:
+                return
+
+            if not isinstance(value, list):
+                raise NotSequenceError("Value: {} is not of a sequence type".format(value))
+
+            if handle_func is not None:
+                handle_func(value, path, errors)
+
+            if validate_range is not None:
+                validate_range(len(value), path, errors)
+
+            if has_unique:
+                core._validate_unique(value, rule, path, errors)
+
+            error_tracker = []
+            failed = False
+
+            for i, item in enumerate(value):
+                item_path = "{}/{}".format(path, i)
+                processed = []
+
+                for validate_item in item_validators:
+                    tmp_errors = []
+
+                    try:
+                        validate_item(item, item_path, tmp_errors)
+                    except (NotMappingError, NotSequenceError):
+                        # Wrong collection type for this sequence rule is ignored, same as the core do
+                        pass
+
+                    processed.append(tmp_errors)
+
+                if not failed:
+                    if matching == "any":
+                        ok = any(len(_errors) == 0 for _errors in processed)
+                    elif matching == "all":
+                        ok = all(len(_errors) == 0 for _errors in processed)
+                    else:
+                        ok = True
+
+                    if ok:
+                        # Only errors that a later invalid item can report is kept, that never happens with '*'
+                        if matching != "*" and not all(len(_errors) == 0 for _errors in processed):
+                            error_tracker.append(processed)
+                        continue
+
+                    # First item that is not valid, report the errors for all earlier items
+                    failed = True
+
+                    for _processed in error_tracker:
+                        for _errors in _processed:
+                            errors.extend(_errors)
+
+                    error_tracker = None
+
+                for _errors in processed:
+                    errors.extend(_errors)
+
+        return validate_sequence
+
+    def compile_mapping(self, rule):
+        if rule._mapping is None:
+            # Nothing to validate, prolly because of allowempty: True
+            return lambda value, path, errors: None
+
+        handle_func = self.compile_func(rule)
+        validate_range = self.compile_range(rule, "map")
+        allowempty = rule._allowempty_map
+        matching_rule = rule._matching_rule
+        required_keys = rule._required_keys
+        default_values = list(rule._default_values.items())
+        matcher = rule._mapping_matcher
+        has_regex = bool(rule._regex_mappings)
+        all_regex_count = len(rule._regex_mappings)
+        regex_validators = dict((id(r), self.compile(r)) for r in rule._regex_mappings)
+        regex = "  ".join([r._map_regex_rule for r in rule._regex_mappings])
+
+        key_validators = dict((k, self.compile(r)) for k, r in matcher.exact_rules.items())
+
+        def validate_mapping(value, path, errors):
+            if handle_func is not None:
+                handle_func(value, path, errors)
+
+            if not isinstance(value, dict):
+                raise NotMappingError("Value: {} is not of a mapping type".format(value))
+
+            if validate_range is not None:
+                validate_range(len(value), path, errors)
+
+            for k in required_keys:
+                if k not in value:
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Cannot find required key '{key}'. Path: '{path}'",
+                        path=path,
+                        value=value,
+                        rule=rule,
+                        key=k))
+
+            for k, default in default_values:
+                if k not in value:
+                    value[k] = default
+
+            for k, v in value.items():
+                validate_key = key_validators.get(k, None)
+
+                if validate_key is not None:
+                    validate_key(v, "{}/{}".format(path, k), errors)
+                elif has_regex:
+                    regex_mappings = matcher.match_regex(k)
+
+                    for regex_rule in regex_mappings:
+                        regex_validators[id(regex_rule)](v, "{}/{}".format(path, k), errors)
+
+                    if matching_rule == "any":
+                        if not regex_mappings:
+                            errors.append(SchemaError.SchemaErrorEntry(
+                                msg="Key '{key}' does not match any regex '{regex}'. Path: '{path}'",
+                                path=path,
+                                value=value,
+                                rule=rule,
+                                key=k,
+                                regex=regex))
+                    elif matching_rule == "all":
+                        if len(regex_mappings) != all_regex_count:
+                            errors.append(SchemaError.SchemaErrorEntry(
+                                msg="Key '{key}' does not match all regex '{regex}'. Path: '{path}'",
+                                path=path,
+                                value=value,
+                                rule=rule,
+                                key=k,
+                                regex=regex))
+                elif not allowempty:
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Key '{key}' was not defined. Path: '{path}'",
+                        path=path,
+                        value=value,
+                        rule=rule,
+                        key=k))
+
+        return validate_mapping
+
+    def compile_scalar(self, rule):
+        handle_func = self.compile_func(rule)
+        validate_range = self.compile_range(rule, "scalar")
+        enum = rule._enum_set
+        enum_file = rule._enum_file
+        default = rule._default
+        scalar_type = rule._type
+        is_type = tt.get(scalar_type, None)
+        pattern = rule._pattern
+        pattern_regexp = rule._pattern_regexp
+        pattern_cache = rule._pattern_cache
+        is_timestamp = scalar_type == "timestamp"
+
+        def validate_scalar(value, path, errors):
+            if handle_func is not None:
+                handle_func(value, path, errors)
+
+            if enum is not None:
+                try:
+                    found = value in enum
+                except TypeError:
+                    found = False
+
+                if not found:
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Enum '{value}' does not exist. Path: '{path}'",
+                        path=path,
+                        value=value,
+                        rule=rule))
+
+            if enum_file is not None:
+                if value is None or str(value) not in enum_file:
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Enum '{value}' does not exist. Path: '{path}'",
+                        path=path,
+                        value=value,
+                        rule=rule))
+
+            # Set default value
+            if default and value is None:
+                value = default
+
+            if is_type is None:
+                # Type not found in map
+                raise Exception("Unknown type check: {} : {} : {}".format(path, value, scalar_type))
+
+            if not is_type(value):
+                errors.append(SchemaError.SchemaErrorEntry(
+                    msg="Value '{value}' is not of type '{scalar_type}'. Path: '{path}'",
+                    path=path,
+                    value=value,
+                    rule=rule,
+                    scalar_type=scalar_type))
+
+            if value is None:
+                return
+
+            if pattern_regexp is not None:
+                value_str = value if isinstance(value, str) else str(value)
+
+                if pattern_cache is not None:
+                    matched = pattern_cache.match(value_str)
+                else:
+                    matched = pattern_regexp.match(value_str) is not None
+
+                if not matched:
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Value '{value}' does not match pattern '{pattern}'. Path: '{path}'",
+                        path=path,
+                        value=value,
+                        rule=rule,
+                        pattern=pattern))
+
+            if validate_range is not None:
+                if not is_scalar(value):
+                    raise CoreError("value is not a valid scalar")
+
+                try:
+                    size = len(value)
+                except Exception:
+                    size = value
+
+                validate_range(size, path, errors)
+
+            if is_timestamp:
+                v = value.strip()
+
+                # parse("") will give a valid date but it should not be
+                # considered a valid timestamp
+                if v == "":
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="timestamp.empty : {value} : {path}",
+                        path=path,
+                        value=value,
+                        rule=rule))
+                else:
+                    try:
+                        parse(value)
+                        # If it can be parsed then it is valid
+                    except Exception:
+                        errors.append(SchemaError.SchemaErrorEntry(
+                            msg="timestamp.invalid : {value} : {path}",
+                            path=path,
+                            value=value,
+                            rule=rule))
+
+        return validate_scalar
+
+
+def compile_rule(core, rule):
+    """
+    Compile rule and all rules below it into one validation function with the
+    signature `(value, path, errors)`.
+    """
+    return RuleCompiler(core).compile(rule)
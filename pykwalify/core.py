@@ -3,16 +3,47 @@
 """ pyKwalify - core.py """
 
 # python std lib
+import codecs
+import contextlib
 import imp
+import inspect
+import io
+import itertools
 import json
 import logging
+import mmap
 import os
-import re
+import threading
+import time
 
 # pyKwalify imports
 import pykwalify
-from pykwalify.errors import CoreError, SchemaError, NotMappingError, NotSequenceError
-from pykwalify.rule import Rule
+from pykwalify.compiler import compile_rule
+from pykwalify.errors import (
+    CoreError,
+    ErrorLimitReached,
+    DocumentErrors,
+    ErrorList,
+    ErrorSummary,
+    NotMappingError,
+    NotSequenceError,
+    SchemaError,
+)
+from pykwalify.events import EventValidator
+from pykwalify.rule import PatternMatchCache, Rule, UniqueIndex
+from pykwalify.sources import (
+    detect_compression,
+    format_from_name,
+    is_buffer,
+    iter_archive_members,
+    iter_csv_rows,
+    iter_json_array,
+    map_file,
+    open_source,
+    source_format_names,
+    strip_compression_extension,
+    text_stream,
+)
 from pykwalify.types import is_scalar, tt
 
 # 3rd party imports
@@ -21,49 +52,182 @@ from dateutil.parser import parse
 
 log = logging.getLogger(__name__)
 
+# Coroutine extension functions needs python 3.7 or later
+_isawaitable = getattr(inspect, "isawaitable", lambda value: False)
+_iscoroutinefunction = getattr(inspect, "iscoroutinefunction", lambda func: False)
+
+# Max number of errors that is formatted in the error log of a validation
+LOGGED_ERRORS = 10
+
+# Number of nodes that iter_errors() validates between two checks if the consumer wants more errors
+ITER_ERRORS_CHUNK_SIZE = 100
+
+# Max number of coroutine extension functions that is awaited at the same time
+DEFAULT_FUNC_CONCURRENCY = 100
+
+
+def _error_messages(errors):
+    """
+    Return the messages for the errors found by one validation. They are formatted when this is called.
+    """
+    if isinstance(errors, ErrorSummary):
+        return errors.lines()
+
+    return [str(error) for error in errors]
+
+
+def _close_pending(pending):
+    """
+    Close the coroutines in pending that was never awaited, e.g. when the validation stopped
+    at max_errors, so python do not warn about them.
+    """
+    for item in pending:
+        close = getattr(item[0], "close", None)
+
+        if close is not None:
+            close()
+
 
 class Core(object):
     """ Core class of pyKwalify """
 
-    def __init__(self, source_file=None, schema_files=[], source_data=None, schema_data=None, extensions=[]):
+    def __init__(self, source_file=None, schema_files=[], source_data=None, schema_data=None, extensions=[], source_format=None):
         """
+        :param source_file:
+            Path to the source file, an open file object, text or binary, or the raw bytes of the source
+            as bytes, bytearray, memoryview or mmap. File objects for json lines and csv sources is read
+            when they are validated, so they can only be validated once.
+        :param source_format:
+            Format of the source, one of "json", "yaml", "jsonl", "csv" or "tsv". Found from the extension
+            of the path, or the name of the file object, if it is not given. It must be given for bytes and
+            for file objects without a name, e.g. sys.stdin or a socket.
         :param extensions:
             List of paths to python files that should be imported and available via 'func' keywork.
             This list of extensions can be set manually or they should be provided by the `--extension`
             flag from the cli. This list should not contain files specified by the `extensions` list keyword
             that can be defined at the top level of the schema.
         """
-        log.debug("source_file: {}".format(source_file))
-        log.debug("schema_file: {}".format(schema_files))
-        log.debug("source_data: {}".format(source_data))
-        log.debug("schema_data: {}".format(schema_data))
-        log.debug("extension files: {}".format(extensions))
+        log.debug("yaml backend: %s", pykwalify.yaml_backend)
+        log.debug("source_file: %s", source_file if not is_buffer(source_file) else "<{} bytes>".format(len(source_file)))
+        log.debug("source_format: %s", source_format)
+        log.debug("schema_file: %s", schema_files)
+        log.debug("source_data: %s", source_data)
+        log.debug("schema_data: %s", schema_data)
+        log.debug("extension files: %s", extensions)
 
         self.source = None
+        # Set for source files that is validated one record at a time instead of being loaded
+        self.source_file = None
+        self.source_format = None
         self.schema = None
-        self.validation_errors = None
         self.validation_errors_exceptions = None
         self.root_rule = None
-        self.extensions = extensions
+        self.pattern_cache_size = 0
+        self.extensions = list(extensions)
+        self.func_concurrency = DEFAULT_FUNC_CONCURRENCY
+        self._local = threading.local()
 
         if source_file is not None:
+            self._load_source(source_file, source_format)
+
+        self._load_schema(schema_files, schema_data)
+
+        # Nothing was loaded so try the source_data variable
+        if self.source is None:
+            log.debug("No source file loaded, trying source data variable")
+            self.source = source_data
+
+        # Test if anything was loaded
+        if self.source is None and self.source_file is None:
+            raise CoreError("No source file/data was loaded")
+        if self.schema is None:
+            raise CoreError("No schema file/data was loaded")
+
+        self._init_extensions()
+
+    def _load_source(self, source_file, source_format=None):
+        """
+        Load source_file into self.source, or only keep it in self.source_file for sources
+        that is validated one record at a time.
+        """
+        self.source, self.source_file, self.source_format = self._read_source_file(source_file, source_format)
+
+    def _read_source_file(self, source_file, source_format=None):
+        """
+        Return (data, records_file, source_format) for source_file. data is the loaded json or
+        yaml source. records_file is set instead for sources that is validated one record at
+        a time. Nothing is stored on self so one Validator can read files in many threads.
+
+        Large uncompressed files is memory mapped so the parsers read from the mapped
+        buffer instead of a copy of the file made by read().
+        """
+        if is_buffer(source_file):
+            name = None
+        elif hasattr(source_file, "read"):
+            name = getattr(source_file, "name", None)
+        else:
             if not os.path.exists(source_file):
                 raise CoreError("Provided source_file do not exists on disk: {}".format(source_file))
+            name = source_file
 
-            with open(source_file, "r") as stream:
-                if source_file.endswith(".json"):
-                    try:
-                        self.source = json.load(stream)
-                    except Exception:
-                        raise CoreError("Unable to load any data from source json file")
-                elif source_file.endswith(".yaml") or source_file.endswith('.yml'):
-                    try:
-                        self.source = yaml.load(stream)
-                    except Exception:
-                        raise CoreError("Unable to load any data from source yaml file")
-                else:
-                    raise CoreError("Unable to load source_file. Unknown file format of specified file path: {}".format(source_file))
+        if source_format is None:
+            if not isinstance(name, str):
+                raise CoreError("Unable to load source_file. source_format must be given for bytes and file objects without a file name")
+
+            # Format is found from the inner extension of compressed files, e.g. data.json.gz
+            source_format = format_from_name(name)
 
+            if source_format is None:
+                raise CoreError("Unable to load source_file. Unknown file format of specified file path: {}".format(source_file))
+        elif source_format not in source_format_names:
+            raise CoreError("Unable to load source_file. Unknown source_format: {}. Valid formats is: {}".format(
+                source_format, ", ".join(source_format_names)))
+
+        if source_format in ("jsonl", "csv", "tsv"):
+            # Records is read one at a time when the source is validated
+            return None, io.BytesIO(source_file) if is_buffer(source_file) else source_file, source_format
+
+        if name is not source_file:
+            return self._parse_source(source_file, source_format), None, source_format
+        elif os.path.getsize(source_file) >= pykwalify.sources.MMAP_THRESHOLD and detect_compression(source_file) is None:
+            log.debug("Memory mapping source_file: %s", source_file)
+
+            data = map_file(source_file)
+            try:
+                return self._parse_source(data, source_format), None, source_format
+            finally:
+                data.close()
+        else:
+            with open_source(source_file) as stream:
+                return self._parse_source(stream, source_format), None, source_format
+
+    def _parse_source(self, data, source_format):
+        """
+        Parse a json or yaml source from a stream or a buffer.
+        """
+        if source_format == "json":
+            try:
+                if is_buffer(data):
+                    # Decoded straight from the buffer, there is no copy of the raw bytes
+                    return json.loads(codecs.decode(data, "utf-8"))
+                return json.load(data)
+            except Exception:
+                raise CoreError("Unable to load any data from source json file")
+
+        try:
+            if is_buffer(data) and not isinstance(data, mmap.mmap):
+                data = codecs.decode(data, "utf-8")
+
+            # A mmap is read by the yaml reader in chunks like any other stream
+            return yaml.load(data, Loader=pykwalify.yaml_loader)
+        except Exception:
+            raise CoreError("Unable to load any data from source yaml file")
+
+    def _load_schema(self, schema_files, schema_data):
+        """
+        Load all schema files into self.schema. If no schema files is specified
+        the schema_data variable is used instead.
+        """
         if not isinstance(schema_files, list):
             raise CoreError("schema_files must be of list type")
 
@@ -74,14 +238,16 @@ class Core(object):
                 if not os.path.exists(f):
                     raise CoreError("Provided source_file do not exists on disk : {0}".format(f))
 
-                with open(f, "r") as stream:
-                    if f.endswith(".json"):
+                name = strip_compression_extension(f)
+
+                with open_source(f) as stream:
+                    if name.endswith(".json"):
                         try:
                             data = json.load(stream)
                         except Exception:
                             raise CoreError("No data loaded from file : {}".format(f))
-                    elif f.endswith(".yaml") or f.endswith(".yml"):
-                        data = yaml.load(stream)
+                    elif name.endswith(".yaml") or name.endswith(".yml"):
+                        data = yaml.load(stream, Loader=pykwalify.yaml_loader)
                         if not data:
                             raise CoreError("No data loaded from file : {}".format(f))
                     else:
@@ -95,21 +261,15 @@ class Core(object):
 
             self.schema = schema_data
 
-        # Nothing was loaded so try the source_data variable
-        if self.source is None:
-            log.debug("No source file loaded, trying source data variable")
-            self.source = source_data
         if self.schema is None:
             log.debug("No schema file loaded, trying schema data variable")
             self.schema = schema_data
 
-        # Test if anything was loaded
-        if self.source is None:
-            raise CoreError("No source file/data was loaded")
-        if self.schema is None:
-            raise CoreError("No schema file/data was loaded")
-
-        # Merge any extensions defined in the schema with the provided list of extensions from the cli
+    def _init_extensions(self):
+        """
+        Merge any extensions defined in the schema with the provided list of extensions from the cli
+        and load all of them.
+        """
         for f in self.schema.get('extensions', []):
             self.extensions.append(f)
 
@@ -122,7 +282,7 @@ class Core(object):
         """
         Load all extension files into the namespace pykwalify.ext
         """
-        log.debug("loading all extensions : {}".format(self.extensions))
+        log.debug("loading all extensions : %s", self.extensions)
 
         self.loaded_extensions = []
 
@@ -136,44 +296,185 @@ class Core(object):
             self.loaded_extensions.append(imp.load_source("", f))
 
         log.debug(self.loaded_extensions)
-        log.debug([dir(m) for m in self.loaded_extensions])
 
-    def validate(self, raise_exception=True):
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug([dir(m) for m in self.loaded_extensions])
+
+    def validate(self, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        :param fail_fast:
+            Stop the validation when the first error is found. Same as max_errors=1.
+        :param max_errors:
+            Stop the validation when this many errors is found.
+        :param summary:
+            Group all errors by rule and path template and only keep the number of errors
+            and a few samples for each group. validation_errors will contain one message per group.
+
+        Return the validated source. For json lines and csv files None is returned since
+        the records is validated one at a time and not kept.
+        """
         log.debug("starting core")
 
-        errors = self._start_validate(self.source)
-        self.validation_errors = [str(error) for error in errors]
+        if self.source_file is not None:
+            # The records is validated one at a time and is not kept
+            errors = self._new_errors(1 if fail_fast else max_errors, summary)
+            self._validate_source_file(errors)
+            self._handle_errors(errors, raise_exception)
+            return None
+
+        errors = self._start_validate(self.source, max_errors=1 if fail_fast else max_errors, summary=summary)
+        self._handle_errors(errors, raise_exception)
+
+        # Return validated data
+        return self.source
+
+    def is_valid(self):
+        """
+        Return True if the source is valid. Validation stops at the first error and
+        no error message is ever built.
+        """
+        if self.source_file is not None:
+            errors = self._new_errors(max_errors=1)
+
+            try:
+                self._validate_source_file(errors)
+            except (NotMappingError, NotSequenceError):
+                return False
+
+            return len(errors) == 0
+
+        return self._is_valid(self.source)
+
+    def _is_valid(self, value):
+        try:
+            errors = self._start_validate(value, max_errors=1)
+        except (NotMappingError, NotSequenceError):
+            return False
+
+        return len(errors) == 0
+
+    def iter_errors(self):
+        """
+        Validate the source and yield each error as soon as it is found.
+
+        The traversal is paused until the consumer asks for the next error and is stopped
+        when the consumer stops iterating, so no errors is accumulated. Errors is not stored
+        in validation_errors.
+        """
+        if self.source_file is not None:
+            return self._iter_errors(lambda walker, errors: self._walk_records(walker, self.source_file, self.source_format, errors))
+
+        return self._iter_errors(lambda walker, errors: walker.node(self.source, self.compile(), "", errors))
+
+    def _iter_errors(self, walk):
+        """
+        Walk the data with the generator walk(walker, errors) and yield the errors found in each
+        chunk of nodes before the next chunk is validated. The coroutine extension functions called
+        in a chunk is awaited at the end of the chunk.
+        """
+        errors = []
+        steps = walk(_Walker(self, ITER_ERRORS_CHUNK_SIZE), errors)
+        running = True
+
+        try:
+            # The last step is the errors found after the last chunk
+            while running:
+                with self._awaited_funcs(errors):
+                    running = self._step(steps)
+
+                for error in errors:
+                    yield error
+
+                del errors[:]
+        finally:
+            steps.close()
+
+    def _step(self, steps):
+        """
+        Run the generator steps to its next yield and return False when it is done.
+        """
+        for _ in steps:
+            return True
+
+        return False
+
+    def _funcs_steps(self, steps, errors):
+        """
+        Generator that runs steps with errors as the target of the coroutine extension functions,
+        see _funcs_target(). The target is only set while a step runs as a context manager can not
+        be kept open across a yield.
+        """
+        running = True
+
+        while running:
+            with self._funcs_target(errors):
+                running = self._step(steps)
+
+            if running:
+                yield
+
+    @property
+    def validation_errors(self):
+        """
+        Messages for all errors found by the latest validation. They are formatted when this is read.
+        """
+        if self.validation_errors_exceptions is None:
+            return None
+
+        return _error_messages(self.validation_errors_exceptions)
+
+    def _handle_errors(self, errors, raise_exception):
         self.validation_errors_exceptions = errors
 
         if errors is None or len(errors) == 0:
             log.info("validation.valid")
         else:
             log.error("validation.invalid")
-            log.error(" --- All found errors ---")
-            log.error(errors)
+            log.error(" --- Found %s errors ---", len(errors))
+
+            # Only the first errors is formatted, all of them can be read from validation_errors.
+            # A summary is logged as its lines, one for each group of errors.
+            if isinstance(errors, ErrorSummary):
+                lines, kind = errors.lines(), "error groups"
+            else:
+                lines, kind = errors, "errors"
+
+            for line in itertools.islice(lines, LOGGED_ERRORS):
+                log.error(" - %s", line)
+
+            if len(lines) > LOGGED_ERRORS:
+                log.error(" - ... %s more %s", len(lines) - LOGGED_ERRORS, kind)
+
             if raise_exception:
+                # Built from errors and not from self, that can be set by a validation in another thread
                 raise SchemaError("Schema validation failed:\n - {error_msg}.".format(
-                    error_msg='.\n - '.join(self.validation_errors)))
+                    error_msg='.\n - '.join(_error_messages(errors))))
             else:
                 log.error("Errors found but will not raise exception...")
 
-        # Return validated data
-        return self.source
+    def compile(self):
+        """
+        Build the rule tree for the loaded schema and return the root rule.
 
-    def _start_validate(self, value=None):
-        path = ""
-        errors = []
-        done = []
+        All 'schema;' partials is registered, every 'include' is linked to the partial
+        rule it points to and every 'func' is bound to the extension function that
+        implements it. The rule tree is only built once, calling this method again
+        returns the already built root rule.
+        """
+        if self.root_rule is not None:
+            return self.root_rule
 
         s = {}
+        partial_rules = []
 
         # Look for schema; tags so they can be parsed before the root rule is parsed
         for k, v in self.schema.items():
             if k.startswith("schema;"):
-                log.debug("Found partial schema; : {}".format(v))
+                log.debug("Found partial schema; : %s", v)
                 r = Rule(schema=v)
-                log.debug(" Partial schema : {}".format(r))
+                log.debug(" Partial schema : %s", r)
                 pykwalify.partial_schemas[k.split(";", 1)[1]] = r
+                partial_rules.append(r)
             else:
                 # readd all items that is not schema; so they can be parsed
                 s[k] = v
@@ -182,380 +483,857 @@ class Core(object):
 
         log.debug("Building root rule object")
         root_rule = Rule(schema=self.schema)
-        self.root_rule = root_rule
         log.debug("Done building root rule")
-        log.debug("Root rule: {}".format(self.root_rule))
-
-        self._validate(value, root_rule, path, errors, done)
+        log.debug("Root rule: %s", root_rule)
 
-        return errors
+        seen = set()
+        for r in partial_rules + [root_rule]:
+            self._link_rule(r, seen)
 
-    def _validate(self, value, rule, path, errors, done):
-        log.debug("{}".format(rule))
-        log.debug("Core validate")
-        log.debug(" ? Rule: {}".format(rule._type))
-        log.debug(" ? Seq: {}".format(rule._sequence))
-        log.debug(" ? Map: {}".format(rule._mapping))
+        self._check_coroutine_funcs(root_rule, False, set())
 
-        if rule._required and self.source is None:
-            raise CoreError("required.novalue : {}".format(path))
+        self.root_rule = root_rule
 
-        log.debug(" ? ValidateRule: {}".format(rule))
-        if rule._include_name is not None:
-            self._validate_include(value, rule, path, errors, done=None)
-        elif rule._sequence is not None:
-            self._validate_sequence(value, rule, path, errors, done=None)
-        elif rule._mapping is not None or rule._allowempty_map:
-            self._validate_mapping(value, rule, path, errors, done=None)
-        else:
-            self._validate_scalar(value, rule, path, errors, done=None)
+        return root_rule
 
-    def _handle_func(self, value, rule, path, errors, done=None):
-        """
-        Helper function that should check if func is specified for this rule and
-        then handle it for all cases in a generic way.
+    def _link_rule(self, rule, seen):
         """
-        func = rule._func
+        Resolve include and func references for rule and all its child rules.
 
-        # func keyword is not defined so nothing to do
-        if not func:
+        Includes that point to a partial schema that do not exist and funcs that can't be
+        found in any extension is left unresolved so they are reported during validation.
+        """
+        if id(rule) in seen:
             return
 
-        found_method = False
+        seen.add(id(rule))
 
-        for extension in self.loaded_extensions:
-            method = getattr(extension, func, None)
-            if method:
-                found_method = True
+        if rule._include_name is not None:
+            rule._include_rule = pykwalify.partial_schemas.get(rule._include_name, None)
 
-                # No exception will should be caught. If one is raised it should bubble up all the way.
-                ret = method(value, rule, path)
+        if rule._func:
+            rule._func_method = self._find_func(rule._func)
 
-                # If False or None or some other object that is interpreted as False
-                if not ret:
-                    raise CoreError("Error when running extension function : {}".format(func))
+        if rule._pattern_regexp is not None and self.pattern_cache_size > 0:
+            rule._pattern_cache = PatternMatchCache(rule._pattern_regexp, self.pattern_cache_size)
 
-                # Only run the first matched function. Sinc loading order is determined
-                # it should be easy to determine which file is used before others
-                break
+        for r in rule._sequence or []:
+            self._link_rule(r, seen)
 
-        if not found_method:
-            raise CoreError("Did not find method '{}' in any loaded extension file".format(func))
+        for r in (rule._mapping or {}).values():
+            self._link_rule(r, seen)
 
-    def _validate_include(self, value, rule, path, errors, done=None):
-        # TODO: It is difficult to get a good test case to trigger this if case
-        if rule._include_name is None:
-            errors.append(SchemaError.SchemaErrorEntry(
-                msg='Include name not valid',
-                path=path,
-                value=value))
+    def _check_coroutine_funcs(self, rule, in_matching, seen):
+        """
+        Raise CoreError if a coroutine extension function is used below a sequence with more than
+        one rule or with matching '*'. The coroutines is awaited when the walk is done, so their
+        result can't decide which rule a sequence item matches or be dropped with the item.
+        """
+        if (id(rule), in_matching) in seen:
             return
 
-        include_name = rule._include_name
-        partial_schema_rule = pykwalify.partial_schemas.get(include_name, None)
-        if not partial_schema_rule:
-            errors.append(SchemaError.SchemaErrorEntry(
-                msg="Cannot find partial schema with name '{include_name}'. Existing partial schemas: '{existing_schemas}'. Path: '{path}'",
-                path=path,
-                value=value,
-                include_name=include_name,
-                existing_schemas=", ".join(sorted(pykwalify.partial_schemas.keys()))))
-            return
+        seen.add((id(rule), in_matching))
 
-        self._validate(value, partial_schema_rule, path, errors, done)
+        if in_matching and rule._func_method is not None and _iscoroutinefunction(rule._func_method):
+            raise CoreError("Coroutine extension function '{}' can't be used in a sequence with more than one rule or with matching '*'".format(rule._func))
 
-    def _validate_sequence(self, value, rule, path, errors, done=None):
-        log.debug("Core Validate sequence")
-        log.debug(" * Data: {}".format(value))
-        log.debug(" * Rule: {}".format(rule))
-        log.debug(" * RuleType: {}".format(rule._type))
-        log.debug(" * Path: {}".format(path))
-        log.debug(" * Seq: {}".format(rule._sequence))
-        log.debug(" * Map: {}".format(rule._mapping))
+        if rule._sequence:
+            matching = in_matching or len(rule._sequence) > 1 or rule._matching == "*"
 
-        if len(rule._sequence) <= 0:
-            raise CoreError("Sequence must contains atleast one item : {}".format(path))
+            for r in rule._sequence:
+                self._check_coroutine_funcs(r, matching, seen)
 
-        if value is None:
-            log.debug("Core seq: sequence data is None")
-            return
+        for r in (rule._mapping or {}).values():
+            self._check_coroutine_funcs(r, in_matching, seen)
 
-        if not isinstance(value, list):
-            raise NotSequenceError("Value: {} is not of a sequence type".format(value))
+        if rule._include_rule is not None:
+            self._check_coroutine_funcs(rule._include_rule, in_matching, seen)
 
-        # Handle 'func' argument on this sequence
-        self._handle_func(value, rule, path, errors, done)
+    def pattern_cache_stats(self):
+        """
+        Return hit/miss statistics for the pattern match cache of each rule that has one.
+        """
+        return [rule._pattern_cache.stats() for rule in self._rules() if rule._pattern_cache is not None]
 
-        ok_values = []
-        error_tracker = []
+    def _rules(self):
+        """
+        Return every rule in the rule tree once. The rules is always returned in the same
+        order for the same schema, so a rule can be found by its position in the list in
+        another process that compiled the same schema.
+        """
+        rules = []
+        seen = set()
 
-        unique_errors = {}
-        map_unique_errors = {}
+        def collect(rule):
+            if id(rule) in seen:
+                return
+            seen.add(id(rule))
+            rules.append(rule)
 
-        for i, item in enumerate(value):
-            processed = []
+            for r in (rule._sequence or []) + list((rule._mapping or {}).values()) + [rule._include_rule]:
+                if r is not None:
+                    collect(r)
 
-            for r in rule._sequence:
-                tmp_errors = []
+        if self.root_rule is not None:
+            collect(self.root_rule)
 
-                try:
-                    self._validate(item, r, "{}/{}".format(path, i), tmp_errors, done)
-                except NotMappingError:
-                    # For example: If one type was specified as 'map' but data
-                    # was 'str' a exception will be thrown but we should ignore it
-                    pass
-                except NotSequenceError:
-                    # For example: If one type was specified as 'seq' but data
-                    # was 'str' a exception will be thrown but we shold ignore it
-                    pass
+        return rules
 
-                processed.append(tmp_errors)
+    def _validate_source_file(self, errors):
+        """
+        Validate the records in the source file that was not loaded, e.g. a json lines or csv file.
+        """
+        self._validate_records(self.source_file, self.source_format, errors)
 
-                if r._type == "map":
-                    log.debug("Found map inside sequence")
-                    unique_keys = []
-
-                    for k, _rule in r._mapping.items():
-                        log.debug("Key: {}".format(k))
-                        log.debug("Rule: {}".format(_rule))
-
-                        if _rule._unique or _rule._ident:
-                            unique_keys.append(k)
-
-                    if len(unique_keys) > 0:
-                        for v in unique_keys:
-                            table = {}
-                            for j, V in enumerate(value):
-                                val = V[v]
-                                if val is None:
-                                    continue
-                                if val in table:
-                                    curr_path = "{}/{}/{}".format(path, j, v)
-                                    prev_path = "{}/{}/{}".format(path, table[val], v)
-                                    s = SchemaError.SchemaErrorEntry(
-                                        msg="Value '{duplicate}' is not unique. Previous path: '{prev_path}'. Path: '{path}'",
-                                        path=curr_path,
-                                        value=value,
-                                        duplicate=val,
-                                        prev_path=prev_path,
-                                    )
-                                    map_unique_errors[s.__repr__()] = s
-                                else:
-                                    table[val] = j
-                elif r._unique:
-                    log.debug("Found unique value in sequence")
-                    table = {}
-
-                    for j, val in enumerate(value):
-                        if val is None:
-                            continue
-
-                        if val in table:
-                            curr_path = "{}/{}".format(path, j)
-                            prev_path = "{}/{}".format(path, table[val])
-                            s = SchemaError.SchemaErrorEntry(
-                                msg="Value '{duplicate}' is not unique. Previous path: '{prev_path}'. Path: '{path}'",
-                                path=curr_path,
-                                value=value,
-                                duplicate=val,
-                                prev_path=prev_path,
-                            )
-                            unique_errors[s.__repr__()] = s
-                        else:
-                            table[val] = j
-
-            error_tracker.append(processed)
-            no_errors = []
-            for _errors in processed:
-                no_errors.append(len(_errors) == 0)
+    def _validate_records(self, source_file, source_format, errors):
+        """
+        Validate the records in a json lines, csv or tsv source_file.
+        """
+        try:
+            if source_format == "jsonl":
+                self._read_source(source_file, lambda stream: self._validate_lines(stream, errors))
+            else:
+                delimiter = "\t" if source_format == "tsv" else ","
+                self._read_source(source_file, lambda stream: self._validate_csv(stream, errors, delimiter), newline="")
+        except ErrorLimitReached:
+            log.debug("Validation stopped after %s errors", len(errors))
 
-            if rule._matching == "any":
-                log.debug("any rule {}".format(True in no_errors))
-                ok_values.append(True in no_errors)
-            elif rule._matching == "all":
-                log.debug("all rule".format(all(no_errors)))
-                ok_values.append(all(no_errors))
-            elif rule._matching == "*":
-                log.debug("star rule", "...")
-                ok_values.append(True)
+    def _read_source(self, source_file, read, newline=None):
+        """
+        Call read with a stream for source_file, that is either a path or an open file object.
+        newline is used when a path is opened, see pykwalify.sources.open_source().
+        """
+        with self._source_stream(source_file, newline) as stream:
+            return read(stream)
 
-        for _error in unique_errors:
-            errors.append(_error)
+    @contextlib.contextmanager
+    def _source_stream(self, source_file, newline=None):
+        """
+        Context manager for a stream for source_file. A path is opened and closed, an open file object is used as it is.
+        """
+        if hasattr(source_file, "read"):
+            yield source_file
+            return
 
-        for _error in map_unique_errors:
-            errors.append(_error)
+        if not os.path.exists(source_file):
+            raise CoreError("Provided source_file do not exists on disk: {}".format(source_file))
 
-        log.debug("ok : {}".format(ok_values))
+        with open_source(source_file, newline) as stream:
+            yield stream
 
-        # All values must pass the validation, otherwise add the parsed errors
-        # to the global error list and throw up some error.
-        if not all(ok_values):
-            # Ignore checking for '*' type because it should allways go through
-            if rule._matching == "any":
-                log.debug("Value: {0} did not validate against one or more sequence schemas".format(value))
-            elif rule._matching == "all":
-                log.debug("Value: {0} did not validate against all possible sequence schemas".format(value))
+    def _walk_records(self, walker, source_file, source_format, errors):
+        """
+        Generator that validates the records in a json lines, csv or tsv source_file with walker, see _validate_records().
+        """
+        newline = None if source_format == "jsonl" else ""
 
-            for i in range(len(ok_values)):
-                for error in error_tracker[i]:
-                    for e in error:
-                        errors.append(e)
+        with self._source_stream(source_file, newline) as stream:
+            if source_format == "jsonl":
+                rule = self.compile()
 
-        log.debug("Core seq: validation recursivley done...")
+                for i, record in self._iter_lines(stream):
+                    record_errors = DocumentErrors(errors, line=i)
 
-        if rule._range is not None:
-            rr = rule._range
+                    for _ in self._funcs_steps(walker.node(record, rule, "", record_errors), record_errors):
+                        yield
+            else:
+                delimiter = "\t" if source_format == "tsv" else ","
+                rows = iter_csv_rows(text_stream(stream), delimiter)
 
-            self._validate_range(
-                rr.get("max", None),
-                rr.get("min", None),
-                rr.get("max-ex", None),
-                rr.get("min-ex", None),
-                errors,
-                len(value),
-                path,
-                "seq",
-            )
+                for _ in walker.sequence_items(rows, self._root_sequence_rule(), "", errors):
+                    yield
 
-    def _validate_mapping(self, value, rule, path, errors, done=None):
-        log.debug("Validate mapping")
-        log.debug(" + Data: {}".format(value))
-        log.debug(" + Rule: {}".format(rule))
-        log.debug(" + RuleType: {}".format(rule._type))
-        log.debug(" + Path: {}".format(path))
-        log.debug(" + Seq: {}".format(rule._sequence))
-        log.debug(" + Map: {}".format(rule._mapping))
+    def _validate_lines(self, stream, errors):
+        """
+        Validate each line in stream as one json record. Empty lines is skipped.
+        """
+        count = 0
+        start = time.time()
 
-        if rule._mapping is None:
-            log.debug(" + No rule to apply, prolly because of allowempty: True")
-            return
+        try:
+            with self._awaited_funcs(errors):
+                for i, record in self._iter_lines(stream):
+                    count += 1
+                    record_errors = DocumentErrors(errors, line=i)
 
-        # Handle 'func' argument on this mapping
-        self._handle_func(value, rule, path, errors, done)
+                    with self._funcs_target(record_errors):
+                        self._validate_root(record, record_errors)
+        except ErrorLimitReached:
+            log.debug("Validation stopped after %s errors", len(errors))
 
-        m = rule._mapping
-        log.debug(" + RuleMapping: {}".format(m))
+        elapsed = time.time() - start
+        log.info("Validated %s records in %.2f sec (%.0f records/sec)", count, elapsed, count / elapsed if elapsed > 0 else 0)
 
-        if not isinstance(value, dict):
-            raise NotMappingError("Value: {} is not of a mapping type".format(value))
+        return count
 
-        if rule._range is not None:
-            r = rule._range
+    def _iter_lines(self, stream):
+        """
+        Yield (line number, record) for each line in a json lines stream. Empty lines is skipped.
+        """
+        for i, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
 
-            self._validate_range(
-                r.get("max", None),
-                r.get("min", None),
-                r.get("max-ex", None),
-                r.get("min-ex", None),
-                errors,
-                len(value),
-                path,
-                "map",
-            )
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise CoreError("Unable to load record on line {} from source json lines file: {}".format(i, e))
 
-        for k, rr in m.items():
-            if rr._required and k not in value:
+            yield i, record
+
+    def _validate_csv(self, stream, errors, delimiter=","):
+        """
+        Validate each row in a csv stream as one mapping in the root sequence.
+        """
+        # The csv module can only read text
+        with self._awaited_funcs(errors):
+            count = self._validate_sequence_items(iter_csv_rows(text_stream(stream), delimiter), self._root_sequence_rule(), "", errors)
+        log.info("Validated %s rows", count)
+
+        return count
+
+    def _root_sequence_rule(self):
+        """
+        Return the root rule, with includes resolved, for sources that is validated one item at a time.
+        """
+        rule = self.compile()
+
+        while rule._include_name is not None and rule._include_rule is not None:
+            rule = rule._include_rule
+
+        if rule._sequence is None:
+            raise CoreError("The root rule must be a sequence to validate the source one item at a time")
+
+        return rule
+
+    def _new_errors(self, max_errors=None, summary=False):
+        """
+        Return the collector that errors is appended to during validation.
+        """
+        if summary:
+            return ErrorSummary(max_errors=max_errors)
+        elif max_errors:
+            return ErrorList(max_errors)
+        else:
+            return []
+
+    def _start_validate(self, value=None, max_errors=None, summary=False):
+        errors = self._new_errors(max_errors, summary)
+
+        try:
+            with self._awaited_funcs(errors):
+                self._validate_root(value, errors)
+        except ErrorLimitReached:
+            log.debug("Validation stopped after %s errors", len(errors))
+
+        return errors
+
+    def _validate_root(self, value, errors):
+        path = ""
+        done = []
+
+        root_rule = self.compile()
+
+        self._validate(value, root_rule, path, errors, done)
+
+    def _validate(self, value, rule, path, errors, done):
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%s", rule)
+            log.debug("Core validate")
+            log.debug(" ? Rule: %s", rule._type)
+            log.debug(" ? Seq: %s", rule._sequence)
+            log.debug(" ? Map: %s", rule._mapping)
+
+        if rule._required and value is None and path == "":
+            raise CoreError("required.novalue : {}".format(path))
+
+        log.debug(" ? ValidateRule: %s", rule)
+        if rule._include_name is not None:
+            self._validate_include(value, rule, path, errors, done=None)
+        elif rule._sequence is not None:
+            self._validate_sequence(value, rule, path, errors, done=None)
+        elif rule._mapping is not None or rule._allowempty_map:
+            self._validate_mapping(value, rule, path, errors, done=None)
+        else:
+            self._validate_scalar(value, rule, path, errors, done=None)
+
+    def _find_func(self, func):
+        """
+        Find the first loaded extension that implements func. Since loading order is
+        determined it should be easy to determine which file is used before others.
+        """
+        for extension in self.loaded_extensions:
+            method = getattr(extension, func, None)
+            if method:
+                return method
+
+        return None
+
+    def _handle_func(self, value, rule, path, errors, done=None):
+        """
+        Helper function that should check if func is specified for this rule and
+        then handle it for all cases in a generic way.
+        """
+        func = rule._func
+
+        # func keyword is not defined so nothing to do
+        if not func:
+            return
+
+        method = rule._func_method or self._find_func(func)
+
+        if not method:
+            raise CoreError("Did not find method '{}' in any loaded extension file".format(func))
+
+        # No exception will should be caught. If one is raised it should bubble up all the way.
+        self._func_result(method(value, rule, path), value, rule, path, errors)
+
+    @contextlib.contextmanager
+    def _deferred_funcs(self, pending, errors, batch_size=None):
+        """
+        While the block runs, the awaitables returned by coroutine extension functions in this
+        thread is appended to pending as (awaitable, value, rule, path, errors) instead of being
+        awaited, errors is the collector that their errors is added to. With batch_size they are
+        awaited in a new event loop each time there is batch_size of them, the caller must await
+        the rest, see pykwalify.aio.run_funcs().
+        """
+        previous = getattr(self._local, "deferred", None)
+        self._local.deferred = (pending, errors, batch_size)
+
+        try:
+            yield pending
+        finally:
+            self._local.deferred = previous
+
+    @contextlib.contextmanager
+    def _funcs_target(self, errors):
+        """
+        Add the errors of the coroutine extension functions that is deferred in the block to
+        errors, e.g. the collector that tags the errors with the line of a record.
+        """
+        deferred = getattr(self._local, "deferred", None)
+
+        if deferred is None:
+            yield
+            return
+
+        self._local.deferred = (deferred[0], errors, deferred[2])
+
+        try:
+            yield
+        finally:
+            self._local.deferred = deferred
+
+    @contextlib.contextmanager
+    def _awaited_funcs(self, errors):
+        """
+        Defer the coroutine extension functions called in the block and await them in a new event
+        loop, func_concurrency at a time and the rest when the block is done. Sources with many
+        records, e.g. json lines, share one batch so the functions of many records run together.
+        """
+        pending = []
+
+        try:
+            with self._deferred_funcs(pending, errors, self.func_concurrency):
+                yield
+
+            self._await_funcs(pending)
+        finally:
+            _close_pending(pending)
+
+    def _await_funcs(self, pending):
+        if not pending:
+            return
+
+        from pykwalify.aio import run_funcs_sync
+
+        try:
+            run_funcs_sync(pending, self.func_concurrency)
+        finally:
+            del pending[:]
+
+    def _func_result(self, ret, value, rule, path, errors):
+        """
+        Handle the return value of the extension function for rule.
+        """
+        if _isawaitable(ret):
+            deferred = getattr(self._local, "deferred", None)
+
+            if deferred is None:
+                # Nothing will gather it so it is awaited right away
+                from pykwalify.aio import run_funcs_sync
+                run_funcs_sync([(ret, value, rule, path, errors)], 1)
+                return
+
+            pending, target, batch_size = deferred
+            pending.append((ret, value, rule, path, target))
+
+            if batch_size is not None and len(pending) >= batch_size:
+                self._await_funcs(pending)
+
+            return
+
+        # If False or None or some other object that is interpreted as False
+        if not ret:
+            raise CoreError("Error when running extension function : {}".format(rule._func))
+
+    def _validate_include(self, value, rule, path, errors, done=None):
+        # TODO: It is difficult to get a good test case to trigger this if case
+        if rule._include_name is None:
+            errors.append(SchemaError.SchemaErrorEntry(
+                msg='Include name not valid',
+                path=path,
+                value=value,
+                rule=rule))
+            return
+
+        include_name = rule._include_name
+        partial_schema_rule = rule._include_rule or pykwalify.partial_schemas.get(include_name, None)
+        if not partial_schema_rule:
+            errors.append(SchemaError.SchemaErrorEntry(
+                msg="Cannot find partial schema with name '{include_name}'. Existing partial schemas: '{existing_schemas}'. Path: '{path}'",
+                path=path,
+                value=value,
+                rule=rule,
+                include_name=include_name,
+                existing_schemas=", ".join(sorted(pykwalify.partial_schemas.keys()))))
+            return
+
+        self._validate(value, partial_schema_rule, path, errors, done)
+
+    def _validate_sequence(self, value, rule, path, errors, done=None):
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Core Validate sequence")
+            log.debug(" * Data: %s", value)
+            log.debug(" * Rule: %s", rule)
+            log.debug(" * RuleType: %s", rule._type)
+            log.debug(" * Path: %s", path)
+            log.debug(" * Seq: %s", rule._sequence)
+            log.debug(" * Map: %s", rule._mapping)
+
+        if len(rule._sequence) <= 0:
+            raise CoreError("Sequence must contains atleast one item : {}".format(path))
+
+        if value is None:
+            log.debug("Core seq: sequence data is None")
+            return
+
+        if not isinstance(value, list):
+            raise NotSequenceError("Value: {} is not of a sequence type".format(value))
+
+        # Handle 'func' argument on this sequence
+        self._handle_func(value, rule, path, errors, done)
+
+        # Cheap checks on the sequence itself is done before any item is validated
+        if rule._range is not None:
+            rr = rule._range
+
+            self._validate_range(
+                rr.get("max", None),
+                rr.get("min", None),
+                rr.get("max-ex", None),
+                rr.get("min-ex", None),
+                errors,
+                len(value),
+                path,
+                "seq",
+                rule,
+            )
+
+        self._validate_unique(value, rule, path, errors)
+
+        # Errors for the items is kept until the first item that is not valid is found.
+        # After that all errors, for earlier and later items, should be reported.
+        error_tracker = []
+        failed = False
+
+        for i, item in enumerate(value):
+            processed = []
+
+            for r in rule._sequence:
+                tmp_errors = []
+
+                try:
+                    self._validate(item, r, "{}/{}".format(path, i), tmp_errors, done)
+                except NotMappingError:
+                    # For example: If one type was specified as 'map' but data
+                    # was 'str' a exception will be thrown but we should ignore it
+                    pass
+                except NotSequenceError:
+                    # For example: If one type was specified as 'seq' but data
+                    # was 'str' a exception will be thrown but we shold ignore it
+                    pass
+
+                processed.append(tmp_errors)
+
+            no_errors = []
+            for _errors in processed:
+                no_errors.append(len(_errors) == 0)
+
+            if rule._matching == "any":
+                log.debug("any rule %s", True in no_errors)
+                ok = True in no_errors
+            elif rule._matching == "all":
+                log.debug("all rule %s", all(no_errors))
+                ok = all(no_errors)
+            else:
+                # Ignore checking for '*' type because it should allways go through
+                log.debug("star rule")
+                ok = True
+
+            if not failed:
+                if ok:
+                    # Only errors that a later invalid item can report is kept, that never happens with '*'
+                    if rule._matching != "*" and not all(no_errors):
+                        error_tracker.append(processed)
+                    continue
+
+                if rule._matching == "any":
+                    log.debug("Value: %s did not validate against one or more sequence schemas", value)
+                elif rule._matching == "all":
+                    log.debug("Value: %s did not validate against all possible sequence schemas", value)
+
+                failed = True
+
+                for _processed in error_tracker:
+                    for _errors in _processed:
+                        errors.extend(_errors)
+
+                error_tracker = None
+
+            for _errors in processed:
+                errors.extend(_errors)
+
+        log.debug("Core seq: validation recursivley done...")
+
+    def _validate_sequence_items(self, items, rule, path, errors):
+        """
+        Validate the items of a sequence that is only available as an iterator, e.g. a
+        json array that is read one item at a time, and return the number of items.
+
+        Each item is validated when it is produced and is not kept. range and unique is
+        checked after the last item so their errors is reported after the errors for the items.
+        """
+        if rule._func:
+            raise CoreError("func can't be used on a sequence that is validated one item at a time : {}".format(path))
+
+        index = UniqueIndex(rule, path) if rule._unique_items or rule._unique_keys else None
+
+        # Same rules as in _validate_sequence, but only items that has errors is tracked
+        error_tracker = []
+        failed = False
+        count = 0
+
+        for i, item in enumerate(items):
+            count += 1
+
+            if index is not None:
+                index.add(i, item)
+
+            processed = []
+
+            for r in rule._sequence:
+                tmp_errors = []
+
+                try:
+                    self._validate(item, r, "{}/{}".format(path, i), tmp_errors, None)
+                except (NotMappingError, NotSequenceError):
+                    pass
+
+                processed.append(tmp_errors)
+
+            no_errors = [len(_errors) == 0 for _errors in processed]
+
+            if rule._matching == "any":
+                ok = True in no_errors
+            elif rule._matching == "all":
+                ok = all(no_errors)
+            else:
+                ok = True
+
+            if not failed:
+                if ok:
+                    # Only errors that a later invalid item can report is kept, that never happens with '*'
+                    if rule._matching != "*" and not all(no_errors):
+                        error_tracker.append(processed)
+                    continue
+
+                failed = True
+
+                for _processed in error_tracker:
+                    for _errors in _processed:
+                        errors.extend(_errors)
+
+                error_tracker = None
+
+            for _errors in processed:
+                errors.extend(_errors)
+
+        if rule._range is not None:
+            rr = rule._range
+
+            self._validate_range(
+                rr.get("max", None),
+                rr.get("min", None),
+                rr.get("max-ex", None),
+                rr.get("min-ex", None),
+                errors,
+                count,
+                path,
+                "seq",
+                rule,
+            )
+
+        if index is not None:
+            index.report(errors)
+
+        return count
+
+    def _validate_sequence_chunk(self, items, start, rule, path, errors, max_errors=None):
+        """
+        Validate items, that is the part of a sequence that starts at index start, and add
+        the errors for all items to errors.
+
+        Return True if any item did not validate according to the matching rule of the
+        sequence. The errors is only reported if any part of the sequence did not validate,
+        the same way as in _validate_sequence. Validation stops when max_errors is found
+        and it is known that the errors is reported.
+        """
+        failed = False
+
+        for i, item in enumerate(items, start):
+            processed = []
+
+            for r in rule._sequence:
+                tmp_errors = []
+
+                try:
+                    self._validate(item, r, "{}/{}".format(path, i), tmp_errors, None)
+                except (NotMappingError, NotSequenceError):
+                    pass
+
+                processed.append(tmp_errors)
+
+            no_errors = [len(_errors) == 0 for _errors in processed]
+
+            if rule._matching == "any":
+                failed = failed or True not in no_errors
+            elif rule._matching == "all":
+                failed = failed or not all(no_errors)
+            else:
+                # Errors is never reported with '*' so they are not kept
+                continue
+
+            for _errors in processed:
+                errors.extend(_errors)
+
+            if failed and max_errors is not None and len(errors) >= max_errors:
+                break
+
+        return failed
+
+    def _validate_unique(self, value, rule, path, errors):
+        """
+        Validate the unique and ident constraints of the sequence rules against all items in value.
+
+        All constraints is checked in one single pass over the sequence, see UniqueIndex.
+        """
+        if not rule._unique_items and not rule._unique_keys:
+            return
+
+        log.debug("Found unique values in sequence")
+
+        index = UniqueIndex(rule, path)
+
+        for j, item in enumerate(value):
+            index.add(j, item)
+
+        index.report(errors)
+
+    def _validate_mapping(self, value, rule, path, errors, done=None):
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Validate mapping")
+            log.debug(" + Data: %s", value)
+            log.debug(" + Rule: %s", rule)
+            log.debug(" + RuleType: %s", rule._type)
+            log.debug(" + Path: %s", path)
+            log.debug(" + Seq: %s", rule._sequence)
+            log.debug(" + Map: %s", rule._mapping)
+
+        if rule._mapping is None:
+            log.debug(" + No rule to apply, prolly because of allowempty: True")
+            return
+
+        # Handle 'func' argument on this mapping
+        self._handle_func(value, rule, path, errors, done)
+
+        log.debug(" + RuleMapping: %s", rule._mapping)
+
+        if not isinstance(value, dict):
+            raise NotMappingError("Value: {} is not of a mapping type".format(value))
+
+        self._validate_mapping_keys(value, rule, path, errors)
+        self._validate_mapping_items(value.items(), value, rule, path, errors, done)
+
+    def _validate_mapping_keys(self, value, rule, path, errors):
+        """
+        Validate the range and the required keys of the mapping value and add the default values.
+        """
+        if rule._range is not None:
+            r = rule._range
+
+            self._validate_range(
+                r.get("max", None),
+                r.get("min", None),
+                r.get("max-ex", None),
+                r.get("min-ex", None),
+                errors,
+                len(value),
+                path,
+                "map",
+                rule,
+            )
+
+        for k in rule._required_keys:
+            if k not in value:
                 errors.append(SchemaError.SchemaErrorEntry(
                     msg="Cannot find required key '{key}'. Path: '{path}'",
                     path=path,
                     value=value,
+                    rule=rule,
                     key=k))
-            if k not in value and rr._default is not None:
-                value[k] = rr._default
-
-        for k, v in value.items():
-            r = m.get(k, None)
-            log.debug(" + m: {}".format(m))
-            log.debug(" + rr: {} {}".format(k, v))
-            log.debug(" + r: {}".format(r))
 
-            regex_mappings = [(regex_rule, re.match(regex_rule._map_regex_rule, str(k))) for regex_rule in rule._regex_mappings]
-            log.debug(" + Mapping Regex matches: {}".format(regex_mappings))
+        for k, default in rule._default_values.items():
+            if k not in value:
+                value[k] = default
 
-            if any(regex_mappings):
-                sub_regex_result = []
+    def _validate_mapping_items(self, items, value, rule, path, errors, done=None):
+        """
+        Validate the (key, value) pairs in items, that is all or a part of the mapping value.
+        """
+        matcher = rule._mapping_matcher
 
-                # Found atleast one that matches a mapping regex
-                for mm in regex_mappings:
-                    if mm[1]:
-                        log.debug(" + Matching regex patter: {}".format(mm[0]))
-                        self._validate(v, mm[0], "{}/{}".format(path, k), errors, done)
-                        sub_regex_result.append(True)
-                    else:
-                        sub_regex_result.append(False)
+        for k, v in items:
+            r = matcher.exact_rules.get(k, None)
+            log.debug(" + rr: %s %s", k, v)
+            log.debug(" + r: %s", r)
 
-                if rule._matching_rule == "any":
-                    if any(sub_regex_result):
-                        log.debug("Matched atleast one regex")
-                    else:
-                        log.debug("No regex matched")
-                        errors.append(SchemaError.SchemaErrorEntry(
-                            msg="Key '{key}' does not match any regex '{regex}'. Path: '{path}'",
-                            path=path,
-                            value=value,
-                            key=k,
-                            regex="  ".join([mm[0]._map_regex_rule for mm in regex_mappings])))
-                elif rule._matching_rule == "all":
-                    if all(sub_regex_result):
-                        log.debug("Matched all regex rules")
-                    else:
-                        log.debug("Did not match all regex rules")
-                        errors.append(SchemaError.SchemaErrorEntry(
-                            msg="Key '{key}' does not match all regex '{regex}'. Path: '{path}'",
-                            path=path,
-                            value=value,
-                            key=k,
-                            regex="  ".join([mm[0]._map_regex_rule for mm in regex_mappings])))
-                else:
-                    log.debug("No mapping rule defined")
-            elif r is None:
-                if not rule._allowempty_map:
-                    errors.append(SchemaError.SchemaErrorEntry(
-                        msg="Key '{key}' was not defined. Path: '{path}'",
-                        path=path,
-                        value=value,
-                        key=k))
-            else:
+            if r is not None:
                 if not r._schema:
                     # validate recursively
-                    log.debug("Core Map: validate recursively: {}".format(r))
+                    log.debug("Core Map: validate recursively: %s", r)
                     self._validate(v, r, "{}/{}".format(path, k), errors, done)
                 else:
                     print(" * Something is ignored Oo : {}".format(r))
+            elif rule._regex_mappings:
+                regex_mappings = matcher.match_regex(k)
+                log.debug(" + Mapping Regex matches: %s", regex_mappings)
+
+                # Found atleast one that matches a mapping regex
+                for regex_rule in regex_mappings:
+                    log.debug(" + Matching regex patter: %s", regex_rule)
+                    self._validate(v, regex_rule, "{}/{}".format(path, k), errors, done)
+
+                self._validate_regex_key(k, regex_mappings, value, rule, path, errors)
+            elif not rule._allowempty_map:
+                errors.append(SchemaError.SchemaErrorEntry(
+                    msg="Key '{key}' was not defined. Path: '{path}'",
+                    path=path,
+                    value=value,
+                    rule=rule,
+                    key=k))
+
+    def _validate_regex_key(self, k, regex_mappings, value, rule, path, errors):
+        """
+        Report the key k if it did not match the regex rules of the mapping as the matching-rule requires.
+        regex_mappings is the rules that the key matched.
+        """
+        if rule._matching_rule == "any":
+            if regex_mappings:
+                log.debug("Matched atleast one regex")
+            else:
+                log.debug("No regex matched")
+                errors.append(SchemaError.SchemaErrorEntry(
+                    msg="Key '{key}' does not match any regex '{regex}'. Path: '{path}'",
+                    path=path,
+                    value=value,
+                    rule=rule,
+                    key=k,
+                    regex="  ".join([mm._map_regex_rule for mm in rule._regex_mappings])))
+        elif rule._matching_rule == "all":
+            if len(regex_mappings) == len(rule._regex_mappings):
+                log.debug("Matched all regex rules")
+            else:
+                log.debug("Did not match all regex rules")
+                errors.append(SchemaError.SchemaErrorEntry(
+                    msg="Key '{key}' does not match all regex '{regex}'. Path: '{path}'",
+                    path=path,
+                    value=value,
+                    rule=rule,
+                    key=k,
+                    regex="  ".join([mm._map_regex_rule for mm in rule._regex_mappings])))
+        else:
+            log.debug("No mapping rule defined")
 
     def _validate_scalar(self, value, rule, path, errors, done=None):
-        log.debug("Validate scalar")
-        log.debug(" # {}".format(value))
-        log.debug(" # {}".format(rule))
-        log.debug(" # {}".format(rule._type))
-        log.debug(" # {}".format(path))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Validate scalar")
+            log.debug(" # %s", value)
+            log.debug(" # %s", rule)
+            log.debug(" # %s", rule._type)
+            log.debug(" # %s", path)
 
         # Handle 'func' argument on this scalar
         self._handle_func(value, rule, path, errors, done)
 
         if rule._enum is not None:
-            if value not in rule._enum:
+            try:
+                found = value in rule._enum_set
+            except TypeError:
+                # Unhashable values, e.g. lists, can never be part of the enum
+                found = False
+
+            if not found:
+                errors.append(SchemaError.SchemaErrorEntry(
+                    msg="Enum '{value}' does not exist. Path: '{path}'",
+                    path=path,
+                    value=value,
+                    rule=rule))
+
+        if rule._enum_file is not None:
+            if value is None or str(value) not in rule._enum_file:
                 errors.append(SchemaError.SchemaErrorEntry(
                     msg="Enum '{value}' does not exist. Path: '{path}'",
                     path=path,
-                    value=value))
+                    value=value,
+                    rule=rule))
 
         # Set default value
         if rule._default and value is None:
             value = rule._default
 
-        self._validate_scalar_type(value, rule._type, errors, path)
+        self._validate_scalar_type(value, rule._type, errors, path, rule)
 
         if value is None:
             return
 
         if rule._pattern is not None:
-            res = re.match(rule._pattern, str(value))
-            if res is None:  # Not matching
+            if not isinstance(value, str):
+                value_str = str(value)
+            else:
+                value_str = value
+
+            if rule._pattern_cache is not None:
+                res = rule._pattern_cache.match(value_str)
+            else:
+                res = rule._pattern_regexp.match(value_str) is not None
+
+            if not res:  # Not matching
                 errors.append(SchemaError.SchemaErrorEntry(
                     msg="Value '{value}' does not match pattern '{pattern}'. Path: '{path}'",
                     path=path,
                     value=value,
+                    rule=rule,
                     pattern=rule._pattern))
 
         if rule._range is not None:
@@ -579,6 +1357,7 @@ class Core(object):
                 value,
                 path,
                 "scalar",
+                rule,
             )
 
         # Validate timestamp
@@ -588,28 +1367,35 @@ class Core(object):
             # parse("") will give a valid date but it should not be
             # considered a valid timestamp
             if v == "":
-                errors.append("timestamp.empty : {} : {}".format(value, path))
+                errors.append(SchemaError.SchemaErrorEntry(
+                    msg="timestamp.empty : {value} : {path}",
+                    path=path,
+                    value=value,
+                    rule=rule))
             else:
                 try:
                     parse(value)
                     # If it can be parsed then it is valid
                 except Exception:
-                    errors.append("timestamp.invalid : {} : {}".format(value, path))
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="timestamp.invalid : {value} : {path}",
+                        path=path,
+                        value=value,
+                        rule=rule))
 
-    def _validate_range(self, max_, min_, max_ex, min_ex, errors, value, path, prefix):
+    def _validate_range(self, max_, min_, max_ex, min_ex, errors, value, path, prefix, rule=None):
         """
         Validate that value is within range values.
         """
 
         log.debug(
-            "Validate range : {} : {} : {} : {} : {} : {}".format(
-                max_,
-                min_,
-                max_ex,
-                min_ex,
-                value,
-                path,
-            )
+            "Validate range : %s : %s : %s : %s : %s : %s",
+            max_,
+            min_,
+            max_ex,
+            min_ex,
+            value,
+            path,
         )
 
         if max_ is not None:
@@ -618,6 +1404,7 @@ class Core(object):
                     msg="Type '{prefix}' has size of '{value}', greater than max limit '{max_}'. Path: '{path}'",
                     path=path,
                     value=value,
+                    rule=rule,
                     prefix=prefix,
                     max_=max_))
 
@@ -627,6 +1414,7 @@ class Core(object):
                     msg="Type '{prefix}' has size of '{value}', less than min limit '{min_}'. Path: '{path}'",
                     path=path,
                     value=value,
+                    rule=rule,
                     prefix=prefix,
                     min_=min_))
 
@@ -636,6 +1424,7 @@ class Core(object):
                     msg="Type '{prefix}' has size of '{value}', greater than or equals to max limit(exclusive) '{max_ex}'. Path: '{path}'",
                     path=path,
                     value=value,
+                    rule=rule,
                     prefix=prefix,
                     max_ex=max_ex))
 
@@ -645,20 +1434,621 @@ class Core(object):
                     msg="Type '{prefix}' has size of '{value}', less than or equals to min limit(exclusive) '{min_ex}'. Path: '{path}'",
                     path=path,
                     value=value,
+                    rule=rule,
                     prefix=prefix,
                     min_ex=min_ex))
 
-    def _validate_scalar_type(self, value, t, errors, path):
-        log.debug("Core scalar: validating scalar type : {}".format(t))
-        log.debug("Core scalar: scalar type: {}".format(type(value)))
+    def _validate_scalar_type(self, value, t, errors, path, rule=None):
+        log.debug("Core scalar: validating scalar type : %s", t)
+        log.debug("Core scalar: scalar type: %s", type(value))
 
         try:
-            if not tt[t](value):
-                errors.append(SchemaError.SchemaErrorEntry(
-                    msg="Value '{value}' is not of type '{scalar_type}'. Path: '{path}'",
-                    path=path,
-                    value=value,
-                    scalar_type=t))
+            valid = tt[t](value)
         except Exception:
             # Type not found in map
             raise Exception("Unknown type check: {} : {} : {}".format(path, value, t))
+
+        if not valid:
+            errors.append(SchemaError.SchemaErrorEntry(
+                msg="Value '{value}' is not of type '{scalar_type}'. Path: '{path}'",
+                path=path,
+                value=value,
+                rule=rule,
+                scalar_type=t))
+
+
+class Validator(Core):
+    """
+    Compiled schema that can be used to validate any number of documents.
+
+    The schema is parsed, partial schemas registered, includes and extension
+    functions resolved when the object is created. Each call to validate()
+    after that only walks the data.
+    """
+
+    def __init__(self, schema_files=[], schema_data=None, extensions=[], codegen=False, pattern_cache_size=0,
+                 func_concurrency=DEFAULT_FUNC_CONCURRENCY):
+        """
+        :param schema_files:
+            List of paths to schema files that is merged into one schema.
+        :param schema_data:
+            Schema as python data structure. Only used if no schema_files is specified.
+        :param extensions:
+            List of paths to python files that should be imported and available via 'func' keywork.
+        :param codegen:
+            If True the rule tree is compiled into specialized python functions by
+            pykwalify.compiler and they are used instead of the generic validation methods.
+        :param pattern_cache_size:
+            If larger then 0 each rule with a pattern keeps a LRU cache with the match result
+            for this many values. See pattern_cache_stats() for how well it performs.
+        :param func_concurrency:
+            Max number of coroutine extension functions that is awaited at the same time.
+        """
+        log.debug("schema_file: %s", schema_files)
+        log.debug("schema_data: %s", schema_data)
+        log.debug("extension files: %s", extensions)
+
+        self.source = None
+        self.source_file = None
+        self.source_format = None
+        self.schema = None
+        self.validation_errors_exceptions = None
+        self.root_rule = None
+        self.pattern_cache_size = pattern_cache_size
+        self.extensions = list(extensions)
+        self.func_concurrency = func_concurrency
+        self._local = threading.local()
+
+        # Used to create the same validator in worker processes
+        self._options = dict(
+            schema_files=list(schema_files),
+            schema_data=schema_data,
+            extensions=list(extensions),
+            codegen=codegen,
+            pattern_cache_size=pattern_cache_size,
+            func_concurrency=func_concurrency,
+        )
+        self._async_validator = None
+
+        self._load_schema(schema_files, schema_data)
+
+        if self.schema is None:
+            raise CoreError("No schema file/data was loaded")
+
+        self._init_extensions()
+        self.compile()
+
+        self.compiled_validator = compile_rule(self, self.root_rule) if codegen else None
+
+    def _validate_root(self, value, errors):
+        if self.compiled_validator is None:
+            super(Validator, self)._validate_root(value, errors)
+        else:
+            self.compiled_validator(value, "", errors)
+
+    def validate(self, data, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Validate data against the compiled schema and return the validated data.
+
+        validation_errors and validation_errors_exceptions is set to the result of the
+        latest call. Callers that share one Validator between threads should rely on
+        the raised SchemaError, that only holds the errors found by this call.
+
+        :param fail_fast:
+            Stop the validation when the first error is found. Same as max_errors=1.
+        :param max_errors:
+            Stop the validation when this many errors is found.
+        :param summary:
+            Group all errors by rule and path template, see Core.validate().
+        """
+        log.debug("starting validator")
+
+        errors = self._start_validate(data, max_errors=1 if fail_fast else max_errors, summary=summary)
+        self._handle_errors(errors, raise_exception)
+
+        return data
+
+    def validate_parallel(self, data, path="", jobs=None, chunk_size=10000, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Validate data with a large sequence or mapping split into chunks that is validated in
+        a pool of worker processes. Return the validated data.
+
+        Each worker creates the same validator as this one, so the schema is compiled once per
+        worker. unique and ident is checked across all chunks in a merge step when all chunks
+        is done, and the paths in the errors use the index of the item in the whole sequence.
+        The same errors as validate() is reported, but the errors for the rest of the document
+        is reported before the errors for the sequence or mapping at path.
+
+        :param path:
+            Path to the sequence or mapping to split, e.g. "/items". It must only go through keys
+            in mappings. Defaults to the root of the document.
+        :param jobs:
+            Number of worker processes. Defaults to the number of cpus.
+        :param chunk_size:
+            Number of items or keys in each chunk. Chunks is validated in this process if there is only one.
+        """
+        # Imported here since pykwalify.parallel needs this module
+        from pykwalify.parallel import validate_chunks
+
+        log.debug("starting parallel validator")
+
+        errors = validate_chunks(self, data, path, jobs, chunk_size, 1 if fail_fast else max_errors, summary)
+        self._handle_errors(errors, raise_exception)
+
+        return data
+
+    def validate_shard(self, items):
+        """
+        Validate one shard of the root sequence, e.g. one file of a dataset that is split over
+        many files or nodes, and return the partial state of the shard.
+
+        The state is plain python data that can be pickled, or dumped as json for json data,
+        and sent to the process that calls merge_shards(). It contains the errors for the items
+        with paths relative to the shard, the number of items and, for unique and ident, a sha1
+        digest of each value with the index it was first seen at. Values that is equal in python,
+        e.g. 1, 1.0 and True, has the same digest. range and unique is only checked by merge_shards().
+
+        :param items:
+            The items of the shard. Any iterable, items is validated one at a time.
+        """
+        # Imported here since pykwalify.parallel needs this module
+        from pykwalify.parallel import validate_shard
+
+        log.debug("starting shard validator")
+
+        return validate_shard(self, items)
+
+    def merge_shards(self, states, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Combine the states returned by validate_shard() into the result for the whole sequence
+        and return the number of items in it. states must be in the order of the shards in the
+        sequence and be created by validators for the same schema. Paths in the errors use the
+        index of the item in the whole sequence.
+        """
+        from pykwalify.parallel import merge_shards
+
+        log.debug("merging %s shards", len(states))
+
+        errors, count = merge_shards(self, states, 1 if fail_fast else max_errors, summary)
+        self._handle_errors(errors, raise_exception)
+
+        return count
+
+    def validate_async(self, data, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Return a coroutine that validates data without blocking the asyncio event loop.
+        Needs python 3.7 or later.
+
+        The validation runs in the default executor of the event loop and all calls share one
+        pykwalify.aio.AsyncValidator. Create a AsyncValidator to use another executor, a process
+        pool or a limit on the number of validations that run at the same time.
+        """
+        # Imported here since the module only works on python 3.7 or later
+        from pykwalify.aio import AsyncValidator
+
+        if self._async_validator is None:
+            self._async_validator = AsyncValidator(self)
+
+        return self._async_validator.validate(data, raise_exception, fail_fast, max_errors, summary)
+
+    def validate_file(self, source_file, source_format=None, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Load and validate one source file against the compiled schema and return the validated data.
+        None is returned for json lines and csv files since their records is not kept.
+
+        :param source_file:
+            Path, file object or bytes of the source in any format that Core accepts.
+        :param source_format:
+            Format of the source, see Core. Found from the file name if not given.
+        """
+        log.debug("starting file validator")
+
+        data, errors = self._validate_file(source_file, source_format, 1 if fail_fast else max_errors, summary)
+        self._handle_errors(errors, raise_exception)
+
+        return data
+
+    def _validate_file(self, source_file, source_format=None, max_errors=None, summary=False):
+        """
+        Return the loaded data and the errors for source_file without reporting them.
+        """
+        data, records_file, source_format = self._read_source_file(source_file, source_format)
+
+        if records_file is not None:
+            errors = self._new_errors(max_errors, summary)
+            self._validate_records(records_file, source_format, errors)
+            return None, errors
+
+        return data, self._start_validate(data, max_errors, summary)
+
+    def validate_stream(self, source_file, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Validate every document in a multi document yaml file, one document at a time.
+
+        Each document is validated when it has been parsed and is released before the next
+        document is parsed, so only one document is kept in memory. Errors is tagged with the
+        index of the document they was found in. Return the number of validated documents.
+
+        :param source_file:
+            Path to the yaml file or an open file object.
+        """
+        log.debug("starting stream validator")
+
+        errors = self._new_errors(1 if fail_fast else max_errors, summary)
+        count = self._read_source(source_file, lambda stream: self._validate_documents(stream, errors))
+
+        log.debug("Validated %s documents", count)
+
+        self._handle_errors(errors, raise_exception)
+
+        return count
+
+    def validate_lines(self, source_file, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Validate every record in a json lines (.jsonl, .ndjson) file, one line at a time.
+
+        Errors is tagged with the line number of the record. Return the number of validated records.
+
+        :param source_file:
+            Path to the json lines file or an open file object.
+        """
+        log.debug("starting json lines validator")
+
+        errors = self._new_errors(1 if fail_fast else max_errors, summary)
+        count = self._read_source(source_file, lambda stream: self._validate_lines(stream, errors))
+
+        self._handle_errors(errors, raise_exception)
+
+        return count
+
+    def validate_json_array(self, source_file, raise_exception=True, fail_fast=False, max_errors=None, summary=False, chunk_size=65536):
+        """
+        Validate a json file with a top level array one item at a time.
+
+        The file is read in chunks of chunk_size characters and each item is validated
+        against the item rules of the root sequence rule as soon as it is decoded, so the
+        array is never loaded. range and unique on the root sequence is supported and their
+        errors is reported after the errors for the items. Return the number of items.
+
+        :param source_file:
+            Path to the json file or an open file object.
+        """
+        log.debug("starting json array validator")
+
+        rule = self._root_sequence_rule()
+        errors = self._new_errors(1 if fail_fast else max_errors, summary)
+        count = [0]
+
+        def read(stream):
+            for item in iter_json_array(stream, chunk_size):
+                count[0] += 1
+                yield item
+
+        try:
+            with self._awaited_funcs(errors):
+                self._read_source(source_file, lambda stream: self._validate_sequence_items(read(stream), rule, "", errors))
+        except ErrorLimitReached:
+            log.debug("Validation stopped after %s errors", len(errors))
+
+        self._handle_errors(errors, raise_exception)
+
+        return count[0]
+
+    def validate_archive(self, archive_file, members="*", raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Validate the files in a tar or zip archive without extracting them.
+
+        Each member with a name that matches the glob pattern members is read straight from
+        the archive and validated. The format of a member is found from its extension, json,
+        yaml, json lines and csv/tsv is supported. Errors is prefixed with the member name.
+        Return the number of validated members.
+
+        :param members:
+            Glob pattern for the names of the members to validate, e.g. "manifests/*.yaml".
+        """
+        log.debug("starting archive validator")
+
+        errors = self._new_errors(1 if fail_fast else max_errors, summary)
+        count = 0
+
+        try:
+            with self._awaited_funcs(errors):
+                for name, stream in iter_archive_members(archive_file, members):
+                    count += 1
+                    member_errors = DocumentErrors(errors, member=name)
+
+                    with self._funcs_target(member_errors):
+                        self._validate_member(name, stream, member_errors)
+        except ErrorLimitReached:
+            log.debug("Validation stopped after %s errors", len(errors))
+
+        log.info("Validated %s archive members", count)
+
+        self._handle_errors(errors, raise_exception)
+
+        return count
+
+    def _validate_member(self, name, stream, errors):
+        if name.endswith(".json"):
+            try:
+                data = json.load(stream)
+            except ValueError as e:
+                raise CoreError("Unable to load any data from archive member {}: {}".format(name, e))
+        elif name.endswith(".yaml") or name.endswith(".yml"):
+            try:
+                data = yaml.load(stream, Loader=pykwalify.yaml_loader)
+            except yaml.YAMLError as e:
+                raise CoreError("Unable to load any data from archive member {}: {}".format(name, e))
+        elif name.endswith(".jsonl") or name.endswith(".ndjson"):
+            self._validate_lines(stream, errors)
+            return
+        elif name.endswith(".csv") or name.endswith(".tsv"):
+            self._validate_csv(stream, errors, "\t" if name.endswith(".tsv") else ",")
+            return
+        else:
+            raise CoreError("Unable to load archive member. Unknown file format: {}".format(name))
+
+        self._validate_root(data, errors)
+
+    def validate_events(self, source_file, raise_exception=True, fail_fast=False, max_errors=None, summary=False):
+        """
+        Validate a yaml file directly from the parse events without loading the document.
+
+        Use it for documents that is too large to be loaded into memory. See EventValidator
+        for the differences to validate(). The data is not returned since it is never loaded.
+
+        :param source_file:
+            Path to the yaml file or an open file object.
+        """
+        log.debug("starting event validator")
+
+        errors = self._new_errors(1 if fail_fast else max_errors, summary)
+        validator = EventValidator(self)
+
+        try:
+            with self._awaited_funcs(errors):
+                self._read_source(source_file, lambda stream: validator.validate(stream, errors))
+        except ErrorLimitReached:
+            log.debug("Validation stopped after %s errors", len(errors))
+
+        self._handle_errors(errors, raise_exception)
+
+    def _validate_documents(self, stream, errors):
+        count = 0
+
+        try:
+            with self._awaited_funcs(errors):
+                for document in yaml.load_all(stream, Loader=pykwalify.yaml_loader):
+                    document_errors = DocumentErrors(errors, count)
+
+                    with self._funcs_target(document_errors):
+                        self._validate_root(document, document_errors)
+
+                    count += 1
+
+                    # Release the document before the next one is parsed
+                    del document
+        except ErrorLimitReached:
+            log.debug("Validation stopped after %s errors", len(errors))
+            count += 1
+        except yaml.YAMLError as e:
+            raise CoreError("Unable to load document {} from source yaml file: {}".format(count, e))
+
+        return count
+
+    def is_valid(self, data):
+        """
+        Return True if data is valid. Validation stops at the first error and
+        no error message is ever built.
+        """
+        return self._is_valid(data)
+
+    def iter_errors(self, data):
+        """
+        Validate data and yield each error as soon as it is found, see Core.iter_errors().
+        """
+        return self._iter_errors(lambda walker, errors: walker.node(data, self.compile(), "", errors))
+
+
+class _Walker(object):
+    """
+    Walks the data the same way as Core._validate, but as generators that yield after each
+    chunk_size nodes, so the caller can pause or stop the validation between two chunks.
+    Scalars and values that can not be walked is validated by the core.
+    """
+
+    def __init__(self, core, chunk_size):
+        self.core = core
+        self.chunk_size = chunk_size
+        self.count = 0
+
+    def tick(self):
+        """
+        Count one node and return True when the chunk is full.
+        """
+        self.count += 1
+
+        if self.count < self.chunk_size:
+            return False
+
+        self.count = 0
+        return True
+
+    def node(self, value, rule, path, errors):
+        if self.tick():
+            yield
+
+        if rule._include_name is not None:
+            partial_schema_rule = rule._include_rule or pykwalify.partial_schemas.get(rule._include_name, None)
+
+            if partial_schema_rule:
+                for _ in self.node(value, partial_schema_rule, path, errors):
+                    yield
+                return
+        elif rule._sequence and isinstance(value, list):
+            for _ in self.sequence(value, rule, path, errors):
+                yield
+            return
+        elif rule._mapping is not None and isinstance(value, dict):
+            for _ in self.mapping(value, rule, path, errors):
+                yield
+            return
+
+        self.core._validate(value, rule, path, errors, None)
+
+    def sequence(self, value, rule, path, errors):
+        """
+        Same as Core._validate_sequence. unique is checked in a first pass over the items, so
+        the errors for the items can be reported as soon as the first invalid item is found.
+        """
+        core = self.core
+
+        core._handle_func(value, rule, path, errors)
+
+        if rule._range is not None:
+            r = rule._range
+
+            core._validate_range(
+                r.get("max", None),
+                r.get("min", None),
+                r.get("max-ex", None),
+                r.get("min-ex", None),
+                errors,
+                len(value),
+                path,
+                "seq",
+                rule,
+            )
+
+        if rule._unique_items or rule._unique_keys:
+            index = UniqueIndex(rule, path)
+
+            for i, item in enumerate(value):
+                index.add(i, item)
+
+                if self.tick():
+                    yield
+
+            index.report(errors)
+
+        for _ in self.items(value, rule, path, errors):
+            yield
+
+    def sequence_items(self, items, rule, path, errors):
+        """
+        Same as Core._validate_sequence_items, for the items of a sequence that is only available as an iterator.
+        """
+        if rule._func:
+            raise CoreError("func can't be used on a sequence that is validated one item at a time : {}".format(path))
+
+        index = UniqueIndex(rule, path) if rule._unique_items or rule._unique_keys else None
+        count = [0]
+
+        def counted():
+            for i, item in enumerate(items):
+                count[0] += 1
+
+                if index is not None:
+                    index.add(i, item)
+
+                yield item
+
+        for _ in self.items(counted(), rule, path, errors):
+            yield
+
+        if rule._range is not None:
+            r = rule._range
+
+            self.core._validate_range(
+                r.get("max", None),
+                r.get("min", None),
+                r.get("max-ex", None),
+                r.get("min-ex", None),
+                errors,
+                count[0],
+                path,
+                "seq",
+                rule,
+            )
+
+        if index is not None:
+            index.report(errors)
+
+    def items(self, items, rule, path, errors):
+        """
+        Validate the items of a sequence and report their errors the same way as Core._validate_sequence.
+        """
+        error_tracker = []
+        failed = False
+
+        for i, item in enumerate(items):
+            processed = []
+
+            for r in rule._sequence:
+                tmp_errors = []
+
+                try:
+                    for _ in self.node(item, r, "{}/{}".format(path, i), tmp_errors):
+                        yield
+                except (NotMappingError, NotSequenceError):
+                    pass
+
+                processed.append(tmp_errors)
+
+            no_errors = [len(_errors) == 0 for _errors in processed]
+
+            if rule._matching == "any":
+                ok = True in no_errors
+            elif rule._matching == "all":
+                ok = all(no_errors)
+            else:
+                ok = True
+
+            if not failed:
+                if ok:
+                    # Only errors that a later invalid item can report is kept, that never happens with '*'
+                    if rule._matching != "*" and not all(no_errors):
+                        error_tracker.append(processed)
+                    continue
+
+                failed = True
+
+                for _processed in error_tracker:
+                    for _errors in _processed:
+                        errors.extend(_errors)
+
+                error_tracker = None
+
+            for _errors in processed:
+                errors.extend(_errors)
+
+    def mapping(self, value, rule, path, errors):
+        """
+        Same as Core._validate_mapping.
+        """
+        core = self.core
+        matcher = rule._mapping_matcher
+
+        core._handle_func(value, rule, path, errors)
+        core._validate_mapping_keys(value, rule, path, errors)
+
+        # The items is copied since the mapping can be changed by other code while the walk is paused
+        for k, v in list(value.items()):
+            r = matcher.exact_rules.get(k, None)
+
+            if r is not None:
+                for _ in self.node(v, r, "{}/{}".format(path, k), errors):
+                    yield
+            elif rule._regex_mappings:
+                regex_mappings = matcher.match_regex(k)
+
+                for regex_rule in regex_mappings:
+                    for _ in self.node(v, regex_rule, "{}/{}".format(path, k), errors):
+                        yield
+
+                core._validate_regex_key(k, regex_mappings, value, rule, path, errors)
+            else:
+                core._validate_mapping_items([(k, v)], value, rule, path, errors)
+
+                if self.tick():
+                    yield
@@ -2,6 +2,15 @@
 
 """ pyKwalify - errors.py """
 
+# python std lib
+from collections import OrderedDict
+
+try:
+    import reprlib
+except ImportError:
+    # python 2.7
+    import repr as reprlib
+
 retcodes = {
     # PyKwalifyExit
     0: 'noerror',
@@ -38,6 +47,37 @@ retcodes = {
 retnames = dict((v, k) for (k, v) in retcodes.items())
 
 
+# Max length of the values that is stored in a SchemaErrorEntry
+MAX_VALUE_LENGTH = 200
+
+_value_repr = reprlib.Repr()
+_value_repr.maxlevel = 3
+_value_repr.maxlist = 10
+_value_repr.maxtuple = 10
+_value_repr.maxdict = 10
+_value_repr.maxset = 10
+_value_repr.maxstring = MAX_VALUE_LENGTH
+_value_repr.maxother = MAX_VALUE_LENGTH
+
+
+def truncate_value(value):
+    """
+    Return a view of value that is small enough to be stored in a error.
+
+    Short strings and other scalars is returned as is. Long strings is cut and
+    collections is replaced with a string that shows the first items in it.
+    """
+    if isinstance(value, str):
+        if len(value) > MAX_VALUE_LENGTH:
+            return value[:MAX_VALUE_LENGTH] + "..."
+        return value
+
+    if isinstance(value, (list, dict, tuple, set)):
+        return _value_repr.repr(value)
+
+    return value
+
+
 class PyKwalifyException(RuntimeError):
     """
     """
@@ -139,18 +179,63 @@ class SchemaError(PyKwalifyException):
     """
     class SchemaErrorEntry(object):
         """
+        One validation error.
+
+        Only a truncated view of the invalid value is stored so errors do not keep
+        large parts of the validated data alive. The message is formatted first when
+        the error is converted to a string.
         """
-        def __init__(self, msg, path, value, **kwargs):
+        __slots__ = ("msg", "path", "value", "rule", "document", "line", "member", "kwargs")
+
+        def __init__(self, msg, path, value, rule=None, **kwargs):
             """
+            :param msg:
+                Message template that is formatted with path, value and kwargs.
+            :param rule:
+                The rule that the value did not validate against.
             """
             self.msg = msg
             self.path = path
-            self.value = value
-            for key, value in kwargs.items():
-                self.__setattr__(key, value)
+            self.value = truncate_value(value)
+            self.rule = rule
+
+            # Index of the document in a multi document stream, line number in a json lines
+            # file and name of the archive member, set by DocumentErrors
+            self.document = None
+            self.line = None
+            self.member = None
+
+            # Stored as a flat (key, value, key, value, ...) tuple that is smaller than a dict
+            self.kwargs = tuple([x for key, value in kwargs.items() for x in (key, truncate_value(value))])
+
+        def __getattr__(self, name):
+            # Extra arguments to the message can be read as attributes
+            if name == "kwargs":
+                raise AttributeError(name)
+
+            kwargs = self.kwargs
+            for i in range(0, len(kwargs), 2):
+                if kwargs[i] == name:
+                    return kwargs[i + 1]
+
+            raise AttributeError(name)
 
         def __repr__(self):
-            return self.msg.format(**self.__dict__)
+            kwargs = dict(zip(self.kwargs[::2], self.kwargs[1::2]))
+            msg = self.msg.format(path=self.path, value=self.value, **kwargs)
+
+            if self.document is not None:
+                msg = "Document {}: {}".format(self.document, msg)
+
+            if self.line is not None:
+                msg = "Line {}: {}".format(self.line, msg)
+
+            if self.member is not None:
+                msg = "{}: {}".format(self.member, msg)
+
+            return msg
+
+        __str__ = __repr__
 
     def __init__(self, *args, **kwargs):
         """
@@ -207,3 +292,170 @@ class SchemaConflict(PyKwalifyException):
         """
         assert "retcode" not in kwargs, "keyword retcode implicitly defined"
         super(self.__class__, self).__init__(retcode=retnames["schemaconflict"], *args, **kwargs)
+
+
+class ErrorLimitReached(Exception):
+    """
+    Raised by ErrorList to stop the validation when the max number of errors is found.
+    """
+
+
+class ErrorList(list):
+    """
+    List of validation errors that stops the validation when it contains max_errors errors.
+    Errors that is added after that is dropped.
+    """
+
+    def __init__(self, max_errors):
+        super(ErrorList, self).__init__()
+        self.max_errors = max_errors
+
+    def append(self, error):
+        if len(self) >= self.max_errors:
+            raise ErrorLimitReached()
+
+        super(ErrorList, self).append(error)
+
+        if len(self) >= self.max_errors:
+            raise ErrorLimitReached()
+
+    def extend(self, errors):
+        for error in errors:
+            self.append(error)
+
+
+def path_template(path):
+    """
+    Return path with all sequence indexes replaced with '*', e.g. /items/3/price --> /items/*/price
+    """
+    return "/".join(["*" if part.isdigit() else part for part in path.split("/")])
+
+
+class ErrorGroup(object):
+    """
+    All errors for one rule and path template.
+    """
+    __slots__ = ("rule", "msg", "path_template", "count", "samples")
+
+    def __init__(self, rule, msg, path_template):
+        self.rule = rule
+        self.msg = msg
+        self.path_template = path_template
+        self.count = 0
+        self.samples = []
+
+    def __repr__(self):
+        return "{} error(s) at '{}', e.g. {}".format(self.count, self.path_template, self.samples[0])
+
+
+class ErrorSummary(object):
+    """
+    Collects validation errors grouped by the rule that failed and the template of the
+    path to the value. Only the number of errors and a few sample errors is kept for each
+    group so the memory use is bounded no matter how many errors is found.
+
+    It can be used instead of the errors list during validation.
+    """
+
+    def __init__(self, max_samples=3, max_groups=1000, max_errors=None):
+        """
+        :param max_samples:
+            Number of errors to keep for each group.
+        :param max_groups:
+            Max number of groups. Errors that do not fit in any group is only counted.
+        :param max_errors:
+            Stop the validation when this many errors is found.
+        """
+        self.max_samples = max_samples
+        self.max_groups = max_groups
+        self.max_errors = max_errors
+        self.groups = OrderedDict()
+        self.count = 0
+        self.ungrouped = 0
+
+    def append(self, error):
+        if self.max_errors and self.count >= self.max_errors:
+            raise ErrorLimitReached()
+
+        self.count += 1
+
+        rule = getattr(error, "rule", None)
+        template = path_template(getattr(error, "path", ""))
+        key = (rule, getattr(error, "msg", None) or str(error), template)
+
+        group = self.groups.get(key, None)
+
+        if group is None:
+            if len(self.groups) >= self.max_groups:
+                self.ungrouped += 1
+                group = None
+            else:
+                group = self.groups[key] = ErrorGroup(rule, key[1], template)
+
+        if group is not None:
+            group.count += 1
+
+            if len(group.samples) < self.max_samples:
+                group.samples.append(error)
+
+        if self.max_errors and self.count >= self.max_errors:
+            raise ErrorLimitReached()
+
+    def extend(self, errors):
+        for error in errors:
+            self.append(error)
+
+    def __len__(self):
+        """
+        Number of errors that was found, not only the ones that is kept as samples.
+        """
+        return self.count
+
+    def samples(self):
+        """
+        Return the sample errors of all groups. The summary itself can not be iterated since
+        its length is the number of errors that was found.
+        """
+        return [error for group in self.groups.values() for error in group.samples]
+
+    def __repr__(self):
+        return repr(self.lines())
+
+    def lines(self):
+        """
+        Return one message for each group of errors.
+        """
+        lines = [str(group) for group in self.groups.values()]
+
+        if self.ungrouped:
+            lines.append("{} more error(s) that is not grouped".format(self.ungrouped))
+
+        return lines
+
+
+class DocumentErrors(object):
+    """
+    Error collector that tags each error with the index of the document, the line or the
+    archive member it was found in and passes it on to another collector.
+    """
+
+    def __init__(self, errors, document=None, line=None, member=None):
+        self.errors = errors
+        self.document = document
+        self.line = line
+        self.member = member
+
+    def append(self, error):
+        # Collectors can be nested, e.g. lines in a archive member, so only set what is known here
+        if self.document is not None:
+            error.document = self.document
+        if self.line is not None:
+            error.line = self.line
+        if self.member is not None:
+            error.member = self.member
+
+        self.errors.append(error)
+
+    def extend(self, errors):
+        for error in errors:
+            self.append(error)
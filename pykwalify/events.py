@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+
+""" pyKwalify - events.py """
+
+# python std lib
+import logging
+
+# pyKwalify imports
+import pykwalify
+from pykwalify.errors import CoreError, SchemaError, NotMappingError, NotSequenceError
+from pykwalify.rule import UniqueIndex
+
+# 3rd party imports
+import yaml
+from yaml.events import (
+    AliasEvent,
+    DocumentEndEvent,
+    DocumentStartEvent,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    StreamEndEvent,
+    StreamStartEvent,
+)
+from yaml.nodes import MappingNode, ScalarNode, SequenceNode
+
+log = logging.getLogger(__name__)
+
+
+# Returned for nodes that was validated without being loaded
+STREAMED = object()
+
+
+class EventValidator(object):
+    """
+    Validates a yaml document directly from the parse events of PyYAML.
+
+    Sequences and mappings is never loaded into python objects. Only the rules for
+    the sequences and mappings that is currently open and the unique indexes is kept,
+    so memory do not depend on the size of the document.
+
+    Nodes that can't be validated from the events alone is loaded and validated with
+    Core like any other value. That is scalars, nodes with a 'func' or an anchor, the
+    items of sequences with more than one rule and values that match more than one
+    regex key. Those is loaded one at a time, e.g. one item of a large sequence.
+
+    The same errors as Core is reported but the errors for a sequence or a mapping
+    itself, range, required keys and unique, is reported after the errors for its
+    content since they are only known when the end of it is reached. Errors for a
+    sequence or a mapping that is not loaded has None as value.
+    """
+
+    def __init__(self, core, loader=None):
+        """
+        :param core:
+            Core object that the root rule was compiled by.
+        :param loader:
+            PyYAML loader class that is used to parse the events and construct scalars.
+            Defaults to pykwalify.yaml_loader.
+        """
+        self.core = core
+        self.loader_class = loader or pykwalify.yaml_loader
+        self.loader = None
+        self.anchors = {}
+        self.depth = 0
+
+    def validate(self, stream, errors):
+        """
+        Validate the single document in stream against the root rule of the core.
+        """
+        self.loader = self.loader_class(stream)
+        self.anchors = {}
+        self.depth = 0
+
+        try:
+            self._expect(StreamStartEvent)
+
+            if self.loader.check_event(StreamEndEvent):
+                raise CoreError("No source file/data was loaded")
+
+            self._expect(DocumentStartEvent)
+            self._walk(self.core.compile(), "", errors)
+            self._expect(DocumentEndEvent)
+
+            if not self.loader.check_event(StreamEndEvent):
+                raise CoreError("Unable to load source yaml file. Expected a single document in the stream")
+        except yaml.YAMLError as e:
+            raise CoreError("Unable to load any data from source yaml file: {}".format(e))
+        finally:
+            self.loader.dispose()
+            self.loader = None
+            self.anchors = {}
+
+    def _next(self):
+        event = self.loader.get_event()
+
+        if isinstance(event, (SequenceStartEvent, MappingStartEvent)):
+            self.depth += 1
+        elif isinstance(event, (SequenceEndEvent, MappingEndEvent)):
+            self.depth -= 1
+
+        return event
+
+    def _expect(self, event_class):
+        event = self._next()
+
+        if not isinstance(event, event_class):
+            raise CoreError("Unable to load source yaml file. Expected {} but found {}".format(
+                event_class.__name__, event))
+
+        return event
+
+    def _skip(self, event):
+        """
+        Consume the rest of the node that starts with event.
+        """
+        depth = self.depth - 1 if isinstance(event, (SequenceStartEvent, MappingStartEvent)) else self.depth
+        self._skip_to(depth)
+
+    def _skip_to(self, depth):
+        while self.depth > depth:
+            self._next()
+
+    def _compose(self, event):
+        """
+        Build the node that starts with event, the same way as the composer in PyYAML does.
+        """
+        if isinstance(event, AliasEvent):
+            if event.anchor not in self.anchors:
+                raise CoreError("Found undefined alias '{}'. Anchors on nodes that is validated without being loaded can't be referenced".format(event.anchor))
+            return self.anchors[event.anchor]
+
+        tag = event.tag
+
+        if isinstance(event, ScalarEvent):
+            if tag is None or tag == "!":
+                tag = self.loader.resolve(ScalarNode, event.value, event.implicit)
+            node = ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+            if event.anchor is not None:
+                self.anchors[event.anchor] = node
+        elif isinstance(event, SequenceStartEvent):
+            if tag is None or tag == "!":
+                tag = self.loader.resolve(SequenceNode, None, event.implicit)
+            node = SequenceNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+            if event.anchor is not None:
+                self.anchors[event.anchor] = node
+            while not self.loader.check_event(SequenceEndEvent):
+                node.value.append(self._compose(self._next()))
+            node.end_mark = self._next().end_mark
+        else:
+            if tag is None or tag == "!":
+                tag = self.loader.resolve(MappingNode, None, event.implicit)
+            node = MappingNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+            if event.anchor is not None:
+                self.anchors[event.anchor] = node
+            while not self.loader.check_event(MappingEndEvent):
+                key = self._compose(self._next())
+                node.value.append((key, self._compose(self._next())))
+            node.end_mark = self._next().end_mark
+
+        return node
+
+    def _load(self, event):
+        """
+        Load the node that starts with event into a python object.
+        """
+        return self.loader.construct_document(self._compose(event))
+
+    def _delegate(self, event, rule, path, errors):
+        """
+        Load the node that starts with event and validate it with the core.
+        """
+        value = self._load(event)
+        self.core._validate(value, rule, path, errors, [])
+        return value
+
+    def _walk(self, rule, path, errors, capture=None):
+        """
+        Validate the next node in the stream against rule.
+
+        Return the loaded value if the node was loaded, otherwise STREAMED or, for mappings
+        where capture is a list of keys, a dict with the loaded values of those keys.
+        """
+        return self._walk_event(self._next(), rule, path, errors, capture)
+
+    def _walk_event(self, event, rule, path, errors, capture=None):
+        if rule._include_name is not None:
+            if rule._include_rule is None:
+                # Let the core report the missing partial schema
+                return self._delegate(event, rule, path, errors)
+
+            return self._walk_event(event, rule._include_rule, path, errors, capture)
+
+        if rule._func or getattr(event, "anchor", None) is not None:
+            return self._delegate(event, rule, path, errors)
+
+        if rule._sequence is not None:
+            if isinstance(event, SequenceStartEvent) and rule._sequence:
+                self._walk_sequence(rule, path, errors)
+                return STREAMED
+        elif rule._mapping is not None or rule._allowempty_map:
+            if rule._mapping is None:
+                log.debug(" + No rule to apply, prolly because of allowempty: True")
+                self._skip(event)
+                return STREAMED
+
+            if isinstance(event, MappingStartEvent):
+                return self._walk_mapping(rule, path, errors, capture)
+
+        return self._delegate(event, rule, path, errors)
+
+    def _walk_sequence(self, rule, path, errors):
+        rules = rule._sequence
+        index = UniqueIndex(rule, path) if rule._unique_items or rule._unique_keys else None
+        capture = rule._unique_keys or None
+
+        # Same rules as in Core._validate_sequence, but only items that has errors is tracked
+        error_tracker = []
+        failed = False
+        i = 0
+
+        while not self.loader.check_event(SequenceEndEvent):
+            item_path = "{}/{}".format(path, i)
+            depth = self.depth
+            processed = []
+
+            if len(rules) == 1:
+                tmp_errors = []
+
+                try:
+                    item = self._walk(rules[0], item_path, tmp_errors, capture)
+                except (NotMappingError, NotSequenceError):
+                    item = STREAMED
+                    self._skip_to(depth)
+
+                processed.append(tmp_errors)
+            else:
+                item = self._load(self._next())
+
+                for r in rules:
+                    tmp_errors = []
+
+                    try:
+                        self.core._validate(item, r, item_path, tmp_errors, [])
+                    except (NotMappingError, NotSequenceError):
+                        pass
+
+                    processed.append(tmp_errors)
+
+            if index is not None and item is not STREAMED:
+                index.add(i, item)
+
+            i += 1
+
+            no_errors = [len(_errors) == 0 for _errors in processed]
+
+            if rule._matching == "any":
+                ok = True in no_errors
+            elif rule._matching == "all":
+                ok = all(no_errors)
+            else:
+                ok = True
+
+            if not failed:
+                if ok:
+                    # Only errors that a later invalid item can report is kept, that never happens with '*'
+                    if rule._matching != "*" and not all(no_errors):
+                        error_tracker.append(processed)
+                    continue
+
+                failed = True
+
+                for _processed in error_tracker:
+                    for _errors in _processed:
+                        errors.extend(_errors)
+
+                error_tracker = None
+
+            for _errors in processed:
+                errors.extend(_errors)
+
+        self._next()
+
+        if rule._range is not None:
+            rr = rule._range
+
+            self.core._validate_range(
+                rr.get("max", None),
+                rr.get("min", None),
+                rr.get("max-ex", None),
+                rr.get("min-ex", None),
+                errors,
+                i,
+                path,
+                "seq",
+                rule,
+            )
+
+        if index is not None:
+            index.report(errors)
+
+    def _walk_mapping(self, rule, path, errors, capture=None):
+        matcher = rule._mapping_matcher
+        watched = set(rule._required_keys) | set(rule._default_values)
+        seen = set()
+        captured = {} if capture else None
+        count = 0
+
+        while not self.loader.check_event(MappingEndEvent):
+            k = self._load(self._next())
+            count += 1
+
+            if k in watched:
+                seen.add(k)
+
+            value_path = "{}/{}".format(path, k)
+            r = matcher.exact_rules.get(k, None)
+
+            if r is not None:
+                v = self._walk(r, value_path, errors)
+
+                if captured is not None and k in capture and v is not STREAMED:
+                    captured[k] = v
+            elif rule._regex_mappings:
+                regex_mappings = matcher.match_regex(k)
+
+                if len(regex_mappings) == 1:
+                    self._walk(regex_mappings[0], value_path, errors)
+                elif regex_mappings:
+                    v = self._load(self._next())
+
+                    for regex_rule in regex_mappings:
+                        self.core._validate(v, regex_rule, value_path, errors, [])
+                else:
+                    self._skip(self._next())
+
+                if rule._matching_rule == "any" and not regex_mappings:
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Key '{key}' does not match any regex '{regex}'. Path: '{path}'",
+                        path=path,
+                        value=None,
+                        rule=rule,
+                        key=k,
+                        regex="  ".join([mm._map_regex_rule for mm in rule._regex_mappings])))
+                elif rule._matching_rule == "all" and len(regex_mappings) != len(rule._regex_mappings):
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Key '{key}' does not match all regex '{regex}'. Path: '{path}'",
+                        path=path,
+                        value=None,
+                        rule=rule,
+                        key=k,
+                        regex="  ".join([mm._map_regex_rule for mm in rule._regex_mappings])))
+            else:
+                if not rule._allowempty_map:
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Key '{key}' was not defined. Path: '{path}'",
+                        path=path,
+                        value=None,
+                        rule=rule,
+                        key=k))
+
+                self._skip(self._next())
+
+        self._next()
+
+        if rule._range is not None:
+            r = rule._range
+
+            self.core._validate_range(
+                r.get("max", None),
+                r.get("min", None),
+                r.get("max-ex", None),
+                r.get("min-ex", None),
+                errors,
+                count,
+                path,
+                "map",
+                rule,
+            )
+
+        for k in rule._required_keys:
+            if k not in seen:
+                errors.append(SchemaError.SchemaErrorEntry(
+                    msg="Cannot find required key '{key}'. Path: '{path}'",
+                    path=path,
+                    value=None,
+                    rule=rule,
+                    key=k))
+
+        # Core adds default values to the data and validates them with the other keys
+        for k, default in rule._default_values.items():
+            if k not in seen:
+                self.core._validate(default, matcher.exact_rules[k], "{}/{}".format(path, k), errors, [])
+
+        return captured if captured is not None else STREAMED
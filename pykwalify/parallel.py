@@ -0,0 +1,528 @@
+# -*- coding: utf-8 -*-
+
+""" pyKwalify - parallel.py """
+
+# python std lib
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import multiprocessing
+import numbers
+
+# pyKwalify imports
+from pykwalify.core import Validator, _error_messages
+from pykwalify.errors import CoreError, ErrorLimitReached, PyKwalifyException, SchemaError, truncate_value
+from pykwalify.rule import UniqueIndex
+
+log = logging.getLogger(__name__)
+
+
+# Result of the validation of one data file. errors is the messages for all errors found in the
+# file and error is the message for why the file could not be validated, e.g. it could not be loaded.
+FileResult = collections.namedtuple("FileResult", ["path", "errors", "error"])
+
+# Validator for the schema in each worker process and all its rules. They are created once by _init_worker.
+_validator = None
+_rules = None
+
+# Items of the sequence or mapping that is validated in chunks. It is set before the workers is
+# forked so the workers can read their chunks from it instead of being sent a copy of them.
+_data = None
+
+
+def _init_worker(options):
+    global _validator, _rules
+    _validator = Validator(**options)
+    _rules = _validator._rules()
+
+
+def _validate_file(task):
+    """
+    Validate one data file with the validator of the worker. Only the error messages is
+    returned so the result is small and can be sent back to the parent process.
+    """
+    path, source_format, max_errors, summary = task
+
+    try:
+        data, errors = _validator._validate_file(path, source_format, max_errors, summary)
+    except PyKwalifyException as e:
+        return FileResult(path, [], e.msg)
+
+    return FileResult(path, _error_messages(errors), None)
+
+
+def validate_files(data_files, schema_files, extensions=[], jobs=1, source_format=None, max_errors=None, summary=False, chunksize=None):
+    """
+    Validate each data file against the schema and yield a FileResult for each file, in the
+    same order as data_files.
+
+    With jobs larger then 1 the files is distributed over a pool of that many worker processes.
+    The schema is compiled once in each worker and not once per file. Files is sent to the
+    workers in chunks of chunksize files to keep the overhead per file low.
+
+    :param source_format:
+        Format of all data files, see Core. Found from the extension of each file if not given.
+    :param max_errors:
+        Stop the validation of a file when this many errors is found in it.
+    """
+    tasks = [(path, source_format, max_errors, summary) for path in data_files]
+
+    options = dict(schema_files=schema_files, extensions=extensions)
+
+    if jobs <= 1:
+        _init_worker(options)
+
+        for task in tasks:
+            yield _validate_file(task)
+
+        return
+
+    if chunksize is None:
+        # A few chunks per worker so slow files do not leave the other workers idle
+        chunksize = max(1, min(64, len(tasks) // (jobs * 4)))
+
+    log.debug("Validating %s files with %s workers, chunksize: %s", len(tasks), jobs, chunksize)
+
+    pool = multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(options, ))
+
+    try:
+        # imap returns the results in the order of the tasks
+        for result in pool.imap(_validate_file, tasks, chunksize):
+            yield result
+
+        pool.close()
+    finally:
+        # Stops the workers if the consumer stops iterating before all files is done
+        pool.terminate()
+        pool.join()
+
+
+def _pack_errors(errors, rule_ids):
+    """
+    Return errors as plain tuples that can be pickled. The rule of each error is replaced
+    with its position in the rule list, see Core._rules().
+    """
+    return [(e.msg, e.path, e.value, rule_ids.get(id(e.rule), None), e.kwargs) for e in errors]
+
+
+def _unpack_errors(packed, rules):
+    """
+    Build the errors packed by _pack_errors again with the rules of this process.
+    """
+    return [
+        SchemaError.SchemaErrorEntry(msg, path, value, rules[rule_id] if rule_id is not None else None, **dict(zip(kwargs[::2], kwargs[1::2])))
+        for msg, path, value, rule_id, kwargs in packed
+    ]
+
+
+def _validate_chunk(validator, rules, task):
+    """
+    Validate one chunk of a sequence or mapping and return (failed, errors, unique index state).
+    """
+    rule_id, path, start, stop, items, max_errors = task
+    rule = rules[rule_id]
+
+    if items is None:
+        items = _data[start:stop]
+
+    errors = []
+
+    if rule._sequence is not None:
+        # Coroutine extension functions is awaited at the end of the chunk, an item fails if its function did
+        func_errors = []
+
+        with validator._awaited_funcs(func_errors):
+            failed = validator._validate_sequence_chunk(items, start, rule, path, errors, max_errors)
+
+        errors.extend(func_errors)
+        failed = failed or len(func_errors) > 0
+        state = None
+
+        if rule._unique_items or rule._unique_keys:
+            index = UniqueIndex(rule, path)
+            for i, item in enumerate(items, start):
+                index.add(i, item)
+            state = index.state()
+    else:
+        failed = True
+        state = None
+
+        if max_errors is not None:
+            errors = validator._new_errors(max_errors)
+
+        try:
+            with validator._awaited_funcs(errors):
+                validator._validate_mapping_items(items, dict(items), rule, path, errors)
+        except ErrorLimitReached:
+            pass
+
+    return failed, _pack_errors(errors, dict((id(r), i) for i, r in enumerate(rules))), state
+
+
+def _run_chunk(task):
+    return _validate_chunk(_validator, _rules, task)
+
+
+def _resolve_include(rule):
+    while rule._include_name is not None and rule._include_rule is not None:
+        rule = rule._include_rule
+
+    return rule
+
+
+def _find_target(validator, data, path):
+    """
+    Return the value at path in data, the rule for it, the (mapping, key) pairs on the way to it and
+    path in the same form as in the errors, e.g. "/items".
+    """
+    rule = _resolve_include(validator.compile())
+    value = data
+    parents = []
+    keys = [k for k in path.split("/") if k]
+
+    for key in keys:
+        if rule._func:
+            raise CoreError("func can't be used on the parents of a path that is validated in parallel : {}".format(path))
+
+        if rule._mapping is None or not isinstance(value, dict) or key not in value:
+            raise CoreError("Path to validate in parallel must be keys in mappings that exists in the data : {}".format(path))
+
+        r = rule._mapping_matcher.exact_rules.get(key, None)
+        if r is None:
+            raise CoreError("Path to validate in parallel must be keys with a rule in the schema : {}".format(path))
+
+        parents.append((value, key))
+        value = value[key]
+        rule = _resolve_include(r)
+
+    return value, rule, parents, "".join("/" + k for k in keys)
+
+
+def validate_chunks(validator, data, path="", jobs=None, chunk_size=10000, max_errors=None, summary=False):
+    """
+    Validate data with the sequence or mapping at path split into chunks that is validated in
+    parallel and return the errors.
+
+    See Validator.validate_parallel().
+    """
+    global _data
+
+    target, rule, parents, path = _find_target(validator, data, path)
+    errors = validator._new_errors(max_errors, summary)
+
+    if rule._sequence is not None and isinstance(target, list):
+        kind = "seq"
+    elif rule._mapping is not None and isinstance(target, dict):
+        kind = "map"
+    else:
+        # Nothing to split, the core reports what is wrong with the value
+        try:
+            with validator._awaited_funcs(errors):
+                validator._validate_root(data, errors)
+        except ErrorLimitReached:
+            log.debug("Validation stopped after %s errors", len(errors))
+
+        return errors
+
+    if rule._func:
+        raise CoreError("func can't be used on a sequence or mapping that is validated in parallel : {}".format(path))
+
+    try:
+        if parents:
+            # The rest of the document is validated with an empty value at path. Errors for the
+            # empty value is dropped, the value itself is validated in chunks below.
+            parent, key = parents[-1]
+            parent[key] = [] if kind == "seq" else {}
+
+            rest = []
+            try:
+                with validator._awaited_funcs(rest):
+                    validator._validate_root(data, rest)
+            finally:
+                parent[key] = target
+
+            for error in rest:
+                if error.path != path and not error.path.startswith(path + "/"):
+                    errors.append(error)
+
+        # Size is checked before default values is added, the same way as in the core
+        count = len(target)
+
+        if kind == "seq":
+            items = target
+        else:
+            for k, default in rule._default_values.items():
+                if k not in target:
+                    target[k] = default
+
+            items = list(target.items())
+
+        results = _run_chunks(validator, rule, path, items, jobs, chunk_size, max_errors)
+        rules = validator._rules()
+
+        if rule._range is not None:
+            r = rule._range
+
+            validator._validate_range(
+                r.get("max", None),
+                r.get("min", None),
+                r.get("max-ex", None),
+                r.get("min-ex", None),
+                errors,
+                count,
+                path,
+                kind,
+                rule,
+            )
+
+        if kind == "map":
+            for k in rule._required_keys:
+                if k not in target:
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg="Cannot find required key '{key}'. Path: '{path}'",
+                        path=path,
+                        value=target,
+                        rule=rule,
+                        key=k))
+
+        if kind == "seq" and (rule._unique_items or rule._unique_keys):
+            # Merge step for unique and ident, values is compared across all chunks
+            index = UniqueIndex(rule, path)
+            for failed, packed, state in results:
+                index.merge(state)
+            index.report(errors)
+
+        # Errors for the items is only reported if any item did not validate, see Core._validate_sequence
+        if any(failed for failed, packed, state in results):
+            for failed, packed, state in results:
+                errors.extend(_unpack_errors(packed, rules))
+    except ErrorLimitReached:
+        log.debug("Validation stopped after %s errors", len(errors))
+    finally:
+        _data = None
+
+    return errors
+
+
+def _run_chunks(validator, rule, path, items, jobs, chunk_size, max_errors):
+    """
+    Validate items in chunks of chunk_size in a pool of jobs processes and return the result
+    for each chunk in order.
+    """
+    global _data
+
+    rules = validator._rules()
+    rule_id = [id(r) for r in rules].index(id(rule))
+    bounds = [(start, min(start + chunk_size, len(items))) for start in range(0, len(items), chunk_size)]
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    if jobs <= 1 or len(bounds) <= 1:
+        return [_validate_chunk(validator, rules, (rule_id, path, start, stop, items[start:stop], max_errors)) for start, stop in bounds]
+
+    # Forked workers read their chunk from the shared items, other workers is sent a copy of it
+    start_method = multiprocessing.get_start_method() if hasattr(multiprocessing, "get_start_method") else "fork"
+    fork = start_method == "fork"
+
+    if fork:
+        _data = items
+
+    tasks = [(rule_id, path, start, stop, None if fork else items[start:stop], max_errors) for start, stop in bounds]
+
+    log.debug("Validating %s items in %s chunks with %s workers", len(items), len(tasks), jobs)
+
+    pool = multiprocessing.Pool(min(jobs, len(tasks)), initializer=_init_worker, initargs=(validator._options, ))
+
+    try:
+        results = pool.map(_run_chunk, tasks, 1)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        _data = None
+
+    return results
+
+
+def _canonical(value):
+    """
+    Return a form of value that is the same for values that is equal in python, e.g. 1, 1.0 and
+    True, and different for values that is not, e.g. a date and the same date as a string.
+    """
+    if isinstance(value, numbers.Integral):
+        return ["int", int(value)]
+
+    if isinstance(value, float):
+        if value.is_integer():
+            return ["int", int(value)]
+        return ["float", repr(value)]
+
+    if isinstance(value, datetime.datetime):
+        offset = value.utcoffset()
+
+        # Aware datetimes is equal when they are the same time in utc, but never equal to a naive one
+        if offset is not None:
+            return ["utc", (value.replace(tzinfo=None) - offset).isoformat()]
+        return ["datetime", value.isoformat()]
+
+    if isinstance(value, datetime.date):
+        return ["date", value.isoformat()]
+
+    if isinstance(value, type(u"")) or isinstance(value, str):
+        return ["str", value]
+
+    return [type(value).__name__, value]
+
+
+def _digest(value):
+    """
+    Return a digest of value that is the same in every process and on every node. Values has the
+    same digest when they are equal in python, the same way as they are compared by UniqueIndex.
+    """
+    return hashlib.sha1(json.dumps(_canonical(value), sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+
+
+def _rebase(path, offset):
+    """
+    Move a path that starts with the index of an item in a shard, e.g. "/3/name", by offset.
+    """
+    index, sep, rest = path[1:].partition("/")
+    return "/{}{}{}".format(int(index) + offset, sep, rest)
+
+
+def validate_shard(validator, items):
+    """
+    Validate items, that is one shard of the root sequence, and return the partial state
+    of the shard that merge_shards() combines into the result for the whole sequence.
+
+    See Validator.validate_shard().
+    """
+    rule = validator._root_sequence_rule()
+
+    if rule._func:
+        raise CoreError("func can't be used on a sequence that is validated in shards")
+
+    rules = validator._rules()
+    rule_ids = dict((id(r), i) for i, r in enumerate(rules))
+
+    # One table for unique items, if it is used, and one for each unique key
+    keys = ([None] if rule._unique_items else []) + list(rule._unique_keys or [])
+    unique = [{"seen": {}, "duplicates": []} for k in keys]
+    count = [0]
+
+    def record(items):
+        for index, item in enumerate(items):
+            count[0] += 1
+
+            for k, table in zip(keys, unique):
+                if k is None:
+                    val = item
+                elif isinstance(item, dict):
+                    val = item.get(k, None)
+                else:
+                    continue
+
+                if val is None:
+                    continue
+
+                digest = _digest(val)
+
+                if digest in table["seen"]:
+                    table["duplicates"].append([index, digest, truncate_value(val)])
+                else:
+                    table["seen"][digest] = [index, truncate_value(val)]
+
+            yield item
+
+    errors = []
+    func_errors = []
+
+    with validator._awaited_funcs(func_errors):
+        failed = validator._validate_sequence_chunk(record(items), 0, rule, "", errors)
+
+    errors.extend(func_errors)
+    failed = failed or len(func_errors) > 0
+
+    return {
+        "count": count[0],
+        "failed": failed,
+        "errors": _pack_errors(errors, rule_ids),
+        "unique": unique,
+    }
+
+
+def merge_shards(validator, states, max_errors=None, summary=False):
+    """
+    Combine the states of all shards, in the order of the shards in the sequence, into the
+    errors for the whole sequence.
+
+    See Validator.merge_shards().
+    """
+    rule = validator._root_sequence_rule()
+    rules = validator._rules()
+    errors = validator._new_errors(max_errors, summary)
+    count = sum(state["count"] for state in states)
+
+    # Offset of each shard in the whole sequence
+    offsets = []
+    offset = 0
+    for state in states:
+        offsets.append(offset)
+        offset += state["count"]
+
+    try:
+        if rule._range is not None:
+            r = rule._range
+
+            validator._validate_range(
+                r.get("max", None),
+                r.get("min", None),
+                r.get("max-ex", None),
+                r.get("min-ex", None),
+                errors,
+                count,
+                "",
+                "seq",
+                rule,
+            )
+
+        index = UniqueIndex(rule, "")
+        keys = ([None] if rule._unique_items else []) + list(rule._unique_keys or [])
+
+        for i, k in enumerate(keys):
+            seen = {}
+            duplicates = []
+
+            for state, offset in zip(states, offsets):
+                table = state["unique"][i]
+
+                for digest, (j, val) in table["seen"].items():
+                    if digest in seen:
+                        duplicates.append((offset + j, val, digest))
+                    else:
+                        seen[digest] = (offset + j, val)
+
+                for j, digest, val in table["duplicates"]:
+                    duplicates.append((offset + j, val, digest))
+
+            for j, val, digest in sorted(duplicates, key=lambda d: d[0]):
+                errors.append(index.duplicate_error(j, val, seen[digest][0], k))
+
+        # Errors for the items is only reported if any item did not validate, see Core._validate_sequence
+        if any(state["failed"] for state in states):
+            for state, offset in zip(states, offsets):
+                for msg, path, value, rule_id, kwargs in state["errors"]:
+                    kwargs = dict(zip(kwargs[::2], kwargs[1::2]))
+
+                    if "prev_path" in kwargs:
+                        kwargs["prev_path"] = _rebase(kwargs["prev_path"], offset)
+
+                    errors.append(SchemaError.SchemaErrorEntry(
+                        msg, _rebase(path, offset), value, rules[rule_id] if rule_id is not None else None, **kwargs))
+    except ErrorLimitReached:
+        log.debug("Validation stopped after %s errors", len(errors))
+
+    return errors, count
@@ -4,11 +4,13 @@
 
 # python std lib
 import logging
+import mmap
 import os
 import re
+from collections import OrderedDict
 
 # pykwalify imports
-from pykwalify.errors import SchemaConflict, RuleError
+from pykwalify.errors import SchemaConflict, SchemaError, RuleError
 from pykwalify.types import (
     DEFAULT_TYPE,
     is_bool,
@@ -23,6 +25,277 @@ from pykwalify.types import (
 log = logging.getLogger(__name__)
 
 
+class MappingKeyMatcher(object):
+    """
+    Finds the rules that should be used to validate a key in a mapping.
+
+    Keys that has a exact rule is found with a dict lookup. Other keys is matched against
+    all regex rules, the result is memorized per key so keys that is repeated in many
+    mappings is only matched against the regexes once.
+    """
+
+    # Max number of keys to memorize before the memo is reset
+    memo_size = 10000
+
+    def __init__(self, exact_rules, regex_rules):
+        """
+        :param exact_rules:
+            dict with key name --> rule for all keys that is not regex keys.
+        :param regex_rules:
+            List of rules defined by regex keys, in the order they are defined in the schema.
+        """
+        self.exact_rules = exact_rules
+        self.regex_rules = regex_rules
+        self.regexps = [re.compile(r._map_regex_rule) for r in regex_rules]
+        self.memo = {}
+
+        # All regexes combined into one so keys that do not match any of them is rejected with one match call
+        self.combined_regexp = None
+        if len(regex_rules) > 1:
+            try:
+                self.combined_regexp = re.compile("|".join(["(?:{})".format(r._map_regex_rule) for r in regex_rules]))
+            except Exception:
+                # Some regexes, e.g. with numbered backreferences, can't be combined
+                self.combined_regexp = None
+
+    def match_regex(self, key):
+        """
+        Return a tuple with all regex rules that matches key.
+        """
+        key = str(key)
+
+        try:
+            return self.memo[key]
+        except KeyError:
+            pass
+
+        if self.combined_regexp is not None and self.combined_regexp.match(key) is None:
+            matched = ()
+        else:
+            matched = tuple([r for r, regexp in zip(self.regex_rules, self.regexps) if regexp.match(key)])
+
+        if len(self.memo) >= self.memo_size:
+            self.memo.clear()
+
+        self.memo[key] = matched
+
+        return matched
+
+
+class PatternMatchCache(object):
+    """
+    Bounded LRU cache with the result of matching a pattern against string values.
+
+    Useful for fields with few distinct values, e.g. status codes, that is repeated
+    many times in the validated data.
+    """
+
+    def __init__(self, regexp, size):
+        """
+        :param regexp:
+            Compiled regex that values is matched against.
+        :param size:
+            Max number of values to keep results for.
+        """
+        self.regexp = regexp
+        self.size = size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def match(self, value):
+        """
+        Return True if the string value matches the regex.
+        """
+        try:
+            result = self.results.pop(value)
+            self.hits += 1
+        except KeyError:
+            result = self.regexp.match(value) is not None
+            self.misses += 1
+
+            if len(self.results) >= self.size:
+                try:
+                    self.results.popitem(last=False)
+                except KeyError:
+                    # Emptied by a validation in another thread
+                    pass
+
+        # (Re)insert the value last so it is the most recently used one
+        self.results[value] = result
+
+        return result
+
+    def stats(self):
+        return {
+            "pattern": self.regexp.pattern,
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.results),
+            "max_size": self.size,
+        }
+
+
+class EnumFile(object):
+    """
+    Enum where all values is stored in a external file instead of in the schema.
+
+    The file must contain one value per line sorted in byte order, e.g. with
+    `LC_ALL=C sort -u`. It is memory mapped the first time a value is looked up
+    and searched with binary search so it is never loaded into memory.
+    """
+
+    def __init__(self, path):
+        """
+        :param path:
+            Path to the file with the enum values.
+        """
+        self.path = path
+        self.data = None
+
+    def _open(self):
+        if self.data is None:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    self.data = b""
+                else:
+                    self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self.data
+
+    def __contains__(self, value):
+        """
+        Return True if the string value is one of the lines in the file.
+        """
+        data = self._open()
+        key = value.encode("utf-8")
+
+        # lo and hi is always the start of a line
+        lo = 0
+        hi = len(data)
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+
+            start = data.rfind(b"\n", lo, mid)
+            start = lo if start == -1 else start + 1
+
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = len(data)
+
+            line = data[start:end].rstrip(b"\r")
+
+            if line == key:
+                return True
+            elif line < key:
+                lo = end + 1
+            else:
+                hi = start
+
+        return False
+
+
+class UniqueIndex(object):
+    """
+    Checks the unique and ident constraints of a sequence rule one item at a time.
+
+    Each constraint has its own index of already seen values with the index of the item
+    they was first seen in. Items that is not a mapping or that is missing the key is
+    skipped. Errors is first built when report() is called, so errors for unique items is
+    reported before errors for unique keys.
+    """
+
+    def __init__(self, rule, path):
+        self.rule = rule
+        self.path = path
+        self.unique_items = rule._unique_items
+        self.unique_keys = rule._unique_keys or []
+        self.item_table = {}
+        self.item_duplicates = []
+        self.key_tables = [{} for k in self.unique_keys]
+        self.key_duplicates = [[] for k in self.unique_keys]
+
+    def add(self, index, item):
+        """
+        Add the item found at index in the sequence.
+        """
+        if self.unique_items and item is not None:
+            if item in self.item_table:
+                self.item_duplicates.append((index, item))
+            else:
+                self.item_table[item] = index
+
+        if not self.unique_keys or not isinstance(item, dict):
+            return
+
+        for k, table, duplicates in zip(self.unique_keys, self.key_tables, self.key_duplicates):
+            val = item.get(k, None)
+
+            if val is None:
+                continue
+
+            if val in table:
+                duplicates.append((index, val))
+            else:
+                table[val] = index
+
+    def state(self):
+        """
+        Return the seen values and duplicates as plain data that can be pickled and merged
+        into the index for the same rule with merge(), e.g. in another process.
+        """
+        return (self.item_table, self.item_duplicates, self.key_tables, self.key_duplicates)
+
+    def merge(self, state):
+        """
+        Merge the state of an index for a later part of the same sequence into this index.
+        Values that was already seen is reported as duplicates of the first item they was seen in.
+        """
+        item_table, item_duplicates, key_tables, key_duplicates = state
+
+        self._merge_table(self.item_table, self.item_duplicates, item_table, item_duplicates)
+
+        for table, duplicates, other_table, other_duplicates in zip(self.key_tables, self.key_duplicates, key_tables, key_duplicates):
+            self._merge_table(table, duplicates, other_table, other_duplicates)
+
+    @staticmethod
+    def _merge_table(table, duplicates, other_table, other_duplicates):
+        for val, index in other_table.items():
+            if val in table:
+                duplicates.append((index, val))
+            else:
+                table[val] = index
+
+        duplicates.extend(other_duplicates)
+
+    def report(self, errors):
+        """
+        Add an error for each duplicate that was found to errors, in the order of the items.
+        """
+        for index, item in sorted(self.item_duplicates, key=lambda d: d[0]):
+            errors.append(self.duplicate_error(index, item, self.item_table[item]))
+
+        for k, table, duplicates in zip(self.unique_keys, self.key_tables, self.key_duplicates):
+            for index, val in sorted(duplicates, key=lambda d: d[0]):
+                errors.append(self.duplicate_error(index, val, table[val], k))
+
+    def duplicate_error(self, index, value, prev_index, key=None):
+        """
+        Return the error for a value at index that was first seen at prev_index. key is the
+        unique key in the mapping at index, or None for unique items.
+        """
+        suffix = "/{}".format(key) if key is not None else ""
+
+        return SchemaError.SchemaErrorEntry(
+            msg="Value '{duplicate}' is not unique. Previous path: '{prev_path}'. Path: '{path}'",
+            path="{}/{}{}".format(self.path, index, suffix),
+            value=value,
+            rule=self.rule,
+            duplicate=value,
+            prev_path="{}/{}{}".format(self.path, prev_index, suffix))
+
+
 class Rule(object):
     """ Rule class that handles a rule constraint """
 
@@ -35,7 +308,10 @@ class Rule(object):
         self._type_class = None
         self._pattern = None
         self._pattern_regexp = None
+        self._pattern_cache = None
         self._enum = None
+        self._enum_set = None
+        self._enum_file = None
         self._sequence = None
         self._mapping = None
         self._assert = None
@@ -47,9 +323,16 @@ class Rule(object):
         self._matching_rule = "any"
         self._map_regex_rule = None
         self._regex_mappings = None
+        self._mapping_matcher = None
         self._include_name = None
+        self._include_rule = None
         self._extensions = None
         self._func = None
+        self._func_method = None
+        self._required_keys = None
+        self._default_values = None
+        self._unique_items = False
+        self._unique_keys = None
 
         # Possible values: [any, all, *]
         self._matching = "any"
@@ -65,7 +348,7 @@ class Rule(object):
         return "Rule: {}".format(str(self._schema_str))
 
     def init(self, schema, path):
-        log.debug("Init schema: {}".format(schema))
+        log.debug("Init schema: %s", schema)
 
         include = schema.get("include", None)
 
@@ -109,6 +392,7 @@ class Rule(object):
             "req": self.init_required_value,
             "pattern": self.init_pattern_value,
             "enum": self.init_enum_value,
+            "enum-file": self.init_enum_file_value,
             "assert": self.init_assert_value,
             "range": self.init_range_value,
             "ident": self.init_ident_value,
@@ -155,8 +439,8 @@ class Rule(object):
         self._extensions = v
 
     def init_matching_rule(self, v, rule, path):
-        log.debug("Init matching-rule: {}".format(path))
-        log.debug("{} {}".format(v, rule))
+        log.debug("Init matching-rule: %s", path)
+        log.debug("%s %s", v, rule)
 
         # Verify that the provided rule is part of one of the allowed one
         allowed = ["any"]
@@ -167,14 +451,14 @@ class Rule(object):
             self._matching_rule = v
 
     def init_allow_empty_map(self, v, rule, path):
-        log.debug("Init allow empty value: {}".format(path))
-        log.debug("Type: {} : {}".format(v, rule))
+        log.debug("Init allow empty value: %s", path)
+        log.debug("Type: %s : %s", v, rule)
 
         self._allowempty_map = v
 
     def init_type_value(self, v, rule, path):
-        log.debug("Init type value : {}".format(path))
-        log.debug("Type: {} {}".format(v, rule))
+        log.debug("Init type value : %s", path)
+        log.debug("Type: %s %s", v, rule)
 
         if v is None:
             v = DEFAULT_TYPE
@@ -186,7 +470,7 @@ class Rule(object):
             raise RuleError("type.unknown : {} : {}".format(self._type, path))
 
     def init_matching(self, v, rule, path):
-        log.debug("Init matching rule : {}".format(path))
+        log.debug("Init matching rule : %s", path)
 
         valid_values = ["any", "all", "*"]
 
@@ -196,24 +480,24 @@ class Rule(object):
         self._matching = str(v)
 
     def init_name_value(self, v, rule, path):
-        log.debug("Init name value : {}".format(path))
+        log.debug("Init name value : %s", path)
 
         self._name = str(v)
 
     def init_desc_value(self, v, rule, path):
-        log.debug("Init descr value : {}".format(path))
+        log.debug("Init descr value : %s", path)
 
         self._desc = str(v)
 
     def init_required_value(self, v, rule, path):
-        log.debug("Init required value : {}".format(path))
+        log.debug("Init required value : %s", path)
 
         if not isinstance(v, bool):
             raise RuleError("required.notbool : {} : {}".format(v, path))
         self._required = v
 
     def init_pattern_value(self, v, rule, path):
-        log.debug("Init pattern value : {}".format(path))
+        log.debug("Init pattern value : %s", path)
 
         if not isinstance(v, str):
             raise RuleError("pattern.notstr : {} : {}".format(v, path))
@@ -231,7 +515,7 @@ class Rule(object):
             raise RuleError("pattern.syntaxerr : {} --> {} : {}".format(self._pattern_regexp, self._pattern_regexp, path))
 
     def init_enum_value(self, v, rule, path):
-        log.debug("Init enum value : {}".format(path))
+        log.debug("Init enum value : %s", path)
 
         if not isinstance(v, list):
             raise RuleError("enum.notseq")
@@ -250,8 +534,27 @@ class Rule(object):
 
             lookup.add(item)
 
+        # Used by the core to find values without scanning the whole list
+        self._enum_set = lookup
+
+    def init_enum_file_value(self, v, rule, path):
+        log.debug("Init enum file value : %s", path)
+
+        if not isinstance(v, str):
+            raise RuleError("enum-file.notstr : {} : {}".format(v, path))
+
+        if is_collection_type(self._type):
+            raise RuleError("enum-file.notscalar : {}".format(path))
+
+        f = os.path.abspath(v)
+
+        if not os.path.exists(f):
+            raise RuleError("enum-file.notfound : {} : {}".format(f, path))
+
+        self._enum_file = EnumFile(f)
+
     def init_assert_value(self, v, rule, path):
-        log.debug("Init assert value : {}".format(path))
+        log.debug("Init assert value : %s", path)
 
         if not isinstance(v, str):
             raise RuleError("assert.notstr : {}".format(path))
@@ -261,7 +564,7 @@ class Rule(object):
         raise RuleError("assert.NYI-Error : {}".format(path))
 
     def init_range_value(self, v, rule, path):
-        log.debug("Init range value : {}".format(path))
+        log.debug("Init range value : %s", path)
 
         if not isinstance(v, dict):
             raise RuleError("range.notmap : {} : {}".format(v, path))
@@ -309,7 +612,7 @@ class Rule(object):
                 raise RuleError("range.maxexleminex : {} <= {} : {}".format(max_ex, min_ex, path))
 
     def init_ident_value(self, v, rule, path):
-        log.debug("Init ident value : {}".format(path))
+        log.debug("Init ident value : %s", path)
 
         if v is None or isinstance(v, bool):
             raise RuleError("ident.notbool : {} : {}".format(v, path))
@@ -325,7 +628,7 @@ class Rule(object):
             raise RuleError("ident.notmap : {}".format(path))
 
     def init_unique_value(self, v, rule, path):
-        log.debug("Init unique value : {}".format(path))
+        log.debug("Init unique value : %s", path)
 
         if not isinstance(v, bool):
             raise RuleError("unique.notbool : {} : {}".format(v, path))
@@ -338,7 +641,7 @@ class Rule(object):
             raise RuleError("unique.onroot")
 
     def init_sequence_value(self, v, rule, path):
-        log.debug("Init sequence value : {}".format(path))
+        log.debug("Init sequence value : %s", path)
 
         if v is not None and not isinstance(v, list):
             raise RuleError("sequence.notseq : {} : {}".format(v, path))
@@ -360,6 +663,17 @@ class Rule(object):
 
         self._sequence = tmp_seq
 
+        # Collect all unique constraints that apply to the items of this sequence so the
+        # core can check them all in one pass over the data
+        self._unique_keys = []
+        for r in self._sequence:
+            if r._type == "map":
+                for k, _rule in (r._mapping or {}).items():
+                    if (_rule._unique or _rule._ident) and k not in self._unique_keys:
+                        self._unique_keys.append(k)
+            elif r._unique:
+                self._unique_items = True
+
         return rule
 
     def init_mapping_value(self, v, rule, path):
@@ -367,7 +681,7 @@ class Rule(object):
         if self._mapping:
             raise RuleError("mapping.multiple-use : {}".format(path))
 
-        log.debug("Init mapping value : {}".format(path))
+        log.debug("Init mapping value : %s", path)
 
         if v is not None and not isinstance(v, dict):
             raise RuleError("mapping.notmap : {} : {}".format(v, path))
@@ -392,6 +706,7 @@ class Rule(object):
                     regex = regex[1]
                     try:
                         re.compile(regex)
+                        re.compile(regex[1:-1])
                     except Exception as e:
                         raise RuleError("Unable to compile regex '{}' '{}'".format(regex, e))
 
@@ -405,10 +720,18 @@ class Rule(object):
                 rule.init(v, "{}/mapping/{}".format(path, k))
                 self._mapping[k] = rule
 
+        # Lookup tables used by the core so it do not have to scan all child rules for each mapping
+        self._mapping_matcher = MappingKeyMatcher(
+            dict((k, r) for k, r in self._mapping.items() if r not in self._regex_mappings),
+            self._regex_mappings,
+        )
+        self._required_keys = [k for k, r in self._mapping.items() if r._required]
+        self._default_values = dict((k, r._default) for k, r in self._mapping.items() if r._default is not None)
+
         return rule
 
     def init_default_value(self, v, rule, path):
-        log.debug("Init default value : {}".format(path))
+        log.debug("Init default value : %s", path)
         self._default = v
 
         if is_collection_type(self._type):
@@ -421,7 +744,7 @@ class Rule(object):
             raise RuleError("default.type.unmatch : {} --> {} : {}".format(v, self._type_class, path))
 
     def check_conflicts(self, schema, rule, path):
-        log.debug("Checking for conflicts : {}".format(path))
+        log.debug("Checking for conflicts : %s", path)
 
         if self._type == "seq":
             if all([sa not in schema for sa in sequence_aliases]):
@@ -447,3 +770,8 @@ class Rule(object):
             if self._enum is not None:
                 if self._range is not None:
                     raise SchemaConflict("enum.conflict :: range: {}".format(path))
+                if self._enum_file is not None:
+                    raise SchemaConflict("enum.conflict :: enum-file: {}".format(path))
+            if self._enum_file is not None:
+                if self._range is not None:
+                    raise SchemaConflict("enum-file.conflict :: range: {}".format(path))
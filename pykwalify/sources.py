@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+
+""" pyKwalify - sources.py """
+
+# python std lib
+import bz2
+import codecs
+import csv
+import fnmatch
+import gzip
+import io
+import json
+import logging
+import mmap
+import os
+import tarfile
+import zipfile
+
+try:
+    import lzma
+except ImportError:
+    # python 2.7
+    lzma = None
+
+# pyKwalify imports
+from pykwalify.errors import CoreError, NotSequenceError
+
+log = logging.getLogger(__name__)
+
+
+compression_extensions = [
+    (".gz", "gzip"),
+    (".bz2", "bz2"),
+    (".xz", "xz"),
+]
+
+compression_magic = [
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+]
+
+
+# Extensions for the source formats that can be validated
+source_formats = [
+    (".json", "json"),
+    (".yaml", "yaml"),
+    (".yml", "yaml"),
+    (".jsonl", "jsonl"),
+    (".ndjson", "jsonl"),
+    (".csv", "csv"),
+    (".tsv", "tsv"),
+]
+
+source_format_names = ["json", "yaml", "jsonl", "csv", "tsv"]
+
+# Files that is at least this large is memory mapped instead of read
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def format_from_name(name):
+    """
+    Return the source format, e.g. "json" or "yaml", from the extension of name or None if it is not known.
+    The inner extension is used for compressed files, e.g. "json" for "data.json.gz".
+    """
+    name = strip_compression_extension(name)
+
+    for ext, source_format in source_formats:
+        if name.endswith(ext):
+            return source_format
+
+    return None
+
+
+def map_file(path):
+    """
+    Memory map the file at path for reading. The parsers can read straight from the mapped
+    buffer so the file is never copied into memory by a read().
+    """
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def is_buffer(value):
+    """
+    Return True if value is a buffer with the raw bytes of a source, e.g. bytes, memoryview or mmap.
+    On python 2.7 str is bytes and is always a path, so only bytearray, memoryview and mmap is buffers there.
+    """
+    if isinstance(value, (bytearray, memoryview, mmap.mmap)):
+        return True
+
+    return isinstance(value, bytes) and not isinstance(value, str)
+
+
+def text_stream(stream):
+    """
+    Return a text stream for stream, that can be a binary or a text stream.
+    """
+    if isinstance(stream.read(0), bytes):
+        return codecs.getreader("utf-8")(stream)
+
+    return stream
+
+
+def strip_compression_extension(path):
+    """
+    Return path without the compression extension, e.g. "data.json" for "data.json.gz",
+    so the file format can be found from the inner extension.
+    """
+    for ext, compression in compression_extensions:
+        if path.endswith(ext):
+            return path[:-len(ext)]
+
+    return path
+
+
+def detect_compression(path):
+    """
+    Return the compression of the file, "gzip", "bz2", "xz" or None, from the extension
+    or, if the extension is not a compression extension, from the first bytes in the file.
+    """
+    for ext, compression in compression_extensions:
+        if path.endswith(ext):
+            return compression
+
+    with open(path, "rb") as f:
+        head = f.read(6)
+
+    for magic, compression in compression_magic:
+        if head.startswith(magic):
+            return compression
+
+    return None
+
+
+def open_source(path, newline=None):
+    """
+    Open path for reading text. Compressed files is decompressed while they are read.
+
+    newline is passed on to the text stream. Use newline="" for csv files so the csv
+    module gets the line endings as they are in the file.
+    """
+    compression = detect_compression(path)
+    log.debug("Compression of %s: %s", path, compression)
+
+    if compression is None:
+        return io.open(path, "r", newline=newline)
+
+    if compression == "gzip":
+        raw = gzip.open(path, "rb")
+    elif compression == "bz2":
+        raw = bz2.BZ2File(path, "rb")
+    else:
+        if lzma is None:
+            raise CoreError("Unable to read xz compressed file, the lzma module is not available : {}".format(path))
+        raw = lzma.open(path, "rb")
+
+    return io.TextIOWrapper(raw, encoding="utf-8", newline=newline)
+
+
+class _JsonBuffer(object):
+    """
+    Sliding buffer over a stream that json values can be decoded from one at a time.
+    """
+
+    whitespace = " \t\n\r"
+    delimiters = whitespace + ",]}"
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Drop the consumed part of the buffer and read at least as much data as is buffered.
+        """
+        chunk = self.stream.read(max(self.chunk_size, len(self.buf) - self.pos))
+
+        self.eof = not chunk
+
+        if isinstance(chunk, bytes):
+            # Characters can be split between two chunks
+            chunk = self.text_decoder.decode(chunk, final=self.eof)
+
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character, or "" at the end of the stream.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self.whitespace:
+                self.pos += 1
+
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+
+            if self.eof:
+                return ""
+
+            self.fill()
+
+    def decode(self):
+        """
+        Decode the next value. The value must be followed by a delimiter in the buffer,
+        otherwise a number like 0.5 could be cut at "0." and decoded as 0, so more data
+        is read until that is true.
+        """
+        self.peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+
+                if self.eof or (end < len(self.buf) and self.buf[end] in self.delimiters):
+                    break
+            except ValueError:
+                if self.eof:
+                    raise
+
+            self.fill()
+
+        self.pos = end
+
+        # Do not let the decoded data pile up in the buffer
+        if self.pos > self.chunk_size:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+        return value
+
+
+def iter_json_array(stream, chunk_size=65536):
+    """
+    Yield the items of the json array in stream one at a time.
+
+    The stream is read in chunks into a buffer and each item is decoded with
+    JSONDecoder.raw_decode. Decoded data is dropped from the buffer so only the
+    item that is decoded is kept in memory, not the whole array.
+    """
+    reader = _JsonBuffer(stream, chunk_size)
+
+    c = reader.peek()
+
+    if c == "":
+        raise CoreError("Unable to load any data from source json file")
+
+    if c != "[":
+        raise NotSequenceError("Value: {} is not of a sequence type".format(reader.buf[reader.pos:reader.pos + 20]))
+
+    reader.pos += 1
+    index = 0
+
+    if reader.peek() == "]":
+        reader.pos += 1
+    else:
+        while True:
+            try:
+                yield reader.decode()
+            except ValueError as e:
+                raise CoreError("Unable to load item {} from source json file: {}".format(index, e))
+
+            index += 1
+            c = reader.peek()
+
+            if c == "]":
+                reader.pos += 1
+                break
+
+            if c != ",":
+                raise CoreError("Unable to load source json file. Expected ',' or ']' after item {}".format(index - 1))
+
+            reader.pos += 1
+
+    if reader.peek() != "":
+        raise CoreError("Unable to load source json file. Found data after the end of the array")
+
+
+def _to_bool(value):
+    v = value.lower()
+
+    if v == "true":
+        return True
+    if v == "false":
+        return False
+
+    raise ValueError(value)
+
+
+def _to_number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+# Types that can be given for a column in the csv header, e.g. "age:int"
+csv_column_types = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "number": _to_number,
+    "bool": _to_bool,
+}
+
+
+def iter_csv_rows(stream, delimiter=","):
+    """
+    Yield each row in a csv stream as a mapping from column name to value.
+
+    The first row is the header. A column can be given a type in the header, e.g.
+    "age:int", and the values in it is converted to that type. Values that can't be
+    converted is kept as strings so the schema reports them. Empty values is left out
+    of the row so they are reported as missing keys.
+    """
+    reader = csv.reader(stream, delimiter=delimiter)
+
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise CoreError("Unable to load any data from source csv file")
+
+    columns = []
+    for column in header:
+        name, _, type_name = column.partition(":")
+
+        if type_name and type_name not in csv_column_types:
+            raise CoreError("Unknown type '{}' for column '{}' in source csv file. Valid types: {}".format(
+                type_name, name, ", ".join(sorted(csv_column_types.keys()))))
+
+        columns.append((name, csv_column_types.get(type_name, None)))
+
+    for row in reader:
+        if not row:
+            continue
+
+        if len(row) > len(columns):
+            raise CoreError("Line {} in source csv file has more columns than the header".format(reader.line_num))
+
+        record = {}
+
+        for (name, convert), value in zip(columns, row):
+            if value == "":
+                continue
+
+            if convert is not None:
+                try:
+                    value = convert(value)
+                except ValueError:
+                    pass
+
+            record[name] = value
+
+        yield record
+
+
+archive_extensions = [".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz"]
+
+
+def is_archive(path):
+    """
+    Return True if path has the extension of a tar or zip archive.
+    """
+    return any(path.endswith(ext) for ext in archive_extensions)
+
+
+def _member_newline(name):
+    """
+    Csv and tsv members is read without newline translation, as the csv module requires.
+    """
+    return "" if format_from_name(name) in ("csv", "tsv") else None
+
+
+def iter_archive_members(path, pattern="*"):
+    """
+    Yield (name, stream) for each file in a tar or zip archive with a name that matches the
+    glob pattern. The members is read straight from the archive and never extracted to disk.
+    Each stream is closed when the next member is read.
+    """
+    if not os.path.exists(path):
+        raise CoreError("Provided archive do not exists on disk: {}".format(path))
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.filename.endswith("/") or not fnmatch.fnmatchcase(info.filename, pattern):
+                    continue
+
+                with io.TextIOWrapper(archive.open(info), encoding="utf-8", newline=_member_newline(info.filename)) as stream:
+                    yield info.filename, stream
+    elif tarfile.is_tarfile(path):
+        # Compressed tar files is detected by tarfile itself
+        with tarfile.open(path, "r:*") as archive:
+            for info in archive:
+                if not info.isfile() or not fnmatch.fnmatchcase(info.name, pattern):
+                    continue
+
+                with io.TextIOWrapper(archive.extractfile(info), encoding="utf-8", newline=_member_newline(info.name)) as stream:
+                    yield info.name, stream
+    else:
+        raise CoreError("Unable to read archive. Only tar and zip archives is supported : {}".format(path))
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+# python std lib
+import sys
+
+# The asyncio tests use syntax that is only available on python 3.7 or later
+collect_ignore = ["test_aio.py"] if sys.version_info < (3, 7) else []
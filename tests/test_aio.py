@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+
+""" Unit test for pyKwalify - asyncio """
+
+# python std lib
+import asyncio
+import copy
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# pykwalify imports
+from pykwalify.aio import AsyncValidator, iter_validate
+from pykwalify.core import Core, Validator
+from pykwalify.errors import CoreError, SchemaError
+
+# 3rd party imports
+import pytest
+
+
+schema = {
+    "type": "seq",
+    "range": {"max": 40},
+    "sequence": [{
+        "type": "map",
+        "mapping": {
+            "id": {"type": "int", "unique": True},
+            "name": {"type": "str", "pattern": "^[a-z]+$"},
+        },
+    }],
+}
+
+data = [{"id": i % 30, "name": "foo" if i % 9 else "Foo"} for i in range(50)]
+
+# The large parts of this schema is nested in a mapping
+nested_schema = {
+    "schema;item": {
+        "type": "map",
+        "mapping": {
+            "id": {"type": "int", "unique": True},
+            "name": {"type": "str", "pattern": "^[a-z]+$"},
+            "flag": {"type": "bool", "default": True},
+        },
+    },
+    "type": "map",
+    "matching-rule": "any",
+    "mapping": {
+        "items": {"type": "seq", "range": {"max": 40}, "sequence": [{"include": "item"}]},
+        "tags": {"type": "seq", "matching": "any", "sequence": [{"type": "int"}, {"type": "str", "enum": ["a", "b"]}]},
+        "regex;(^x_)": {"type": "map", "mapping": {"regex;(^[0-9]+$)": {"type": "int"}}},
+    },
+}
+
+nested_data = {
+    "items": data,
+    "tags": [1, "a", "c", 2.5],
+    "x_counts": dict((str(i), i if i % 11 else "n") for i in range(100)),
+    "other": 1,
+}
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestAio(object):
+
+    def core_errors(self, **kwargs):
+        c = Core(source_data=copy.deepcopy(data), schema_data=schema)
+        c.validate(raise_exception=False, **kwargs)
+        return c.validation_errors
+
+    def test_validate_async(self):
+        v = Validator(schema_data=schema)
+
+        with pytest.raises(SchemaError):
+            run(v.validate_async(data))
+        assert v.validation_errors == self.core_errors()
+
+        assert run(v.validate_async(data[1:5])) == data[1:5]
+
+    def test_executors(self):
+        """
+        All ways to run the validation should give the same errors as the core.
+        """
+        v = Validator(schema_data=schema)
+
+        with ProcessPoolExecutor(2) as processes, ThreadPoolExecutor(2) as threads:
+            for options in [dict(executor=threads), dict(executor=processes), dict(in_loop=True)]:
+                validator = AsyncValidator(v, chunk_size=7, **options)
+
+                run(validator.validate(data, raise_exception=False))
+                assert v.validation_errors == self.core_errors(), options
+
+                run(validator.validate(data, raise_exception=False, max_errors=3))
+                assert v.validation_errors == self.core_errors(max_errors=3), options
+
+                run(validator.validate(data, raise_exception=False, summary=True))
+                assert v.validation_errors == self.core_errors(summary=True), options
+
+    def test_in_loop_yields(self):
+        """
+        Other tasks should run between the chunks of a validation in the event loop.
+        """
+        validator = AsyncValidator(Validator(schema_data=schema), in_loop=True, chunk_size=5)
+        ticks = []
+
+        async def ticker():
+            for i in range(5):
+                ticks.append(i)
+                await asyncio.sleep(0)
+
+        async def main():
+            await asyncio.gather(validator.validate(data, raise_exception=False), ticker())
+
+        run(main())
+        assert ticks == [0, 1, 2, 3, 4]
+
+    def test_nested(self):
+        """
+        Data that is nested in a mapping should be validated in chunks with the same errors as the core.
+        """
+        v = Validator(schema_data=nested_schema)
+
+        def core_errors(**kwargs):
+            c = Core(source_data=copy.deepcopy(nested_data), schema_data=nested_schema)
+            c.validate(raise_exception=False, **kwargs)
+            return c.validation_errors
+
+        with ThreadPoolExecutor(2) as threads:
+            for options in [dict(executor=threads), dict(in_loop=True)]:
+                for chunk_size in [1, 7, 1000]:
+                    validator = AsyncValidator(v, chunk_size=chunk_size, **options)
+
+                    for kwargs in [{}, dict(max_errors=3), dict(max_errors=30), dict(summary=True)]:
+                        run(validator.validate(copy.deepcopy(nested_data), raise_exception=False, **kwargs))
+                        assert v.validation_errors == core_errors(**kwargs), (options, chunk_size, kwargs)
+
+        # Nodes at all depths is counted, not only the items of a root sequence
+        steps = list(iter_validate(v, copy.deepcopy(nested_data), [], chunk_size=5))
+        assert len(steps) > 50
+
+    def test_item_errors_not_kept(self):
+        """
+        Errors for the items of a sequence should be reported when the first invalid item is found
+        and not be kept until the whole sequence is validated.
+        """
+        v = Validator(schema_data={"type": "map", "mapping": {"items": {"type": "seq", "sequence": [{"type": "int"}]}}})
+        errors = []
+        steps = iter_validate(v, {"items": ["x"] + list(range(1000)) + ["y"]}, errors, chunk_size=10)
+
+        for i in range(5):
+            next(steps)
+
+        assert [e.path for e in errors] == ["/items/0"]
+
+        list(steps)
+        assert [e.path for e in errors] == ["/items/0", "/items/1001"]
+
+    def test_nested_in_loop_yields(self):
+        """
+        Other tasks should run while a mapping with a large nested sequence is validated in the event loop.
+        """
+        validator = AsyncValidator(Validator(schema_data=nested_schema), in_loop=True, chunk_size=5)
+
+        async def main():
+            task = asyncio.ensure_future(validator.validate(copy.deepcopy(nested_data), raise_exception=False))
+            ticks = 0
+
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0)
+
+            await task
+            return ticks
+
+        assert run(main()) > 50
+
+    def test_concurrency_limit(self):
+        validator = AsyncValidator(Validator(schema_data=schema), in_loop=True, max_concurrency=2, chunk_size=5)
+        validate = validator._validate
+        running = [0]
+        peak = [0]
+
+        async def counted(*args):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            try:
+                return await validate(*args)
+            finally:
+                running[0] -= 1
+
+        validator._validate = counted
+
+        async def main():
+            await asyncio.gather(*[validator.validate(data, raise_exception=False) for i in range(6)])
+
+        run(main())
+        assert peak[0] == 2
+
+    def test_cancel(self):
+        validator = AsyncValidator(Validator(schema_data=schema), in_loop=True, chunk_size=1)
+
+        async def main():
+            task = asyncio.ensure_future(validator.validate(data * 100))
+            await asyncio.sleep(0)
+            task.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        run(main())
+
+        # The validation of a nested sequence stops at the next chunk, the default values
+        # is only added to the items that was validated before that
+        validator = AsyncValidator(Validator(schema_data=nested_schema), in_loop=True, chunk_size=5)
+        nested = copy.deepcopy(nested_data)
+
+        async def main():
+            task = asyncio.ensure_future(validator.validate(nested))
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            task.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        run(main())
+        assert "flag" in nested["items"][0]
+        assert "flag" not in nested["items"][-1]
+
+        # A validation in a thread stops at the next chunk
+        with ThreadPoolExecutor(1) as threads:
+            validator = AsyncValidator(Validator(schema_data=schema), executor=threads, chunk_size=1)
+
+            async def main():
+                task = asyncio.ensure_future(validator.validate(data * 1000))
+                await asyncio.sleep(0.01)
+                task.cancel()
+
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+
+            run(main())
+
+
+# Extension with a coroutine func that asks a cache service on a local port if the name is known
+cache_extension = """
+import asyncio
+
+
+async def known_name(value, rule_obj, path):
+    reader, writer = await asyncio.open_connection("127.0.0.1", {port})
+    writer.write(value.encode("utf-8") + b"\\n")
+    answer = await reader.readline()
+    writer.close()
+    return answer == b"yes\\n"
+"""
+
+func_schema = {
+    "type": "seq",
+    "sequence": [{
+        "type": "map",
+        "mapping": {
+            "name": {"type": "str", "func": "known_name"},
+        },
+    }],
+}
+
+func_data = [{"name": "foo" if i % 7 else "bar"} for i in range(30)]
+
+
+class CacheService(object):
+    """
+    Local stand-in for a cache service that knows the name 'foo'. Keeps track of
+    how many requests it handles at the same time.
+    """
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self.requests = 0
+
+    async def handle(self, reader, writer):
+        self.running += 1
+        self.requests += 1
+        self.peak = max(self.peak, self.running)
+
+        try:
+            name = await reader.readline()
+            await asyncio.sleep(0.01)
+            writer.write(b"yes\n" if name == b"foo\n" else b"no\n")
+            await writer.drain()
+        finally:
+            self.running -= 1
+            writer.close()
+
+    async def start(self, tmpdir):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        path = tmpdir.join("cache_extension.py")
+        path.write(cache_extension.format(port=self.server.sockets[0].getsockname()[1]))
+        return str(path)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class TestAsyncFunc(object):
+
+    def expected_paths(self):
+        return ["/{}/name".format(i) for i, item in enumerate(func_data) if item["name"] != "foo"]
+
+    def test_validate_async(self, tmpdir):
+        """
+        Coroutine functions is awaited concurrently, no more then func_concurrency at a time,
+        and each false result is an error at the path of the value.
+        """
+        service = CacheService()
+
+        async def main():
+            extension = await service.start(tmpdir)
+
+            try:
+                for options in [dict(in_loop=True), dict()]:
+                    for codegen in [False, True]:
+                        v = Validator(schema_data=func_schema, extensions=[extension], codegen=codegen, func_concurrency=5)
+                        await AsyncValidator(v, chunk_size=7, **options).validate(func_data, raise_exception=False)
+
+                        assert [e.path for e in v.validation_errors_exceptions] == self.expected_paths()
+                        assert "did not validate with extension function 'known_name'" in v.validation_errors[0]
+            finally:
+                await service.stop()
+
+        run(main())
+        assert service.requests == len(func_data) * 4
+        assert 1 < service.peak <= 5
+
+    def test_validate(self, tmpdir):
+        """
+        validate() awaits the coroutine functions in a event loop of its own.
+        """
+        loop = asyncio.new_event_loop()
+        service = CacheService()
+        extension = loop.run_until_complete(service.start(tmpdir))
+
+        # The service must run while validate() blocks, so it gets a thread with the loop
+        t = threading.Thread(target=loop.run_forever)
+        t.start()
+
+        try:
+            v = Validator(schema_data=func_schema, extensions=[extension], func_concurrency=3)
+            assert not v.is_valid(func_data)
+            v.validate(func_data, raise_exception=False)
+            assert [e.path for e in v.validation_errors_exceptions] == self.expected_paths()
+            assert 1 < service.peak <= 3
+
+            c = Core(source_data=func_data[1:3], schema_data=func_schema, extensions=[extension])
+            assert c.validate()
+
+            # iter_errors awaits the functions at the end of each chunk
+            assert [e.path for e in v.iter_errors(func_data[:1])] == ["/0/name"]
+        finally:
+            asyncio.run_coroutine_threadsafe(service.stop(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            t.join()
+            loop.close()
+
+    def test_records(self, tmpdir):
+        """
+        Sources that is validated one record or chunk at a time await the coroutine functions of
+        many records together, and the errors is tagged with the record they was found in.
+        """
+        loop = asyncio.new_event_loop()
+        service = CacheService()
+        extension = loop.run_until_complete(service.start(tmpdir))
+
+        t = threading.Thread(target=loop.run_forever)
+        t.start()
+
+        try:
+            source = tmpdir.join("data.jsonl")
+            source.write("".join(json.dumps(item) + "\n" for item in func_data))
+            lines = [i + 1 for i, item in enumerate(func_data) if item["name"] != "foo"]
+
+            v = Validator(schema_data=func_schema["sequence"][0], extensions=[extension], func_concurrency=3)
+            v.validate_lines(str(source), raise_exception=False)
+            assert [(e.path, e.line) for e in v.validation_errors_exceptions] == [("/name", i) for i in lines]
+            assert 1 < service.peak <= 3
+
+            service.peak = 0
+            c = Core(source_file=str(source), schema_data=func_schema["sequence"][0], extensions=[extension])
+            assert [(e.path, e.line) for e in c.iter_errors()] == [("/name", i) for i in lines]
+            assert service.peak > 1
+
+            service.peak = 0
+            v = Validator(schema_data=func_schema, extensions=[extension], func_concurrency=3)
+            v.validate_parallel(func_data, jobs=1, chunk_size=10, raise_exception=False)
+            assert [e.path for e in v.validation_errors_exceptions] == self.expected_paths()
+            assert 1 < service.peak <= 3
+        finally:
+            asyncio.run_coroutine_threadsafe(service.stop(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            t.join()
+            loop.close()
+
+    def test_sequence_matching(self, tmpdir):
+        """
+        Coroutine functions is awaited after the walk, so they can't be used where their result
+        would decide which rule a sequence item matches.
+        """
+        path = tmpdir.join("check_extension.py")
+        path.write("async def check(value, rule_obj, path):\n    return value != 'bad'\n")
+
+        for schema in [
+            {"type": "seq", "sequence": [{"type": "str", "func": "check"}, {"type": "str"}]},
+            {"type": "seq", "matching": "all", "sequence": [{"type": "map", "mapping": {"a": {"type": "str", "func": "check"}}}, {"type": "str"}]},
+            {"type": "seq", "matching": "*", "sequence": [{"type": "str", "func": "check"}]},
+            {"schema;item": {"type": "str", "func": "check"}, "type": "seq", "sequence": [{"include": "item"}, {"type": "int"}]},
+        ]:
+            with pytest.raises(CoreError):
+                Validator(schema_data=schema, extensions=[str(path)])
+
+            with pytest.raises(CoreError):
+                Core(source_data=["bad"], schema_data=schema, extensions=[str(path)]).validate()
+
+        # One rule with matching any is fine
+        v = Validator(schema_data={"type": "seq", "sequence": [{"type": "str", "func": "check"}]}, extensions=[str(path)])
+        assert [e.path for e in v.iter_errors(["ok", "bad"])] == ["/1"]
+
+    def test_exception(self, tmpdir):
+        path = tmpdir.join("failing_extension.py")
+        path.write("async def known_name(value, rule_obj, path):\n    raise ValueError(value)\n")
+        v = Validator(schema_data=func_schema, extensions=[str(path)])
+
+        with pytest.raises(ValueError):
+            v.validate(func_data)
+
+        with pytest.raises(ValueError):
+            run(v.validate_async(func_data))
@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 
 # python std lib
+import io
+import json
 import os
 import sys
+import tarfile
 
 # pykwalify package imports
 from pykwalify import cli
+from pykwalify.errors import SchemaError
+
+# 3rd party imports
+import pytest
 
 
 class TestCLI(object):
@@ -26,7 +33,7 @@ class TestCLI(object):
         ]
 
         expected = {
-            '--data-file': str(input),
+            '--data-file': [str(input)],
             '--schema-file': [str(schema_file)],
             '--quiet': False,
             '--verbose': 1,
@@ -60,3 +67,225 @@ class TestCLI(object):
         cli_args = cli.parse_cli()
         c = cli.run(cli_args)
         assert c.validation_errors == []
+
+    def test_run_cli_max_errors(self):
+        """
+        Validation should stop after the number of errors given with --max-errors or --fail-fast
+        """
+        input = self.f("cli/2a.yaml")
+        schema_file = self.f("cli/2b.yaml")
+
+        sys.argv = [
+            'scripts/pykwalify',
+            '-d', str(input),
+            '-s', str(schema_file),
+            '--max-errors', '2',
+        ]
+
+        cli_args = cli.parse_cli()
+        assert cli_args["--max-errors"] == "2"
+
+        with pytest.raises(SchemaError):
+            cli.run(cli_args)
+
+        sys.argv = sys.argv[:-2] + ['--fail-fast']
+        cli_args = cli.parse_cli()
+        assert cli_args["--fail-fast"] is True
+
+        with pytest.raises(SchemaError) as ex:
+            cli.run(cli_args)
+        assert ex.value.msg == "Schema validation failed:\n - Value '1' is not of type 'str'. Path: '/0'."
+
+        sys.argv = sys.argv[:-1] + ['--max-errors', '0']
+        with pytest.raises(SystemExit):
+            cli.parse_cli()
+
+    def test_run_cli_stream(self):
+        """
+        Each document in a multi document file should be validated when --stream is used
+        """
+        input = self.f("cli/3a.yaml")
+        schema_file = self.f("cli/3b.json")
+
+        sys.argv = [
+            'scripts/pykwalify',
+            '-d', str(input),
+            '-s', str(schema_file),
+            '--stream',
+        ]
+
+        cli_args = cli.parse_cli()
+        assert cli_args["--stream"] is True
+
+        with pytest.raises(SchemaError) as ex:
+            cli.run(cli_args)
+        assert ex.value.msg == (
+            "Schema validation failed:\n"
+            " - Document 1: Value '1' is not of type 'str'. Path: '/1'.\n"
+            " - Document 2: Value '2' is not of type 'str'. Path: '/0'."
+        )
+
+        # Items in a top level json array is validated one at a time
+        sys.argv[2] = self.f("cli/5a.json")
+        cli_args = cli.parse_cli()
+
+        with pytest.raises(SchemaError) as ex:
+            cli.run(cli_args)
+        assert ex.value.msg == (
+            "Schema validation failed:\n"
+            " - Value '1' is not of type 'str'. Path: '/1'.\n"
+            " - Value '2' is not of type 'str'. Path: '/3'."
+        )
+
+    def test_run_cli_stream_records(self, tmpdir):
+        """
+        Json lines and csv files should be validated one record at a time when --stream is used
+        """
+        input = tmpdir.join("rows.csv")
+        input.write("id:int,name\n1,foo\nx,bar\n")
+
+        schema_file = tmpdir.join("schema.json")
+        schema_file.write(json.dumps({"type": "seq", "sequence": [{"type": "map", "mapping": {"id": {"type": "int"}, "name": {"type": "str"}}}]}))
+
+        sys.argv = [
+            'scripts/pykwalify',
+            '-d', str(input),
+            '-s', str(schema_file),
+            '--stream',
+        ]
+
+        with pytest.raises(SchemaError) as ex:
+            cli.run(cli.parse_cli())
+        assert ex.value.msg == (
+            "Schema validation failed:\n"
+            " - Value 'x' is not of type 'int'. Path: '/1/id'."
+        )
+
+        sys.argv[2] = self.f("cli/4a.jsonl")
+        sys.argv[4] = self.f("cli/3b.json")
+
+        with pytest.raises(SchemaError) as ex:
+            cli.run(cli.parse_cli())
+        assert ex.value.msg == (
+            "Schema validation failed:\n"
+            " - Line 2: Value '1' is not of type 'str'. Path: '/1'.\n"
+            " - Line 5: Value '2' is not of type 'str'. Path: '/0'."
+        )
+
+    def test_run_cli_json_lines(self):
+        """
+        Each line in a .jsonl file should be validated as one record
+        """
+        input = self.f("cli/4a.jsonl")
+        schema_file = self.f("cli/2b.yaml")
+
+        sys.argv = [
+            'scripts/pykwalify',
+            '-d', str(input),
+            '-s', str(schema_file),
+        ]
+
+        cli_args = cli.parse_cli()
+
+        with pytest.raises(SchemaError) as ex:
+            cli.run(cli_args)
+        assert ex.value.msg == (
+            "Schema validation failed:\n"
+            " - Line 2: Value '1' is not of type 'str'. Path: '/1'.\n"
+            " - Line 5: Value '2' is not of type 'str'. Path: '/0'."
+        )
+
+    def test_run_cli_archive(self, tmpdir):
+        """
+        Files in a archive should be validated when the data file is a archive
+        """
+        path = str(tmpdir.join("bundle.tar"))
+        with tarfile.open(path, "w") as archive:
+            archive.add(self.f("cli/2a.yaml"), arcname="data/2a.yaml")
+            archive.add(self.f("cli/3a.yaml"), arcname="other/3a.yaml")
+
+        sys.argv = [
+            'scripts/pykwalify',
+            '-d', path,
+            '-s', self.f("cli/2b.yaml"),
+            '-m', 'data/*.yaml',
+        ]
+
+        cli_args = cli.parse_cli()
+
+        with pytest.raises(SchemaError) as ex:
+            cli.run(cli_args)
+        assert ex.value.msg.startswith("Schema validation failed:\n - data/2a.yaml: Value '1' is not of type 'str'. Path: '/0'.")
+
+    def test_run_cli_stdin(self, monkeypatch):
+        """
+        The data file should be read from stdin when it is given as - together with --format
+        """
+        with open(self.f("cli/2a.yaml"), "rb") as f:
+            monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(f.read())))
+
+        sys.argv = [
+            'scripts/pykwalify',
+            '-d', '-',
+            '-s', self.f("cli/2b.yaml"),
+            '--format', 'yaml',
+            '--fail-fast',
+        ]
+
+        cli_args = cli.parse_cli()
+        assert cli_args["--format"] == "yaml"
+
+        with pytest.raises(SchemaError) as ex:
+            cli.run(cli_args)
+        assert ex.value.msg == "Schema validation failed:\n - Value '1' is not of type 'str'. Path: '/0'."
+
+        # The format can't be found from the extension for stdin
+        sys.argv = sys.argv[:5] + ['--fail-fast']
+        with pytest.raises(SystemExit):
+            cli.parse_cli()
+
+        sys.argv = sys.argv[:5] + ['--format', 'xml']
+        with pytest.raises(SystemExit):
+            cli.parse_cli()
+
+    def test_run_cli_many_files(self, tmpdir):
+        """
+        The result for each data file should be reported in the order the files was given,
+        with and without worker processes.
+        """
+        files = []
+        for i in range(6):
+            f = tmpdir.join("{}.yaml".format(i))
+            f.write("- foo\n- {}\n".format("bar" if i % 2 == 0 else i))
+            files.append(str(f))
+
+        sys.argv = ['scripts/pykwalify', '-s', self.f("cli/2b.yaml")]
+        for f in files:
+            sys.argv += ['-d', f]
+
+        cli_args = cli.parse_cli()
+        assert cli_args["--data-file"] == files
+
+        with pytest.raises(SchemaError) as ex:
+            cli.run(cli_args)
+        assert ex.value.msg == "Schema validation failed for 3 of 6 data files:\n - {}\n - {}\n - {}".format(files[1], files[3], files[5])
+
+        sys.argv += ['-j', '3']
+        cli_args = cli.parse_cli()
+
+        with pytest.raises(SchemaError) as ex2:
+            cli.run(cli_args)
+        assert ex2.value.msg == ex.value.msg
+
+        # All files is valid
+        sys.argv = ['scripts/pykwalify', '-s', self.f("cli/2b.yaml"), '-d', files[0], '-d', files[2], '-j', '2']
+        results = cli.run(cli.parse_cli())
+        assert [(r.path, r.errors, r.error) for r in results] == [(files[0], [], None), (files[2], [], None)]
+
+        sys.argv = sys.argv[:-2] + ['-j', '0']
+        with pytest.raises(SystemExit):
+            cli.parse_cli()
+
+        sys.argv = sys.argv[:-2] + ['--stream']
+        with pytest.raises(SystemExit):
+            cli.parse_cli()
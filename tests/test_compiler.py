@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+""" Unit test for pyKwalify - Compiler """
+
+# python std lib
+import copy
+import os
+
+# pykwalify imports
+import pykwalify
+from pykwalify.core import Core, Validator
+from pykwalify.errors import CoreError, SchemaError, NotSequenceError
+
+# 3rd party imports
+import pytest
+import yaml
+
+
+class TestCompiler(object):
+
+    def setUp(self):
+        pykwalify.partial_schemas = {}
+
+    def f(self, *args):
+        return os.path.join(os.path.dirname(os.path.realpath(__file__)), "files", *args)
+
+    def test_same_errors_as_core(self):
+        """
+        The compiled functions must report exactly the same errors as the core do for all test files.
+        """
+        for folder in ["success", "fail"]:
+            for name in sorted(os.listdir(self.f(folder))):
+                with open(self.f(folder, name), "r") as stream:
+                    yaml_data = yaml.safe_load(stream)
+
+                if name == "16s.yaml":
+                    # TODO: Currently slightly broken in the core
+                    continue
+
+                c = Core(source_data=copy.deepcopy(yaml_data["data"]), schema_data=copy.deepcopy(yaml_data["schema"]))
+                c.validate(raise_exception=False)
+
+                v = Validator(schema_data=yaml_data["schema"], codegen=True)
+                v.validate(yaml_data["data"], raise_exception=False)
+
+                assert v.validation_errors == c.validation_errors, "Different errors for file : {}".format(name)
+
+    def test_compiled_validator(self):
+        v = Validator(schema_data={
+            "type": "seq",
+            "range": {"max": 3},
+            "sequence": [{
+                "type": "map",
+                "mapping": {
+                    "id": {"type": "int", "unique": True},
+                    "name": {"type": "str", "pattern": "^[a-z]+$", "required": True},
+                    "state": {"type": "str", "enum": ["on", "off"], "default": "on"},
+                },
+            }],
+        }, codegen=True)
+
+        data = [{"id": 1, "name": "foo"}, {"id": 2, "name": "bar", "state": "off"}]
+        assert v.validate(data) == [{"id": 1, "name": "foo", "state": "on"}, {"id": 2, "name": "bar", "state": "off"}]
+
+        with pytest.raises(SchemaError):
+            v.validate([{"id": 1, "name": "Foo"}, {"id": 1, "name": "bar", "state": "x"}, {"id": 3}, {"id": 4, "name": "a"}])
+
+        assert v.validation_errors == [
+            "Type 'seq' has size of '4', greater than max limit '3'. Path: ''",
+            "Value '1' is not unique. Previous path: '/0/id'. Path: '/1/id'",
+            "Value 'Foo' does not match pattern '^[a-z]+$'. Path: '/0/name'",
+            "Enum 'x' does not exist. Path: '/1/state'",
+            "Cannot find required key 'name'. Path: '/2'",
+        ]
+
+        v.validate([{"id": 1, "name": "Foo"}, {"id": 2, "name": "Bar"}], raise_exception=False, fail_fast=True)
+        assert v.validation_errors == ["Value 'Foo' does not match pattern '^[a-z]+$'. Path: '/0/name'"]
+        assert not v.is_valid([{"id": 1, "name": "Foo"}])
+        assert v.is_valid([{"id": 1, "name": "foo"}])
+
+        with pytest.raises(NotSequenceError):
+            v.validate("foo")
+
+    def test_recursive_include(self):
+        v = Validator(schema_data={
+            "schema;node": {
+                "type": "map",
+                "mapping": {
+                    "name": {"type": "str"},
+                    "children": {"type": "seq", "sequence": [{"include": "node"}]},
+                },
+            },
+            "include": "node",
+        }, codegen=True)
+
+        v.validate({"name": "a", "children": [{"name": "b", "children": [{"name": "c"}]}]})
+
+        with pytest.raises(SchemaError):
+            v.validate({"name": "a", "children": [{"name": 1}]})
+        assert v.validation_errors == ["Value '1' is not of type 'str'. Path: '/children/0/name'"]
+
+    def test_missing_func(self):
+        v = Validator(schema_data={"type": "str", "func": "foobar"}, codegen=True)
+
+        with pytest.raises(CoreError) as ex:
+            v.validate("foo")
+        assert "Did not find method 'foobar' in any loaded extension file" in str(ex.value)
@@ -3,12 +3,19 @@
 """ Unit test for pyKwalify - Core """
 
 # python std lib
+import bz2
+import gzip
+import io
+import json
+import logging
 import os
+import threading
+import zipfile
 
 # pykwalify imports
 import pykwalify
-from pykwalify.core import Core
-from pykwalify.errors import SchemaError, CoreError
+from pykwalify.core import Core, Validator
+from pykwalify.errors import SchemaError, CoreError, NotMappingError
 
 # 3rd party imports
 import pytest
@@ -212,6 +219,679 @@ class TestCore(object):
         with pytest.raises(SchemaError):
             Core(source_data=True, schema_data={"type": "text"}).validate()
 
+    def test_validator_reuse(self):
+        """
+        A Validator should compile the schema once and be usable for any number of documents.
+        """
+        v = Validator(schema_data={
+            "type": "map",
+            "mapping": {
+                "name": {"type": "str", "required": True},
+                "age": {"type": "int", "default": 1},
+            },
+        })
+        root_rule = v.root_rule
+
+        assert v.validate({"name": "foo"}) == {"name": "foo", "age": 1}
+        assert v.validate({"name": "bar", "age": 2}) == {"name": "bar", "age": 2}
+        assert v.root_rule is root_rule
+
+        with pytest.raises(SchemaError):
+            v.validate({"age": 3})
+        assert v.validation_errors == ["Cannot find required key 'name'. Path: ''"]
+
+        v.validate({"name": "baz"}, raise_exception=False)
+        assert v.validation_errors == []
+        assert v.root_rule is root_rule
+
+        with pytest.raises(CoreError) as ex:
+            Validator()
+        assert "No schema file/data was loaded" in str(ex.value)
+
+    def test_validator_threads(self, tmpdir):
+        """
+        Threads that share one Validator should each get a SchemaError with only their own errors.
+        """
+        v = Validator(schema_data={"type": "seq", "sequence": [{"type": "map", "mapping": {"id": {"type": "int"}}}]})
+        csv_file = tmpdir.join("data.csv")
+        csv_file.write("id\nx\n")
+        failures = []
+
+        def run(n):
+            for i in range(200):
+                try:
+                    if n % 3 == 0:
+                        v.validate([{"id": n}])
+                        continue
+                    elif n % 3 == 1:
+                        v.validate([{"id": "t{}".format(n)}])
+                    else:
+                        v.validate_file(str(csv_file))
+                except SchemaError as e:
+                    expected = "Value 't{}' is not of type 'int'. Path: '/0/id'".format(n) if n % 3 == 1 else "Value 'x' is not of type 'int'"
+                    if expected not in e.msg or e.msg.count(" - ") != 1:
+                        failures.append(e.msg)
+                except Exception as e:
+                    failures.append(repr(e))
+                else:
+                    failures.append("no error in thread {}".format(n))
+
+        threads = [threading.Thread(target=run, args=(n, )) for n in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert failures == []
+        assert v.source is None and v.source_file is None
+
+    def test_validator_resolves_includes_and_funcs(self, tmpdir):
+        """
+        Includes and funcs should be linked to their targets when the schema is compiled.
+        """
+        ext = tmpdir.join("ext.py")
+        ext.write("def ext_str(value, rule_obj, path):\n    return value != 'bad'\n")
+
+        v = Validator(
+            schema_data={
+                "schema;sub": {"type": "str", "func": "ext_str"},
+                "type": "seq",
+                "sequence": [{"include": "sub"}],
+            },
+            extensions=[str(ext)],
+        )
+
+        include_rule = v.root_rule._sequence[0]
+        assert include_rule._include_rule is pykwalify.partial_schemas["sub"]
+        assert include_rule._include_rule._func_method is not None
+
+        v.validate(["foo", "bar"])
+
+        with pytest.raises(CoreError):
+            v.validate(["bad"])
+
+    def test_unique_in_sequence(self):
+        """
+        Unique constraints should be checked in one pass and items without the key should be skipped.
+        """
+        schema = {
+            "type": "seq",
+            "sequence": [{
+                "type": "map",
+                "mapping": {
+                    "id": {"type": "int", "unique": True},
+                    "name": {"type": "str", "unique": True},
+                },
+            }],
+        }
+        data = [{"id": 1, "name": "a"}, {"id": 2}, {"id": 1, "name": "b"}, {"id": 3, "name": "a"}]
+
+        c = Core(source_data=data, schema_data=schema)
+        c.validate(raise_exception=False)
+        assert c.validation_errors == [
+            "Value '1' is not unique. Previous path: '/0/id'. Path: '/2/id'",
+            "Value 'a' is not unique. Previous path: '/0/name'. Path: '/3/name'",
+        ]
+
+        # A large sequence should be validated in linear time
+        data = [{"id": i, "name": str(i)} for i in range(5000)]
+        Validator(schema_data=schema).validate(data)
+
+    def test_mapping_with_exact_and_regex_keys(self):
+        """
+        Keys with a exact rule should use that rule even if regex keys is defined in the same mapping.
+        """
+        schema = {
+            "type": "map",
+            "mapping": {
+                "name": {"type": "str"},
+                "regex;(mi.+)": {"type": "int"},
+                "regex;(m.+)": {"type": "int", "range": {"max": 10}},
+            },
+        }
+
+        c = Core(source_data={"name": "foo", "mic": 1, "mac": 11, "foo": 2}, schema_data=schema)
+        c.validate(raise_exception=False)
+        assert c.validation_errors == [
+            "Type 'scalar' has size of '11', greater than max limit '10'. Path: '/mac'",
+            "Key 'foo' does not match any regex 'mi.+  m.+'. Path: ''",
+        ]
+
+    def test_validator_pattern_cache(self):
+        """
+        Pattern results should be cached per rule when pattern_cache_size is set.
+        """
+        schema = {"type": "seq", "sequence": [{"type": "text", "pattern": "^[0-9]{3}$"}]}
+
+        v = Validator(schema_data=schema, pattern_cache_size=10)
+        v.validate(["200", "404", "200", 200, "200"])
+        assert v.pattern_cache_stats() == [{"pattern": "^[0-9]{3}$", "hits": 3, "misses": 2, "size": 2, "max_size": 10}]
+
+        with pytest.raises(SchemaError):
+            v.validate(["20"])
+        assert v.validation_errors == ["Value '20' does not match pattern '^[0-9]{3}$'. Path: '/0'"]
+
+        assert Validator(schema_data=schema).pattern_cache_stats() == []
+
+    def test_enum_file(self, tmpdir):
+        """
+        Values should be looked up in the enum file.
+        """
+        enum_f = tmpdir.join("skus.txt")
+        enum_f.write("A1\nA2\nB7\n")
+
+        v = Validator(schema_data={"type": "seq", "sequence": [{"type": "str", "enum-file": str(enum_f)}]})
+        v.validate(["A1", "B7"])
+
+        with pytest.raises(SchemaError):
+            v.validate(["A1", "A3", None])
+        assert v.validation_errors == [
+            "Enum 'A3' does not exist. Path: '/1'",
+            "Enum 'None' does not exist. Path: '/2'",
+            "Value 'None' is not of type 'str'. Path: '/2'",
+        ]
+
+    def test_fail_fast_and_max_errors(self):
+        """
+        Validation should stop when the max number of errors is found.
+        """
+        schema = {
+            "type": "seq",
+            "range": {"max": 4},
+            "sequence": [{"type": "map", "mapping": {"name": {"type": "str", "required": True}}}],
+        }
+        data = [{"name": 1}, {"name": 2}, {}, {"name": "foo"}, {"name": 3}]
+
+        c = Core(source_data=data, schema_data=schema)
+        c.validate(raise_exception=False)
+        assert c.validation_errors == [
+            "Type 'seq' has size of '5', greater than max limit '4'. Path: ''",
+            "Value '1' is not of type 'str'. Path: '/0/name'",
+            "Value '2' is not of type 'str'. Path: '/1/name'",
+            "Cannot find required key 'name'. Path: '/2'",
+            "Value '3' is not of type 'str'. Path: '/4/name'",
+        ]
+
+        c.validate(raise_exception=False, max_errors=3)
+        assert c.validation_errors == [
+            "Type 'seq' has size of '5', greater than max limit '4'. Path: ''",
+            "Value '1' is not of type 'str'. Path: '/0/name'",
+            "Value '2' is not of type 'str'. Path: '/1/name'",
+        ]
+
+        with pytest.raises(SchemaError):
+            c.validate(fail_fast=True)
+        assert c.validation_errors == ["Type 'seq' has size of '5', greater than max limit '4'. Path: ''"]
+
+        assert not c.is_valid()
+        assert Core(source_data=data[3:4], schema_data=schema).is_valid()
+        assert not Core(source_data="foo", schema_data=schema).is_valid()
+
+    def test_fail_fast_mapping_value(self):
+        """
+        The error limit should stop the validation when it is hit by a value in a mapping.
+        """
+        schema = {"type": "map", "mapping": {"a": {"type": "int"}, "b": {"type": "int"}}}
+        data = {"a": "x", "b": "y"}
+
+        c = Core(source_data=data, schema_data=schema)
+        assert not c.is_valid()
+
+        with pytest.raises(SchemaError):
+            c.validate(fail_fast=True)
+        assert len(c.validation_errors) == 1
+
+        c.validate(raise_exception=False, max_errors=2)
+        assert len(c.validation_errors) == 2
+
+    def test_sequence_error_tracking(self, tmpdir):
+        """
+        Errors for valid items should only be kept when a later invalid item can report them.
+        """
+        schema = {"type": "seq", "matching": "any", "sequence": [{"type": "int"}, {"type": "bool"}]}
+        data = [1, "x", True, 1.5]
+        expected = [
+            "Value '1' is not of type 'bool'. Path: '/0'",
+            "Value 'x' is not of type 'int'. Path: '/1'",
+            "Value 'x' is not of type 'bool'. Path: '/1'",
+            "Value '1.5' is not of type 'int'. Path: '/3'",
+            "Value '1.5' is not of type 'bool'. Path: '/3'",
+        ]
+
+        f = tmpdir.join("data.json")
+        f.write(json.dumps(data))
+
+        for v in [Validator(schema_data=schema), Validator(schema_data=schema, codegen=True)]:
+            v.validate(data, raise_exception=False)
+            assert v.validation_errors == expected
+
+            v.validate_json_array(str(f), raise_exception=False)
+            assert v.validation_errors == expected
+
+            v.validate_events(str(f), raise_exception=False)
+            assert v.validation_errors == expected
+
+        # Errors is never reported for '*', so none is kept for a long sequence
+        tracemalloc = pytest.importorskip("tracemalloc")
+        schema = dict(schema, matching="*")
+        v = Validator(schema_data=schema)
+        items = ("x" for i in range(20000))
+
+        tracemalloc.start()
+        try:
+            errors = []
+            assert v._validate_sequence_items(items, v.root_rule, "", errors) == 20000
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        assert errors == []
+        assert peak < 1024 * 1024
+
+    def test_error_log(self):
+        """
+        Only the first errors, or the first groups of a summary, should be formatted in the error log.
+        """
+        v = Validator(schema_data={"type": "seq", "sequence": [{"type": "int"}]})
+        messages = []
+
+        class Handler(logging.Handler):
+            def emit(self, record):
+                messages.append(record.getMessage())
+
+        logger = logging.getLogger("pykwalify.core")
+        handler = Handler(logging.ERROR)
+        logger.addHandler(handler)
+
+        # The logging config of the cli tests disables the existing loggers
+        disabled, logger.disabled = logger.disabled, False
+        level = logger.level
+        logger.setLevel(logging.ERROR)
+
+        try:
+            v.validate([str(i) for i in range(100)], raise_exception=False)
+
+            assert " --- Found 100 errors ---" in messages
+            assert " - Value '9' is not of type 'int'. Path: '/9'" in messages
+            assert " - Value '10' is not of type 'int'. Path: '/10'" not in messages
+            assert " - ... 90 more errors" in messages
+            assert len(v.validation_errors) == 100
+
+            # 15 groups with 4 errors each
+            del messages[:]
+            v = Validator(schema_data={"type": "map", "mapping": dict(("k{}".format(i), {"type": "seq", "sequence": [{"type": "int"}]}) for i in range(15))})
+            v.validate(dict(("k{}".format(i), ["a", "b", "c", "d"]) for i in range(15)), raise_exception=False, summary=True)
+
+            assert " --- Found 60 errors ---" in messages
+            assert " - 4 error(s) at '/k0/*', e.g. Value 'a' is not of type 'int'. Path: '/k0/0'" in messages
+            assert " - ... 5 more error groups" in messages
+            assert len(messages) == 1 + 1 + 10 + 1 + 1
+        finally:
+            logger.removeHandler(handler)
+            logger.disabled = disabled
+            logger.setLevel(level)
+
+    def test_validation_summary(self):
+        """
+        Errors should be grouped by rule and path template when summary is used.
+        """
+        schema = {"type": "map", "mapping": {"items": {"type": "seq", "sequence": [{"type": "map", "mapping": {"price": {"type": "int"}}}]}}}
+        data = {"items": [{"price": str(i)} for i in range(100)]}
+
+        c = Core(source_data=data, schema_data=schema)
+        with pytest.raises(SchemaError) as ex:
+            c.validate(summary=True)
+
+        assert c.validation_errors == ["100 error(s) at '/items/*/price', e.g. Value '0' is not of type 'int'. Path: '/items/0/price'"]
+        assert len(c.validation_errors_exceptions) == 100
+        assert "100 error(s) at '/items/*/price'" in ex.value.msg
+
+    def test_iter_errors(self):
+        """
+        Errors should be yielded one at a time and the validation should stop when the consumer stops.
+        """
+        schema = {"type": "seq", "sequence": [{"type": "int"}]}
+        data = ["a", "b", 1, "c"]
+
+        c = Core(source_data=data, schema_data=schema)
+        errors = list(c.iter_errors())
+        assert [str(e) for e in errors] == [
+            "Value 'a' is not of type 'int'. Path: '/0'",
+            "Value 'b' is not of type 'int'. Path: '/1'",
+            "Value 'c' is not of type 'int'. Path: '/3'",
+        ]
+        assert c.validation_errors is None
+
+        v = Validator(schema_data=schema)
+        assert list(v.iter_errors([1, 2])) == []
+
+        # Consumer stops after the first error
+        gen = v.iter_errors(["x"] * 1000)
+        first = next(gen)
+        assert first.path == "/0"
+        gen.close()
+
+        for e in v.iter_errors(["x"] * 1000):
+            break
+
+        # The traversal stops when the consumer stops, also when the rest of a large document is valid.
+        # Default values is only added to the items that was validated before that.
+        v = Validator(schema_data={"type": "seq", "sequence": [{"type": "map", "mapping": {"a": {"type": "int"}, "b": {"type": "int", "default": 0}}}]})
+        data = [{"a": "x"}] + [{"a": i} for i in range(100000)]
+
+        for e in v.iter_errors(data):
+            assert e.path == "/0/a"
+            break
+
+        assert "b" in data[0]
+        assert "b" not in data[1000]
+
+        # Errors that stops the traversal is raised in the consumer
+        v = Validator(schema_data={"type": "map", "mapping": {"a": {"type": "str"}}})
+        with pytest.raises(NotMappingError):
+            list(v.iter_errors([1]))
+
+    def test_validate_stream(self, tmpdir):
+        """
+        Every document in a multi document yaml file should be validated and errors tagged with the document index.
+        """
+        f = tmpdir.join("stream.yaml")
+        f.write("\n---\n".join("name: {}\nage: {}".format(i, "x" if i % 2 else i) for i in range(10)))
+
+        v = Validator(schema_data={"type": "map", "mapping": {"name": {"type": "int"}, "age": {"type": "int"}}})
+
+        with pytest.raises(SchemaError):
+            v.validate_stream(str(f))
+        assert v.validation_errors == [
+            "Document {}: Value 'x' is not of type 'int'. Path: '/age'".format(i) for i in (1, 3, 5, 7, 9)
+        ]
+
+        assert v.validate_stream(str(f), raise_exception=False, fail_fast=True) == 2
+        assert len(v.validation_errors) == 1
+
+        with f.open() as stream:
+            assert v.validate_stream(stream, raise_exception=False, summary=True) == 10
+        assert v.validation_errors == [
+            "5 error(s) at '/age', e.g. Document 1: Value 'x' is not of type 'int'. Path: '/age'",
+        ]
+
+        with pytest.raises(CoreError):
+            v.validate_stream(str(tmpdir.join("missing.yaml")))
+
+    def test_json_lines(self, tmpdir):
+        """
+        Json lines files should be validated one record at a time and errors tagged with the line number.
+        """
+        schema = {"type": "map", "mapping": {"id": {"type": "int"}, "name": {"type": "str"}}}
+        f = tmpdir.join("records.jsonl")
+        f.write("\n".join('{{"id": {}, "name": "{}"}}'.format(i if i % 3 else '"x"', i) for i in range(1, 8)) + "\n")
+
+        c = Core(source_file=str(f), schema_data=schema)
+        with pytest.raises(SchemaError):
+            c.validate()
+        assert c.validation_errors == [
+            "Line 3: Value 'x' is not of type 'int'. Path: '/id'",
+            "Line 6: Value 'x' is not of type 'int'. Path: '/id'",
+        ]
+        assert not c.is_valid()
+        assert [str(e) for e in c.iter_errors()] == c.validation_errors
+
+        v = Validator(schema_data=schema)
+        assert v.validate_lines(str(f), raise_exception=False, fail_fast=True) == 3
+        assert v.validation_errors == ["Line 3: Value 'x' is not of type 'int'. Path: '/id'"]
+
+        ndjson = tmpdir.join("records.ndjson")
+        ndjson.write('{"id": 1, "name": "foo"}\n\n{"id": 2, "name": "bar"}\n')
+        assert Core(source_file=str(ndjson), schema_data=schema).validate() is None
+
+        with ndjson.open() as stream:
+            assert v.validate_lines(stream) == 2
+
+        ndjson.write('{"id": 1, "name": "foo"}\n{"id": 2,\n')
+        with pytest.raises(CoreError) as ex:
+            v.validate_lines(str(ndjson))
+        assert "line 2" in ex.value.msg
+
+    def test_validate_json_array(self, tmpdir):
+        """
+        A top level json array should be validated one item at a time, including unique and range.
+        """
+        schema = {
+            "type": "seq",
+            "range": {"max": 3},
+            "sequence": [{"type": "map", "mapping": {"id": {"type": "int", "unique": True}, "name": {"type": "str"}}}],
+        }
+        f = tmpdir.join("data.json")
+        f.write(json.dumps([{"id": 1, "name": "a"}, {"id": "x", "name": "b"}, {"id": 1, "name": "c"}, {"id": 4, "name": 5}]))
+
+        v = Validator(schema_data=schema)
+        with pytest.raises(SchemaError):
+            v.validate_json_array(str(f), chunk_size=4)
+        assert v.validation_errors == [
+            "Value 'x' is not of type 'int'. Path: '/1/id'",
+            "Value '5' is not of type 'str'. Path: '/3/name'",
+            "Type 'seq' has size of '4', greater than max limit '3'. Path: ''",
+            "Value '1' is not unique. Previous path: '/0/id'. Path: '/2/id'",
+        ]
+
+        assert v.validate_json_array(str(f), raise_exception=False, fail_fast=True) == 2
+        assert v.validation_errors == ["Value 'x' is not of type 'int'. Path: '/1/id'"]
+
+        with f.open() as stream:
+            assert v.validate_json_array(stream, raise_exception=False) == 4
+
+        with pytest.raises(CoreError):
+            Validator(schema_data={"type": "map", "mapping": {"a": {"type": "str"}}}).validate_json_array(str(f))
+
+        # Same errors as the core for all test files with a sequence as root
+        for name in sorted(os.listdir(self.f("fail"))):
+            with open(self.f("fail", name)) as stream:
+                yaml_data = yaml.safe_load(stream)
+
+            if yaml_data["schema"].get("type") != "seq" or "func" in yaml_data["schema"]:
+                continue
+
+            c = Core(source_data=yaml_data["data"], schema_data=yaml_data["schema"])
+            c.validate(raise_exception=False)
+
+            v = Validator(schema_data=yaml_data["schema"])
+            v.validate_json_array(io.StringIO(json.dumps(yaml_data["data"], default=str)), raise_exception=False)
+
+            assert sorted(v.validation_errors) == sorted(c.validation_errors), name
+
+    def test_csv_source(self, tmpdir):
+        """
+        Rows in csv and tsv files should be validated one at a time as mappings in the root sequence.
+        """
+        schema = {
+            "type": "seq",
+            "sequence": [{
+                "type": "map",
+                "mapping": {
+                    "id": {"type": "int", "unique": True},
+                    "name": {"type": "str", "required": True, "pattern": "^[a-z]+$"},
+                    "state": {"type": "str", "enum": ["on", "off"]},
+                },
+            }],
+        }
+
+        f = tmpdir.join("data.csv")
+        f.write("id:int,name,state\n1,foo,on\n2,,off\n1,Bar,x\n")
+
+        c = Core(source_file=str(f), schema_data=schema)
+        with pytest.raises(SchemaError):
+            c.validate()
+        assert c.validation_errors == [
+            "Cannot find required key 'name'. Path: '/1'",
+            "Value 'Bar' does not match pattern '^[a-z]+$'. Path: '/2/name'",
+            "Enum 'x' does not exist. Path: '/2/state'",
+            "Value '1' is not unique. Previous path: '/0/id'. Path: '/2/id'",
+        ]
+        assert not c.is_valid()
+        assert [str(e) for e in c.iter_errors()] == c.validation_errors
+
+        f = tmpdir.join("data.tsv")
+        f.write("id:int\tname\n1\tfoo\n2\tbar\n")
+        assert Core(source_file=str(f), schema_data=schema).validate() is None
+
+        with pytest.raises(CoreError):
+            Core(source_file=str(f), schema_data={"type": "map", "mapping": {"id": {"type": "int"}}}).validate()
+
+    def test_csv_source_newlines(self, tmpdir):
+        """
+        Line breaks inside quoted csv fields should be kept as they are in the file.
+        """
+        schema = {"type": "seq", "sequence": [{"type": "map", "mapping": {"note": {"type": "str", "enum": ["a\r\nb", "c\rd"]}}}]}
+        text = b'note\r\n"a\r\nb"\r\n"c\rd"\r\n'
+
+        f = tmpdir.join("data.csv")
+        f.write_binary(text)
+        assert Core(source_file=str(f), schema_data=schema).validate() is None
+
+        gz = tmpdir.join("data.csv.gz")
+        with gzip.open(str(gz), "wb") as stream:
+            stream.write(text)
+        assert Core(source_file=str(gz), schema_data=schema).validate() is None
+
+        path = str(tmpdir.join("bundle.zip"))
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("data.csv", text)
+        assert Validator(schema_data=schema).validate_archive(path) == 1
+
+    def test_compressed_source_files(self, tmpdir):
+        """
+        Compressed source files should be decompressed while they are read and the format found from the inner extension.
+        """
+        schema = {"type": "seq", "sequence": [{"type": "map", "mapping": {"id": {"type": "int"}}}]}
+
+        gz = tmpdir.join("data.json.gz")
+        with gzip.open(str(gz), "wb") as f:
+            f.write(b'[{"id": 1}, {"id": "x"}]')
+
+        c = Core(source_file=str(gz), schema_data=schema)
+        assert not c.is_valid()
+        assert c.source == [{"id": 1}, {"id": "x"}]
+
+        bz = tmpdir.join("data.jsonl.bz2")
+        bz.write_binary(bz2.compress(b'{"id": 1}\n{"id": "x"}\n'))
+
+        c = Core(source_file=str(bz), schema_data=schema["sequence"][0])
+        c.validate(raise_exception=False)
+        assert c.validation_errors == ["Line 2: Value 'x' is not of type 'int'. Path: '/id'"]
+
+        v = Validator(schema_data=schema)
+        assert v.validate_json_array(str(gz), raise_exception=False) == 2
+
+    def test_source_file_objects_and_bytes(self):
+        """
+        File objects and bytes should be loaded with the format given with source_format.
+        """
+        schema = {"type": "seq", "sequence": [{"type": "map", "mapping": {"id": {"type": "int"}}}]}
+
+        c = Core(source_file=b'[{"id": 1}, {"id": "x"}]', source_format="json", schema_data=schema)
+        assert c.source == [{"id": 1}, {"id": "x"}]
+        assert not c.is_valid()
+
+        c = Core(source_file=memoryview(b"- id: 1\n- id: 2\n"), source_format="yaml", schema_data=schema)
+        assert c.source == [{"id": 1}, {"id": 2}]
+        assert c.is_valid()
+
+        c = Core(source_file=io.BytesIO(b"- id: 1\n- id: x\n"), source_format="yaml", schema_data=schema)
+        assert not c.is_valid()
+
+        c = Core(source_file=io.BytesIO(b'id:int\n1\nx\n'), source_format="csv", schema_data=schema)
+        c.validate(raise_exception=False)
+        assert c.validation_errors == ["Value 'x' is not of type 'int'. Path: '/1/id'"]
+
+        c = Core(source_file=b'{"id": 1}\n{"id": "x"}\n', source_format="jsonl", schema_data=schema["sequence"][0])
+        c.validate(raise_exception=False)
+        assert c.validation_errors == ["Line 2: Value 'x' is not of type 'int'. Path: '/id'"]
+
+        # The format can't be found without a file name
+        with pytest.raises(CoreError) as ex:
+            Core(source_file=io.BytesIO(b"[]"), schema_data=schema)
+        assert "source_format must be given" in str(ex.value)
+
+        with pytest.raises(CoreError) as ex:
+            Core(source_file=b"[]", source_format="xml", schema_data=schema)
+        assert "Unknown source_format: xml" in str(ex.value)
+
+        with pytest.raises(CoreError) as ex:
+            Core(source_file=b"[", source_format="json", schema_data=schema)
+        assert "Unable to load any data from source json file" in str(ex.value)
+
+    def test_memory_mapped_source_file(self, tmpdir, monkeypatch):
+        """
+        Files larger than the mmap threshold should be parsed from the mapped file.
+        """
+        monkeypatch.setattr(pykwalify.sources, "MMAP_THRESHOLD", 16)
+
+        schema = {"type": "seq", "sequence": [{"type": "map", "mapping": {"id": {"type": "int"}}}]}
+
+        f = tmpdir.join("data.json")
+        f.write('[{"id": 1}, {"id": "x"}]')
+
+        c = Core(source_file=str(f), schema_data=schema)
+        assert c.source == [{"id": 1}, {"id": "x"}]
+        assert not c.is_valid()
+
+        f = tmpdir.join("data.yaml")
+        f.write("- id: 1\n- id: 2\n- id: 3\n")
+
+        c = Core(source_file=str(f), schema_data=schema)
+        assert c.source == [{"id": 1}, {"id": 2}, {"id": 3}]
+        assert c.is_valid()
+
+    def test_validator_validate_file(self, tmpdir):
+        """
+        A Validator should load and validate files in all formats that Core accepts.
+        """
+        v = Validator(schema_data={"type": "seq", "sequence": [{"type": "map", "mapping": {"id": {"type": "int"}}}]})
+
+        f = tmpdir.join("data.json")
+        f.write('[{"id": 1}, {"id": "x"}]')
+
+        with pytest.raises(SchemaError):
+            v.validate_file(str(f))
+        assert v.validation_errors == ["Value 'x' is not of type 'int'. Path: '/1/id'"]
+
+        f = tmpdir.join("data.csv")
+        f.write("id:int\n1\n2\n")
+        assert v.validate_file(str(f)) is None
+        assert v.validation_errors == []
+
+        assert v.validate_file(b"- id: 1\n", source_format="yaml") == [{"id": 1}]
+
+    def test_validate_archive(self, tmpdir):
+        """
+        Members of an archive that match the glob should be validated without extracting them.
+        """
+        path = str(tmpdir.join("bundle.zip"))
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("manifests/a.yaml", "name: foo\nversion: 1\n")
+            archive.writestr("manifests/b.yaml", "name: bar\nversion: x\n")
+            archive.writestr("manifests/c.json", '{"name": "baz", "version": 3, "extra": 1}')
+            archive.writestr("manifests/d.jsonl", '{"name": "a", "version": 1}\n{"name": "b", "version": "y"}\n')
+            archive.writestr("README.txt", "not validated")
+
+        v = Validator(schema_data={"type": "map", "mapping": {"name": {"type": "str"}, "version": {"type": "int"}}})
+
+        with pytest.raises(SchemaError):
+            v.validate_archive(path, members="manifests/*")
+        assert v.validation_errors == [
+            "manifests/b.yaml: Value 'x' is not of type 'int'. Path: '/version'",
+            "manifests/c.json: Key 'extra' was not defined. Path: ''",
+            "manifests/d.jsonl: Line 2: Value 'y' is not of type 'int'. Path: '/version'",
+        ]
+
+        assert v.validate_archive(path, members="manifests/*.yaml", raise_exception=False, fail_fast=True) == 2
+        assert v.validation_errors == ["manifests/b.yaml: Value 'x' is not of type 'int'. Path: '/version'"]
+
+        assert v.validate_archive(path, members="manifests/a.*") == 1
+
+        with pytest.raises(CoreError):
+            v.validate_archive(path)
+
     def test_multi_file_support(self):
         """
         This should test that multiple files is supported correctly
@@ -407,7 +1087,7 @@ class TestCore(object):
         for passing_test_file in pass_tests:
             f = self.f(os.path.join("success", passing_test_file))
             with open(f, "r") as stream:
-                yaml_data = yaml.load(stream)
+                yaml_data = yaml.safe_load(stream)
                 data = yaml_data["data"]
                 schema = yaml_data["schema"]
 
@@ -426,7 +1106,7 @@ class TestCore(object):
         for failing_test, exception_type in _fail_tests:
             f = self.f(os.path.join("fail", failing_test))
             with open(f, "r") as stream:
-                yaml_data = yaml.load(stream)
+                yaml_data = yaml.safe_load(stream)
                 data = yaml_data["data"]
                 schema = yaml_data["schema"]
                 errors = yaml_data["errors"]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+""" Unit test for pyKwalify - Events """
+
+# python std lib
+import copy
+import io
+import os
+
+# pykwalify imports
+import pykwalify
+from pykwalify.core import Core, Validator
+from pykwalify.errors import CoreError, SchemaError, NotMappingError
+
+# 3rd party imports
+import pytest
+import yaml
+
+
+class TestEvents(object):
+
+    def setUp(self):
+        pykwalify.partial_schemas = {}
+
+    def f(self, *args):
+        return os.path.join(os.path.dirname(os.path.realpath(__file__)), "files", *args)
+
+    def test_same_errors_as_core(self):
+        """
+        The event validator must report the same errors as the core do for all test files.
+        Container errors is reported after the errors for the content so the order is not compared.
+        """
+        for folder in ["success", "fail"]:
+            for name in sorted(os.listdir(self.f(folder))):
+                with open(self.f(folder, name), "r") as stream:
+                    yaml_data = yaml.safe_load(stream)
+
+                if name == "16s.yaml":
+                    # TODO: Currently slightly broken in the core
+                    continue
+
+                c = Core(source_data=copy.deepcopy(yaml_data["data"]), schema_data=copy.deepcopy(yaml_data["schema"]))
+                c.validate(raise_exception=False)
+
+                v = Validator(schema_data=yaml_data["schema"])
+                v.validate_events(io.StringIO(yaml.safe_dump(yaml_data["data"])), raise_exception=False)
+
+                assert sorted(v.validation_errors) == sorted(c.validation_errors), "Different errors for file : {}".format(name)
+
+    def test_validate_events(self, tmpdir):
+        v = Validator(schema_data={
+            "type": "seq",
+            "range": {"max": 3},
+            "sequence": [{
+                "type": "map",
+                "mapping": {
+                    "id": {"type": "int", "unique": True},
+                    "name": {"type": "str", "pattern": "^[a-z]+$", "required": True},
+                    "tags": {"type": "seq", "sequence": [{"type": "str"}]},
+                },
+            }],
+        })
+
+        f = tmpdir.join("data.yaml")
+        f.write("\n".join([
+            "- id: 1",
+            "  name: Foo",
+            "  tags: [a, 1]",
+            "- id: 1",
+            "  name: bar",
+            "- id: 3",
+            "- &item",
+            "  id: 4",
+            "  name: a",
+            "- *item",
+        ]))
+
+        with pytest.raises(SchemaError):
+            v.validate_events(str(f))
+
+        assert v.validation_errors == [
+            "Value 'Foo' does not match pattern '^[a-z]+$'. Path: '/0/name'",
+            "Value '1' is not of type 'str'. Path: '/0/tags/1'",
+            "Cannot find required key 'name'. Path: '/2'",
+            "Type 'seq' has size of '5', greater than max limit '3'. Path: ''",
+            "Value '1' is not unique. Previous path: '/0/id'. Path: '/1/id'",
+            "Value '4' is not unique. Previous path: '/3/id'. Path: '/4/id'",
+        ]
+
+        with f.open() as stream:
+            v.validate_events(stream, raise_exception=False, fail_fast=True)
+        assert v.validation_errors == ["Value 'Foo' does not match pattern '^[a-z]+$'. Path: '/0/name'"]
+
+    def test_type_errors(self):
+        """
+        Nodes of the wrong type should be handled like the core do.
+        """
+        v = Validator(schema_data={
+            "type": "seq",
+            "sequence": [{"type": "map", "mapping": {"a": {"type": "map", "mapping": {"b": {"type": "int"}}}}}],
+        })
+
+        # The item that is not valid is skipped but the following items is validated
+        v.validate_events(io.StringIO("- a: foo\n- a: {b: x}\n"), raise_exception=False)
+        assert v.validation_errors == ["Value 'x' is not of type 'int'. Path: '/1/a/b'"]
+
+        with pytest.raises(NotMappingError):
+            v = Validator(schema_data={"type": "map", "mapping": {"a": {"type": "map", "mapping": {"b": {"type": "int"}}}}})
+            v.validate_events(io.StringIO("a: [1, 2]\n"))
+
+    def test_invalid_stream(self):
+        v = Validator(schema_data={"type": "seq", "sequence": [{"type": "str"}]})
+
+        with pytest.raises(CoreError):
+            v.validate_events(io.StringIO(""))
+
+        with pytest.raises(CoreError):
+            v.validate_events(io.StringIO("- a\n---\n- b\n"))
+
+        with pytest.raises(CoreError):
+            v.validate_events(io.StringIO("- [a\n"))
@@ -3,6 +3,9 @@
 # pykwalify imports
 from pykwalify import errors
 
+# 3rd party imports
+import pytest
+
 
 class TestCLI(object):
 
@@ -27,3 +30,56 @@ class TestCLI(object):
 
         sc_e = errors.SchemaConflict()
         assert sc_e.retcode == 5
+
+    def test_schema_error_entry(self):
+        e = errors.SchemaError.SchemaErrorEntry(
+            msg="Key '{key}' was not defined. Path: '{path}'",
+            path="/foo",
+            value={"bar": 1},
+            rule="rule",
+            key="bar",
+        )
+        assert str(e) == "Key 'bar' was not defined. Path: '/foo'"
+        assert repr(e) == str(e)
+        assert e.key == "bar"
+        assert e.rule == "rule"
+        assert not hasattr(e, "__dict__")
+
+        # Only a bounded view of large values should be kept
+        e = errors.SchemaError.SchemaErrorEntry(msg="Enum '{value}' does not exist. Path: '{path}'", path="", value=list(range(100000)))
+        assert e.value == "[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, ...]"
+
+        e = errors.SchemaError.SchemaErrorEntry(msg="{value}", path="", value="a" * 1000)
+        assert len(e.value) == errors.MAX_VALUE_LENGTH + 3
+
+        e = errors.SchemaError.SchemaErrorEntry(msg="{value}", path="", value=1337)
+        assert e.value == 1337
+
+    def test_path_template(self):
+        assert errors.path_template("") == ""
+        assert errors.path_template("/items/3/price") == "/items/*/price"
+        assert errors.path_template("/0/1/foo") == "/*/*/foo"
+
+    def test_error_summary(self):
+        summary = errors.ErrorSummary(max_samples=2, max_groups=2)
+
+        for i in range(1000):
+            summary.append(errors.SchemaError.SchemaErrorEntry(
+                msg="Value '{value}' is not of type 'int'. Path: '{path}'",
+                path="/items/{}/price".format(i),
+                value="x"))
+        summary.append(errors.SchemaError.SchemaErrorEntry(msg="Key '{key}' was not defined. Path: '{path}'", path="", value={}, key="foo"))
+        summary.append(errors.SchemaError.SchemaErrorEntry(msg="Key '{key}' was not defined. Path: '{path}'", path="/foo", value={}, key="bar"))
+
+        assert len(summary) == 1002
+        assert [e.path for e in summary.samples()] == ["/items/0/price", "/items/1/price", ""]
+        assert summary.lines() == [
+            "1000 error(s) at '/items/*/price', e.g. Value 'x' is not of type 'int'. Path: '/items/0/price'",
+            "1 error(s) at '', e.g. Key 'foo' was not defined. Path: ''",
+            "1 more error(s) that is not grouped",
+        ]
+
+        summary = errors.ErrorSummary(max_errors=2)
+        summary.append("foo")
+        with pytest.raises(errors.ErrorLimitReached):
+            summary.append("bar")
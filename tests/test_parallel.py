@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+""" Unit test for pyKwalify - Parallel """
+
+# python std lib
+import copy
+import datetime
+import json
+import multiprocessing
+import os
+
+# pykwalify imports
+from pykwalify.core import Core, Validator
+from pykwalify.errors import CoreError, SchemaError
+from pykwalify.parallel import validate_files
+
+# 3rd party imports
+import pytest
+
+
+def validate_node(args):
+    """
+    Stands in for a node that validates one shard and sends the state back as json.
+    """
+    schema, shard = args
+    return json.loads(json.dumps(Validator(schema_data=schema).validate_shard(iter(shard))))
+
+
+class TestParallel(object):
+
+    def f(self, *args):
+        return os.path.join(os.path.dirname(os.path.realpath(__file__)), "files", *args)
+
+    def test_validate_files(self, tmpdir):
+        files = []
+        for i in range(10):
+            f = tmpdir.join("{}.json".format(i))
+            f.write("[1, {}]".format('"x"' if i % 3 == 0 else i))
+            files.append(str(f))
+
+        broken = tmpdir.join("broken.json")
+        broken.write("[1,")
+        files.append(str(broken))
+
+        schema = tmpdir.join("schema.yaml")
+        schema.write("type: seq\nsequence:\n  - type: int\n")
+
+        for jobs in [1, 4]:
+            results = list(validate_files(files, [str(schema)], jobs=jobs, chunksize=2))
+
+            assert [r.path for r in results] == files
+            assert [r.errors for r in results[:4]] == [["Value 'x' is not of type 'int'. Path: '/1'"], [], [], ["Value 'x' is not of type 'int'. Path: '/1'"]]
+            assert results[-1].errors == []
+            assert results[-1].error == "Unable to load any data from source json file"
+
+    def test_validate_files_summary(self, tmpdir):
+        f = tmpdir.join("data.yaml")
+        f.write("- a\n- b\n- c\n")
+
+        schema = tmpdir.join("schema.yaml")
+        schema.write("type: seq\nsequence:\n  - type: int\n")
+
+        results = list(validate_files([str(f)], [str(schema)], jobs=2, max_errors=2))
+        assert len(results[0].errors) == 2
+
+        results = list(validate_files([str(f)], [str(schema)], summary=True))
+        assert results[0].errors[0].startswith("3 error(s) at '/*'")
+
+    def test_validate_parallel(self):
+        """
+        A sequence that is validated in chunks should give the same errors as the core,
+        with unique checked across the chunks and the index in the whole sequence in the paths.
+        """
+        schema = {
+            "type": "seq",
+            "range": {"max": 20},
+            "sequence": [{
+                "type": "map",
+                "mapping": {
+                    "id": {"type": "int", "unique": True},
+                    "name": {"type": "str", "pattern": "^[a-z]+$"},
+                },
+            }],
+        }
+        data = [{"id": i % 17, "name": "foo" if i % 7 else "Foo"} for i in range(30)]
+
+        c = Core(source_data=copy.deepcopy(data), schema_data=schema)
+        c.validate(raise_exception=False)
+
+        v = Validator(schema_data=schema)
+
+        for jobs in [1, 3]:
+            with pytest.raises(SchemaError):
+                v.validate_parallel(data, jobs=jobs, chunk_size=4)
+            assert v.validation_errors == c.validation_errors
+
+        assert "Value '0' is not unique. Previous path: '/0/id'. Path: '/17/id'" in v.validation_errors
+        assert "Value 'Foo' does not match pattern '^[a-z]+$'. Path: '/28/name'" in v.validation_errors
+
+        v.validate_parallel(data, jobs=2, chunk_size=4, raise_exception=False, max_errors=3)
+        assert v.validation_errors == c.validation_errors[:3]
+
+        v.validate_parallel(data, jobs=2, chunk_size=4, raise_exception=False, summary=True)
+        c.validate(raise_exception=False, summary=True)
+        assert v.validation_errors == c.validation_errors
+
+        valid = [{"id": i, "name": "foo"} for i in range(10)]
+        assert v.validate_parallel(valid, jobs=2, chunk_size=4) == valid
+
+    def test_validate_parallel_path(self):
+        """
+        A mapping at a path should be validated in chunks and the rest of the document as usual.
+        """
+        schema = {
+            "type": "map",
+            "mapping": {
+                "meta": {"type": "str"},
+                "items": {"type": "map", "range": {"max": 10}, "mapping": {"regex;^k": {"type": "int"}, "c": {"type": "int", "default": 1}}},
+            },
+        }
+        data = {"meta": 1, "items": dict(("k{}".format(i), i if i % 4 else "x") for i in range(12))}
+
+        c = Core(source_data=copy.deepcopy(data), schema_data=schema)
+        c.validate(raise_exception=False)
+
+        v = Validator(schema_data=schema)
+        v.validate_parallel(data, path="/items", jobs=2, chunk_size=5, raise_exception=False)
+
+        assert v.validation_errors[0] == "Value '1' is not of type 'str'. Path: '/meta'"
+        assert sorted(v.validation_errors) == sorted(c.validation_errors)
+        assert data["items"]["c"] == 1
+
+        with pytest.raises(CoreError):
+            v.validate_parallel(data, path="/missing")
+
+    def test_shards(self):
+        """
+        Shards validated in other processes should merge into the same errors as the core
+        gives for the whole sequence, with range and unique checked across all shards.
+        """
+        schema = {
+            "type": "seq",
+            "range": {"max": 25},
+            "sequence": [{
+                "type": "map",
+                "mapping": {
+                    "id": {"type": "int", "unique": True},
+                    "name": {"type": "str", "pattern": "^[a-z]+$"},
+                    "tags": {"type": "seq", "sequence": [{"type": "str", "unique": True}]},
+                },
+            }],
+        }
+        data = [{"id": i % 11, "name": "foo" if i % 6 else "Foo", "tags": ["a", "a"] if i == 13 else ["a"]} for i in range(30)]
+
+        c = Core(source_data=copy.deepcopy(data), schema_data=schema)
+        c.validate(raise_exception=False)
+
+        shards = [data[0:7], data[7:8], data[8:20], [], data[20:]]
+        pool = multiprocessing.Pool(3)
+        try:
+            states = pool.map(validate_node, [(schema, shard) for shard in shards])
+        finally:
+            pool.close()
+            pool.join()
+
+        assert [state["count"] for state in states] == [7, 1, 12, 0, 10]
+
+        v = Validator(schema_data=schema)
+        with pytest.raises(SchemaError):
+            v.merge_shards(states)
+        assert v.validation_errors == c.validation_errors
+        assert "Value 'a' is not unique. Previous path: '/13/tags/0'. Path: '/13/tags/1'" in v.validation_errors
+        assert "Value '0' is not unique. Previous path: '/0/id'. Path: '/22/id'" in v.validation_errors
+
+        assert v.merge_shards(states, raise_exception=False, max_errors=2) == 30
+        assert v.validation_errors == c.validation_errors[:2]
+
+        assert v.merge_shards([v.validate_shard([{"id": 1}]), v.validate_shard([{"id": 2}])]) == 2
+
+        # func on the root sequence can only be called with the whole sequence
+        v = Validator(schema_data=dict(schema, func="check"))
+        with pytest.raises(CoreError):
+            v.validate_shard(data)
+
+    def test_shards_unique_equality(self):
+        """
+        Values should be unique across shards by python equality, the same way as in the core.
+        """
+        schema = {"type": "seq", "sequence": [{"type": "any", "unique": True}]}
+        day = datetime.date(2020, 1, 2)
+        data = [1, 2, 1.0, True, 2.5, day, "2020-01-02", day, "1", 2.5]
+
+        c = Core(source_data=data, schema_data=schema)
+        c.validate(raise_exception=False)
+        assert len(c.validation_errors) == 4
+
+        v = Validator(schema_data=schema)
+        states = [v.validate_shard(shard) for shard in [data[0:2], data[2:4], data[4:7], data[7:]]]
+        v.merge_shards(states, raise_exception=False)
+        assert v.validation_errors == c.validation_errors
@@ -3,6 +3,8 @@
 """ Unit test for pyKwalify - Rule """
 
 # python std lib
+import os
+import tempfile
 import unittest
 
 # 3rd party imports
@@ -11,7 +13,7 @@ import pytest
 # pyKwalify imports
 import pykwalify
 from pykwalify.errors import RuleError, SchemaConflict
-from pykwalify.rule import Rule
+from pykwalify.rule import EnumFile, MappingKeyMatcher, PatternMatchCache, Rule
 
 
 class TestRule(unittest.TestCase):
@@ -278,3 +280,86 @@ class TestRule(unittest.TestCase):
         with pytest.raises(SchemaConflict) as ex:
             Rule(schema={"type": "int", "enum": [1, 2, 3], "range": {"max": 10, "min": 1}})
         assert ex.value.msg.startswith("enum.conflict :: range"), "Wrong exception was raised"
+
+    def test_mapping_lookup_tables(self):
+        # Required keys and default values should be precomputed when the mapping is built
+        r = Rule(schema={
+            "type": "map",
+            "mapping": {
+                "foo": {"type": "str", "required": True},
+                "bar": {"type": "int", "default": 3},
+                "baz": {"type": "str"},
+            },
+        })
+        assert r._required_keys == ["foo"]
+        assert r._default_values == {"bar": 3}
+
+    def test_mapping_key_matcher(self):
+        r = Rule(schema={
+            "type": "map",
+            "mapping": {
+                "foo": {"type": "str"},
+                "regex;(mi.+)": {"type": "str"},
+                "re;(m.+)": {"type": "str"},
+            },
+        })
+        matcher = r._mapping_matcher
+        assert isinstance(matcher, MappingKeyMatcher)
+        assert list(matcher.exact_rules.keys()) == ["foo"]
+        assert matcher.combined_regexp is not None
+
+        mi_rule, m_rule = r._regex_mappings
+        assert matcher.match_regex("mic") == (mi_rule, m_rule)
+        assert matcher.match_regex("mac") == (m_rule, )
+        assert matcher.match_regex("bar") == ()
+        assert matcher.memo == {"mic": (mi_rule, m_rule), "mac": (m_rule, ), "bar": ()}
+
+        # The memo should never grow above its max size
+        matcher.memo_size = 2
+        matcher.match_regex("mec")
+        assert len(matcher.memo) == 1
+
+    def test_pattern_match_cache(self):
+        r = Rule(schema={"type": "str", "pattern": "^[A-Z]{2}$"})
+        cache = PatternMatchCache(r._pattern_regexp, 2)
+
+        assert cache.match("SE")
+        assert not cache.match("foo")
+        assert cache.match("SE")
+        assert (cache.hits, cache.misses) == (1, 2)
+
+        # The least recently used value should be dropped when the cache is full
+        assert cache.match("NO")
+        assert list(cache.results.keys()) == ["SE", "NO"]
+        assert cache.stats() == {"pattern": "^[A-Z]{2}$", "hits": 1, "misses": 3, "size": 2, "max_size": 2}
+
+    def test_enum_set(self):
+        r = Rule(schema={"type": "str", "enum": ["a", "b", "c"]})
+        assert r._enum_set == set(["a", "b", "c"])
+
+    def test_enum_file(self):
+        values = sorted(["AB{}".format(i) for i in range(500)])
+
+        fd, f = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "w") as stream:
+                stream.write("\n".join(values) + "\n")
+
+            r = Rule(schema={"type": "str", "enum-file": f})
+            assert isinstance(r._enum_file, EnumFile)
+
+            for value in values:
+                assert value in r._enum_file
+            for value in ["", "AA", "AB", "AB1000", "ZZ"]:
+                assert value not in r._enum_file
+
+            with pytest.raises(SchemaConflict):
+                Rule(schema={"type": "str", "enum": ["a"], "enum-file": f})
+        finally:
+            os.remove(f)
+
+        with pytest.raises(RuleError):
+            Rule(schema={"type": "str", "enum-file": f})
+
+        with pytest.raises(RuleError):
+            Rule(schema={"type": "seq", "sequence": [{"type": "str"}], "enum-file": f})
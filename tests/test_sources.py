@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+""" Unit test for pyKwalify - Sources """
+
+# python std lib
+import bz2
+import gzip
+import io
+import json
+import tarfile
+import zipfile
+
+# pykwalify imports
+from pykwalify.errors import CoreError, NotSequenceError
+from pykwalify.sources import (
+    detect_compression,
+    is_archive,
+    iter_archive_members,
+    iter_csv_rows,
+    iter_json_array,
+    open_source,
+    strip_compression_extension,
+)
+
+# 3rd party imports
+import pytest
+
+
+class TestSources(object):
+
+    def test_iter_json_array(self):
+        data = [1, -2.5e-3, 0.5, "foo ] , bar", u"åäö €", {"a": [1, {"b": None}]}, [], True, False, None, 12345678901234567890]
+        text = json.dumps(data, ensure_ascii=False)
+
+        # Small chunks makes sure values and characters is split between reads
+        for chunk_size in (1, 2, 3, 7, 65536):
+            assert list(iter_json_array(io.StringIO(text), chunk_size)) == data
+            assert list(iter_json_array(io.BytesIO(text.encode("utf-8")), chunk_size)) == data
+            assert list(iter_json_array(io.StringIO(json.dumps(data, indent=4)), chunk_size)) == data
+
+        assert list(iter_json_array(io.StringIO(" [ ] \n"))) == []
+
+    def test_iter_json_array_is_lazy(self):
+        stream = io.StringIO("[" + ", ".join(["1"] * 10000) + ", x]")
+        items = iter_json_array(stream, chunk_size=16)
+
+        assert next(items) == 1
+        assert stream.tell() < 100
+
+    def test_iter_json_array_errors(self):
+        with pytest.raises(NotSequenceError):
+            list(iter_json_array(io.StringIO('{"a": 1}')))
+
+        for text in ["", "[1,", "[1 2]", "[1,]", "[0.]", "[1] x"]:
+            with pytest.raises(CoreError):
+                list(iter_json_array(io.StringIO(text), 2))
+
+    def test_iter_csv_rows(self):
+        stream = io.StringIO(u"id:int,name,score:number,active:bool\n1,foo,2.5,true\n\n2,,x,FALSE\n3,bar\n")
+
+        assert list(iter_csv_rows(stream)) == [
+            {"id": 1, "name": "foo", "score": 2.5, "active": True},
+            {"id": 2, "score": "x", "active": False},
+            {"id": 3, "name": "bar"},
+        ]
+
+        assert list(iter_csv_rows(io.StringIO(u"a\tb:int\nfoo\t1\n"), delimiter="\t")) == [{"a": "foo", "b": 1}]
+
+    def test_iter_csv_rows_errors(self):
+        for text in [u"", u"a:foo\n1\n", u"a,b\n1,2,3\n"]:
+            with pytest.raises(CoreError):
+                list(iter_csv_rows(io.StringIO(text)))
+
+    def test_compressed_sources(self, tmpdir):
+        text = u"- foo\n- bar\n"
+
+        gz = tmpdir.join("data.yaml.gz")
+        with gzip.open(str(gz), "wb") as f:
+            f.write(text.encode("utf-8"))
+
+        bz = tmpdir.join("data.yaml.bz2")
+        bz.write_binary(bz2.compress(text.encode("utf-8")))
+
+        # Compressed file without a compression extension is found from the magic bytes
+        magic = tmpdir.join("data.yaml")
+        magic.write_binary(gz.read_binary())
+
+        plain = tmpdir.join("plain.yaml")
+        plain.write(text)
+
+        assert detect_compression(str(gz)) == "gzip"
+        assert detect_compression(str(bz)) == "bz2"
+        assert detect_compression(str(magic)) == "gzip"
+        assert detect_compression(str(plain)) is None
+
+        for f in [gz, bz, magic, plain]:
+            with open_source(str(f)) as stream:
+                assert stream.read() == text
+
+        assert strip_compression_extension("data.json.gz") == "data.json"
+        assert strip_compression_extension("data.jsonl.bz2") == "data.jsonl"
+        assert strip_compression_extension("data.yaml.xz") == "data.yaml"
+        assert strip_compression_extension("data.yaml") == "data.yaml"
+
+    def test_iter_archive_members(self, tmpdir):
+        files = {"a/one.yaml": u"foo: 1\n", "a/two.json": u'{"foo": 2}', "b/three.yaml": u"foo: 3\n"}
+
+        zip_path = str(tmpdir.join("bundle.zip"))
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            for name, text in sorted(files.items()):
+                archive.writestr(name, text.encode("utf-8"))
+
+        tar_path = str(tmpdir.join("bundle.tar.gz"))
+        with tarfile.open(tar_path, "w:gz") as archive:
+            for name, text in sorted(files.items()):
+                data = text.encode("utf-8")
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+
+        for path in [zip_path, tar_path]:
+            assert is_archive(path)
+            assert [(name, stream.read()) for name, stream in iter_archive_members(path)] == sorted(files.items())
+            assert [name for name, stream in iter_archive_members(path, "a/*.yaml")] == ["a/one.yaml"]
+
+        assert not is_archive("data.yaml.gz")
+
+        with pytest.raises(CoreError):
+            list(iter_archive_members(str(tmpdir.join("missing.zip"))))
+
+        not_archive = tmpdir.join("data.zip")
+        not_archive.write("foo")
+        with pytest.raises(CoreError):
+            list(iter_archive_members(str(not_archive)))